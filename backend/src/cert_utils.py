@@ -4,13 +4,22 @@ TLS certificate utilities for the import HTTPS server.
 Generates and stores a self-signed certificate in DECKY_PLUGIN_RUNTIME_DIR
 so the import page is served over HTTPS (secure context for Paste).
 Uses OpenSSL via subprocess so no extra Python deps (e.g. cryptography) are
-required in Decky Loader runtime.
+required in Decky Loader runtime. Keys are ECDSA P-256 (cheaper handshakes
+for phones than RSA-2048); certificates are renewed RENEW_BEFORE_DAYS before
+they expire. All functions block: call them from an executor.
 Contract: specs/002-vless-import-qr (HTTPS for import page).
 """
 
 from pathlib import Path
 import os
+import ssl
 import subprocess
+import tempfile
+import time
+from typing import Optional
+
+CERT_DAYS = 365
+RENEW_BEFORE_DAYS = 30
 
 
 def _openssl_binary() -> str:
@@ -20,10 +29,50 @@ def _openssl_binary() -> str:
     return "openssl"
 
 
-def ensure_cert_key(runtime_dir: Path) -> tuple[Path, Path]:
+def _openssl_env() -> dict:
+    # Use clean env so loader uses system libssl
+    # (Decky sandbox sets LD_LIBRARY_PATH/LD_PRELOAD → /tmp/_MEI* incompatible libs)
+    env = os.environ.copy()
+    env.pop("LD_LIBRARY_PATH", None)
+    env.pop("LD_PRELOAD", None)
+    return env
+
+
+def cert_expires_at(cert_path: Path) -> Optional[float]:
+    """
+    Expiry (notAfter) of a PEM certificate as a Unix timestamp, or None if the
+    certificate cannot be read.
+    """
+    try:
+        result = subprocess.run(
+            [_openssl_binary(), "x509", "-noout", "-enddate", "-in", str(cert_path)],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=False,
+            env=_openssl_env(),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0 or "=" not in result.stdout:
+        return None
+    try:
+        # notAfter=Oct 18 12:00:00 2027 GMT
+        return float(ssl.cert_time_to_seconds(result.stdout.strip().split("=", 1)[1]))
+    except ValueError:
+        return None
+
+
+def needs_renewal(cert_path: Path, renew_before_days: int = RENEW_BEFORE_DAYS) -> bool:
+    """True if the certificate is missing, unreadable or expires within renew_before_days."""
+    expires_at = cert_expires_at(cert_path)
+    return expires_at is None or expires_at - time.time() < renew_before_days * 86400
+
+
+def generate_cert_key(runtime_dir: Path) -> tuple[Path, Path]:
     """
-    Ensure cert.pem and key.pem exist in runtime_dir. If missing, generate
-    a self-signed certificate (valid 365 days) via OpenSSL and save both files.
+    Generate a self-signed ECDSA P-256 certificate (valid CERT_DAYS days) and
+    replace cert.pem/key.pem in runtime_dir atomically.
     Returns (cert_path, key_path). Raises on failure.
     """
     runtime_dir = Path(runtime_dir)
@@ -31,42 +80,66 @@ def ensure_cert_key(runtime_dir: Path) -> tuple[Path, Path]:
     cert_path = runtime_dir / "cert.pem"
     key_path = runtime_dir / "key.pem"
 
-    if cert_path.is_file() and key_path.is_file():
-        return (cert_path, key_path)
-
-    # Generate with system OpenSSL; use clean env so loader uses system libssl
-    # (Decky sandbox sets LD_LIBRARY_PATH/LD_PRELOAD → /tmp/_MEI* incompatible libs)
-    env = os.environ.copy()
-    env.pop("LD_LIBRARY_PATH", None)
-    env.pop("LD_PRELOAD", None)
-
-    cmd = [
-        _openssl_binary(),
-        "req",
-        "-x509",
-        "-newkey",
-        "rsa:2048",
-        "-keyout",
-        str(key_path),
-        "-out",
-        str(cert_path),
-        "-days",
-        "365",
-        "-nodes",
-        "-subj",
-        "/CN=localhost/O=Xray Decky Import",
-    ]
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        timeout=30,
-        cwd=str(runtime_dir),
-        env=env,
-    )
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"OpenSSL cert generation failed: {result.stderr or result.stdout or 'unknown'}"
+    with tempfile.TemporaryDirectory(prefix=".cert-", dir=str(runtime_dir)) as tmp:
+        tmp_cert = Path(tmp) / "cert.pem"
+        tmp_key = Path(tmp) / "key.pem"
+        cmd = [
+            _openssl_binary(),
+            "req",
+            "-x509",
+            "-newkey",
+            "ec",
+            "-pkeyopt",
+            "ec_paramgen_curve:prime256v1",
+            "-keyout",
+            str(tmp_key),
+            "-out",
+            str(tmp_cert),
+            "-days",
+            str(CERT_DAYS),
+            "-nodes",
+            "-subj",
+            "/CN=localhost/O=Xray Decky Import",
+        ]
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=30,
+            cwd=tmp,
+            check=False,
+            env=_openssl_env(),
         )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"OpenSSL cert generation failed: {result.stderr or result.stdout or 'unknown'}"
+            )
+        # Renamed into place; a reader racing the two renames gets a mismatched
+        # pair and load_cert_chain fails, so callers keep their old context
+        os.replace(tmp_key, key_path)
+        os.replace(tmp_cert, cert_path)
 
     return (cert_path, key_path)
+
+
+def ensure_cert_key(
+    runtime_dir: Path, renew_before_days: int = RENEW_BEFORE_DAYS
+) -> tuple[Path, Path]:
+    """
+    Ensure cert.pem and key.pem exist in runtime_dir and are not about to
+    expire. Generates a new certificate when they are missing or expire within
+    renew_before_days (pass 0 to only replace missing or expired ones).
+    Returns (cert_path, key_path). Raises on failure.
+    """
+    runtime_dir = Path(runtime_dir)
+    cert_path = runtime_dir / "cert.pem"
+    key_path = runtime_dir / "key.pem"
+
+    if (
+        cert_path.is_file()
+        and key_path.is_file()
+        and not needs_renewal(cert_path, renew_before_days)
+    ):
+        return (cert_path, key_path)
+
+    return generate_cert_key(runtime_dir)
@@ -0,0 +1,172 @@
+"""
+Coalescing Settings - Write-behind facade over Decky's SettingsManager
+
+Decky's SettingsManager rewrites the whole settings JSON on every setSetting()
+and commit(), and one plugin call can commit three or four times. This facade
+keeps the SettingsManager interface but only marks keys dirty; commits within
+a short debounce window are merged into one write. A write is skipped when the
+serialized content is unchanged, and happens atomically (temp file + rename)
+in an executor so the event loop never waits for storage.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class CoalescingSettings:
+    """
+    SettingsManager-compatible facade with debounced, deduplicated writes.
+
+    Responsibilities:
+    - Serve reads from the wrapped manager's in-memory settings
+    - Track dirty keys and merge commits inside DEBOUNCE seconds
+    - Skip writes whose content hash matches the file on disk
+    - Write atomically off the event loop; flush() forces a write (unload)
+    """
+
+    DEBOUNCE = 0.5
+
+    def __init__(self, manager, debounce: float = DEBOUNCE):
+        """
+        Initialize CoalescingSettings.
+
+        Args:
+            manager: Decky SettingsManager (provides .settings, .path, read())
+            debounce: Seconds to wait for further commits before writing
+        """
+        self._manager = manager
+        self.debounce = debounce
+        self._dirty: Set[str] = set()
+        self._written_hash: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.writes: int = 0
+        self.skipped_writes: int = 0
+        self.commits: int = 0
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return self._manager.settings
+
+    @property
+    def path(self) -> str:
+        return self._manager.path
+
+    def read(self) -> None:
+        """(Re)load settings from disk, writing pending changes first."""
+        if self._dirty or self._timer is not None:
+            self._cancel_timer()
+            self._write_now(*self._serialize())
+        self._manager.read()
+        self._written_hash = self._serialize()[1]
+
+    def getSetting(self, key: str, default: Any = None) -> Any:
+        return self._manager.settings.get(key, default)
+
+    def setSetting(self, key: str, value: Any) -> None:
+        """Set a value in memory; it is written with the next commit."""
+        self._manager.settings[key] = value
+        self._dirty.add(key)
+        self._schedule()
+
+    def commit(self) -> None:
+        """Request a write; merged with other commits in the debounce window."""
+        self.commits += 1
+        self._schedule()
+
+    async def flush(self) -> None:
+        """Write pending changes now and wait for the write to finish."""
+        self._cancel_timer()
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self._flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get write statistics.
+
+        Returns:
+            Dictionary with commits requested, writes done and writes skipped
+        """
+        return {
+            "commits": self.commits,
+            "writes": self.writes,
+            "skippedWrites": self.skipped_writes,
+            "dirtyKeys": sorted(self._dirty),
+        }
+
+    def _schedule(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (module import, scripts): write synchronously
+            self._write_now(*self._serialize())
+            return
+        if self._timer is None:
+            self._timer = loop.call_later(self.debounce, self._start_flush)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start_flush(self) -> None:
+        self._timer = None
+        if self._flush_task is not None and not self._flush_task.done():
+            # A write is in flight; retry once it is done
+            self._schedule()
+            return
+        self._flush_task = asyncio.ensure_future(self._flush())
+
+    def _serialize(self) -> Tuple[str, str]:
+        # Same format as SettingsManager.commit(); serialized on the loop so
+        # dicts are not mutated mid-dump
+        data = json.dumps(self._manager.settings, indent=4, ensure_ascii=False)
+        return data, hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    async def _flush(self) -> None:
+        data, digest = self._serialize()
+        self._dirty.clear()
+        if digest == self._written_hash:
+            self.skipped_writes += 1
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, _atomic_write, self._manager.path, data
+            )
+        except OSError as e:
+            print(f"CoalescingSettings: failed to write settings: {e}")
+            return
+        self._written_hash = digest
+        self.writes += 1
+
+    def _write_now(self, data: str, digest: str) -> None:
+        self._dirty.clear()
+        if digest == self._written_hash:
+            self.skipped_writes += 1
+            return
+        _atomic_write(self._manager.path, data)
+        self._written_hash = digest
+        self.writes += 1
+
+
+def _atomic_write(path: str, data: str) -> None:
+    """Write data to path via a fsynced temp file and rename."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
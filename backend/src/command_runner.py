@@ -0,0 +1,238 @@
+"""
+Command Runner - Shared execution layer for external commands
+
+TUNManager, KillSwitch and SystemProxyManager run ip, iptables, gsettings and
+friends through here. Every command:
+
+- runs with communicate() (stdout/stderr drained concurrently, so a full pipe
+  cannot deadlock the child) under a deadline, after which it is killed;
+- waits for a slot in a process-wide semaphore, so a burst of calls cannot
+  fork dozens of processes on the Deck at once;
+- is timed and counted per command name (e.g. "ip route", "iptables").
+
+run_batch() feeds many operations to one process on stdin (`ip -batch -`,
+`iptables-restore --noflush`), replacing one fork per rule or route.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .metrics import REGISTRY
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    "xray_decky_command_seconds", "External command latency", ("command",)
+)
+COMMAND_FAILURES = REGISTRY.counter(
+    "xray_decky_command_failures",
+    "External commands that failed",
+    ("command", "reason"),
+)
+
+
+def _command_name(argv: Sequence[str]) -> str:
+    """Stats key: program plus its subcommand ('ip route', 'gsettings set')."""
+    program = os.path.basename(argv[0]) if argv else "?"
+    for arg in argv[1:]:
+        if not arg.startswith("-"):
+            return f"{program} {arg}"
+    return program
+
+
+class CommandResult:
+    """Outcome of one command."""
+
+    def __init__(
+        self,
+        returncode: int,
+        stdout: str = "",
+        stderr: str = "",
+        duration: float = 0.0,
+        timed_out: bool = False,
+        not_found: bool = False,
+    ):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+        self.not_found = not_found
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    def error(self, default: str = "Unknown error") -> str:
+        """Best error text for a failed command."""
+        return (self.stderr or self.stdout).strip() or default
+
+    def __repr__(self) -> str:
+        return f"CommandResult(returncode={self.returncode}, duration={self.duration:.3f})"
+
+
+class CommandRunner:
+    """
+    Runs external commands with deadlines, a concurrency limit and stats.
+
+    Responsibilities:
+    - communicate() with timeout; kill and reap on expiry
+    - Global concurrency limit (semaphore)
+    - Per-command latency and failure counters (also exported as metrics)
+    - Batched execution over stdin
+    """
+
+    MAX_CONCURRENCY = 4
+    DEFAULT_TIMEOUT = 10.0
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, default_timeout: float = DEFAULT_TIMEOUT):
+        """
+        Initialize CommandRunner.
+
+        Args:
+            max_concurrency: Commands allowed to run at the same time
+            default_timeout: Deadline in seconds when run() gets none
+        """
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _slot(self) -> asyncio.Semaphore:
+        # Created lazily so the runner can be built at import time, and per
+        # event loop (a semaphore is bound to the loop it first waited on)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def run(
+        self,
+        argv: Sequence[str],
+        timeout: Optional[float] = None,
+        stdin: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> CommandResult:
+        """
+        Run a command to completion.
+
+        Args:
+            argv: Program and arguments
+            timeout: Deadline in seconds (default_timeout if None)
+            stdin: Text fed to the process's stdin
+            env: Environment (inherited if None)
+
+        Returns:
+            CommandResult; never raises for a missing program, a timeout or a
+            non-zero exit (returncode 127 / -1 / exit code)
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        name = _command_name(argv)
+        async with self._slot():
+            started_at = time.monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=env,
+                )
+            except FileNotFoundError:
+                result = CommandResult(127, stderr=f"{argv[0]} command not found", not_found=True)
+                self._record(name, result)
+                return result
+            except OSError as e:
+                result = CommandResult(-1, stderr=str(e))
+                self._record(name, result)
+                return result
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(stdin.encode("utf-8") if stdin is not None else None),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                result = CommandResult(
+                    -1,
+                    stderr=f"{name} timed out after {timeout:.1f}s",
+                    duration=time.monotonic() - started_at,
+                    timed_out=True,
+                )
+                self._record(name, result)
+                return result
+            except asyncio.CancelledError:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+        result = CommandResult(
+            process.returncode,
+            stdout.decode("utf-8", errors="ignore"),
+            stderr.decode("utf-8", errors="ignore"),
+            duration=time.monotonic() - started_at,
+        )
+        self._record(name, result)
+        return result
+
+    async def run_batch(
+        self, argv: Sequence[str], lines: Iterable[str], timeout: Optional[float] = None
+    ) -> CommandResult:
+        """
+        Run one process that reads its operations from stdin, e.g.
+        ["ip", "-force", "-batch", "-"] or ["iptables-restore", "--noflush"].
+
+        Args:
+            argv: Batch-mode command
+            lines: One operation per line
+            timeout: Deadline for the whole batch
+        """
+        return await self.run(argv, timeout=timeout, stdin="".join(f"{line}\n" for line in lines))
+
+    async def run_many(
+        self, commands: Iterable[Sequence[str]], timeout: Optional[float] = None
+    ) -> List[CommandResult]:
+        """Run independent commands concurrently (still bounded by the semaphore), in order."""
+        return list(await asyncio.gather(*(self.run(argv, timeout=timeout) for argv in commands)))
+
+    def _record(self, name: str, result: CommandResult) -> None:
+        stats = self._stats.setdefault(
+            name,
+            {"calls": 0, "failures": 0, "timeouts": 0, "totalMs": 0.0, "maxMs": 0.0},
+        )
+        stats["calls"] += 1
+        duration_ms = result.duration * 1000
+        stats["totalMs"] += duration_ms
+        stats["maxMs"] = max(stats["maxMs"], duration_ms)
+        COMMAND_SECONDS.observe(result.duration, command=name)
+        if not result.ok:
+            stats["failures"] += 1
+            if result.timed_out:
+                stats["timeouts"] += 1
+            reason = "timeout" if result.timed_out else "not_found" if result.not_found else "exit"
+            COMMAND_FAILURES.inc(command=name, reason=reason)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-command statistics.
+
+        Returns:
+            {command: {'calls', 'failures', 'timeouts', 'avgMs', 'maxMs'}}
+        """
+        return {
+            name: {
+                "calls": stats["calls"],
+                "failures": stats["failures"],
+                "timeouts": stats["timeouts"],
+                "avgMs": round(stats["totalMs"] / stats["calls"], 1) if stats["calls"] else 0.0,
+                "maxMs": round(stats["maxMs"], 1),
+            }
+            for name, stats in sorted(self._stats.items())
+        }
+
+
+# Shared by all managers so the concurrency limit is global
+DEFAULT_RUNNER = CommandRunner()
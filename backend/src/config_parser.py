@@ -140,15 +140,15 @@ def parse_vless_url(url: str) -> Optional[Dict[str, Any]]:
     }
 
 
-def parse_subscription_url(url: str) -> List[Dict[str, Any]]:
+def subscription_links(url: str) -> List[str]:
     """
-    Parse a subscription URL (base64-encoded JSON array).
+    Decode a subscription URL (base64-encoded JSON array) into its entries.
 
     Args:
         url: Base64-encoded JSON array of VLESS URLs
 
     Returns:
-        List of parsed VLESS configurations, empty list if invalid
+        List of entry strings (not validated), empty list if not a subscription
     """
     try:
         # Decode base64
@@ -157,21 +157,31 @@ def parse_subscription_url(url: str) -> List[Dict[str, Any]]:
 
         # Parse JSON
         configs = json.loads(decoded_str)
+    except (base64.binascii.Error, json.JSONDecodeError, UnicodeDecodeError, TypeError, ValueError):
+        return []
 
-        if not isinstance(configs, list):
-            return []
+    if not isinstance(configs, list):
+        return []
+    return [config_url for config_url in configs if isinstance(config_url, str)]
 
-        # Parse each VLESS URL in the array
-        parsed_configs = []
-        for config_url in configs:
-            if isinstance(config_url, str):
-                parsed = parse_vless_url(config_url)
-                if parsed:
-                    parsed_configs.append(parsed)
 
-        return parsed_configs
-    except (base64.binascii.Error, json.JSONDecodeError, UnicodeDecodeError, TypeError):
-        return []
+def parse_subscription_url(url: str) -> List[Dict[str, Any]]:
+    """
+    Parse a subscription URL (base64-encoded JSON array).
+
+    Args:
+        url: Base64-encoded JSON array of VLESS URLs
+
+    Returns:
+        List of parsed VLESS configurations, empty list if invalid
+    """
+    # Parse each VLESS URL in the array
+    parsed_configs = []
+    for config_url in subscription_links(url):
+        parsed = parse_vless_url(config_url)
+        if parsed:
+            parsed_configs.append(parsed)
+    return parsed_configs
 
 
 def validate_vless_url(url: str) -> tuple[bool, Optional[str]]:
@@ -242,6 +252,9 @@ def build_vless_config(
         config["network"] = params.get("type") or params.get("network")
     if "security" in params:
         config["security"] = params["security"]
+    # XUDP mux is opt-in per node (mux=1) or globally (xudp setting)
+    if params.get("mux", "").lower() in ("1", "true"):
+        config["mux"] = True
 
     # Extract Reality-specific fields
     if config.get("security") == "reality":
@@ -38,6 +38,9 @@ class ConnectionState:
     def __init__(self):
         self.status: ConnectionStatus = ConnectionStatus.DISCONNECTED
         self.connected_at: Optional[float] = None
+        # CLOCK_MONOTONIC at connect; it stops during suspend, so uptime
+        # excludes time the device was asleep
+        self.connected_monotonic: Optional[float] = None
         self.disconnected_at: Optional[float] = None
         self.error_message: Optional[str] = None
         self.error_code: Optional[str] = None
@@ -58,7 +61,7 @@ class ConnectionState:
         if self.connected_at:
             result["connectedAt"] = int(self.connected_at)
             if self.status == ConnectionStatus.CONNECTED:
-                result["uptime"] = int(time.time() - self.connected_at)
+                result["uptime"] = int(time.monotonic() - self.connected_monotonic)
 
         if self.disconnected_at:
             result["disconnectedAt"] = int(self.disconnected_at)
@@ -83,10 +86,18 @@ class ConnectionState:
         self.error_message = None
         self.error_code = None
 
-    def set_connected(self, process_id: int, config_path: str, config: Dict[str, Any]):
-        """Set status to connected."""
+    def set_connected(
+        self,
+        process_id: int,
+        config_path: str,
+        config: Dict[str, Any],
+        connected_at: Optional[float] = None,
+    ):
+        """Set status to connected (connected_at defaults to now)."""
         self.status = ConnectionStatus.CONNECTED
-        self.connected_at = time.time()
+        now = time.time()
+        self.connected_at = connected_at or now
+        self.connected_monotonic = time.monotonic() - max(0.0, now - self.connected_at)
         self.disconnected_at = None
         self.xray_process_id = process_id
         self.xray_config_path = config_path
@@ -94,6 +105,14 @@ class ConnectionState:
         self.error_message = None
         self.error_code = None
 
+    def update_process(
+        self, process_id: int, config_path: str, config: Dict[str, Any]
+    ):
+        """Record a replaced xray-core process while staying connected."""
+        self.xray_process_id = process_id
+        self.xray_config_path = config_path
+        self.active_config = config
+
     def set_disconnected(self):
         """Set status to disconnected."""
         self.status = ConnectionStatus.DISCONNECTED
@@ -148,8 +167,8 @@ def load_connection_state_from_settings(settings: "SettingsManager") -> None:
             status_str, ConnectionStatus.DISCONNECTED
         )
 
-        # Note: Process ID and config path are not persisted (recreated on restart)
-        # Only status is persisted for UI restoration
+        # Note: Process ID and config path are not persisted here; a running
+        # xray-core is re-attached from its pidfile (XrayManager.adopt)
     except Exception as e:
         print(f"Warning: Failed to load connection state from settings: {e}")
         # Default to disconnected on error
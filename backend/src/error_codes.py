@@ -23,6 +23,7 @@ class ErrorCode:
     VALIDATION_ERROR = "VALIDATION_ERROR"
     NOT_CONNECTED = "NOT_CONNECTED"
     CONNECTION_ACTIVE = "CONNECTION_ACTIVE"
+    UNSUPPORTED_FEATURE = "UNSUPPORTED_FEATURE"
 
 
 # User-friendly error messages
@@ -39,6 +40,7 @@ ERROR_MESSAGES: Dict[str, str] = {
     ErrorCode.VALIDATION_ERROR: "Configuration validation failed. Please check your VLESS URL format.",
     ErrorCode.NOT_CONNECTED: "System proxy requires active connection. Please connect first.",
     ErrorCode.CONNECTION_ACTIVE: "Disconnect before resetting configuration.",
+    ErrorCode.UNSUPPORTED_FEATURE: "The installed xray-core does not support this feature. Please update xray-core.",
 }
 
 
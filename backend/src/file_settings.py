@@ -0,0 +1,58 @@
+"""
+File Settings - JSON-file SettingsManager for running outside Decky Loader
+
+Decky Loader provides a `settings` module with SettingsManager. The headless
+daemon (backend/src/headless.py) has no Decky, so main.py falls back to this
+class: same constructor, attributes and methods, same on-disk format
+(<settings_directory>/<name>.json), so a settings directory can be shared with
+a Decky install.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+class SettingsManager:
+    """
+    Drop-in for Decky's SettingsManager backed by one JSON file.
+
+    Responsibilities:
+    - Load <name>.json into .settings (missing or unreadable file -> empty)
+    - Write .settings back on commit()/setSetting()
+    """
+
+    def __init__(self, name: str, settings_directory: Optional[str] = None):
+        """
+        Initialize SettingsManager.
+
+        Args:
+            name: File name without .json
+            settings_directory: Directory for the file (created if missing)
+        """
+        settings_directory = settings_directory or os.getcwd()
+        os.makedirs(settings_directory, exist_ok=True)
+        self.path = os.path.join(settings_directory, f"{name}.json")
+        self.settings: Dict[str, Any] = {}
+
+    def read(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.settings = json.load(f)
+        except FileNotFoundError:
+            self.settings = {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"FileSettings: cannot read {self.path}: {e}")
+            self.settings = {}
+
+    def commit(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.settings, f, indent=4, ensure_ascii=False)
+
+    def getSetting(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+    def setSetting(self, key: str, value: Any) -> Any:
+        self.settings[key] = value
+        self.commit()
+        return value
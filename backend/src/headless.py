@@ -0,0 +1,417 @@
+"""
+Headless - Run the plugin backend outside Decky Loader
+
+`daemon` hosts main.Plugin behind a JSON-RPC server on a Unix socket; the
+other commands are a thin client for it. Settings live in a JSON file (see
+file_settings.py), so connect/disconnect can be scripted from a shell in
+desktop mode and connect latency benchmarked repeatably:
+
+    python -m backend.src.headless daemon &
+    python -m backend.src.headless connect
+    python -m backend.src.headless bench --cycles 50
+
+Protocol: one JSON object per line. Request {"id", "method", "params"}
+(params: object of keyword arguments or array of positional ones); response
+{"id", "result"} or {"id", "error": {"message"}}. Only public Plugin
+methods can be called. The socket is created with mode 0600.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import inspect
+import json
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Self, Sequence
+
+PLUGIN_DIR = Path(__file__).resolve().parents[2]
+
+# Requests larger than this are rejected (a VLESS config is a few KB)
+MAX_REQUEST_BYTES = 1024 * 1024
+
+
+def _xdg_dir(variable: str, fallback: str) -> Path:
+    return Path(os.environ.get(variable) or Path.home() / fallback) / "xray-decky"
+
+
+def default_socket_path() -> str:
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return str(Path(runtime) / "xray-decky.sock")
+    return str(_xdg_dir("XDG_CACHE_HOME", ".cache") / "daemon.sock")
+
+
+def percentiles(values: Sequence[float]) -> Dict[str, float]:
+    """
+    Nearest-rank p50/p95/p99 and max of a sample.
+
+    Returns:
+        {'count', 'p50', 'p95', 'p99', 'max'} (zeros for an empty sample)
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    def rank(q: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(-(-q * len(ordered) // 100)) - 1))
+        return ordered[index]
+
+    return {
+        "count": len(ordered),
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": ordered[-1],
+    }
+
+
+def load_plugin_module(
+    settings_dir: Optional[str] = None,
+    runtime_dir: Optional[str] = None,
+    xray_binary: Optional[str] = None,
+):
+    """
+    Import main.py with the environment Decky Loader would provide.
+
+    Args:
+        settings_dir: DECKY_PLUGIN_SETTINGS_DIR (default ~/.config/xray-decky)
+        runtime_dir: DECKY_PLUGIN_RUNTIME_DIR (default ~/.cache/xray-decky/runtime)
+        xray_binary: xray-core to run instead of the bundled one
+
+    Returns:
+        The imported main module
+    """
+    os.environ["DECKY_PLUGIN_SETTINGS_DIR"] = settings_dir or os.environ.get(
+        "DECKY_PLUGIN_SETTINGS_DIR"
+    ) or str(_xdg_dir("XDG_CONFIG_HOME", ".config"))
+    os.environ["DECKY_PLUGIN_RUNTIME_DIR"] = runtime_dir or os.environ.get(
+        "DECKY_PLUGIN_RUNTIME_DIR"
+    ) or str(_xdg_dir("XDG_CACHE_HOME", ".cache") / "runtime")
+    if xray_binary:
+        os.environ["XRAY_DECKY_XRAY_BINARY"] = xray_binary
+    for directory in (os.environ["DECKY_PLUGIN_SETTINGS_DIR"], os.environ["DECKY_PLUGIN_RUNTIME_DIR"]):
+        os.makedirs(directory, exist_ok=True)
+    if str(PLUGIN_DIR) not in sys.path:
+        sys.path.insert(0, str(PLUGIN_DIR))
+    return importlib.import_module("main")
+
+
+class RpcServer:
+    """
+    JSON-RPC over a Unix socket in front of a Plugin instance.
+
+    Responsibilities:
+    - Accept line-delimited requests; one connection may send many
+    - Dispatch to public coroutine methods of the plugin
+    - Report unknown methods, bad params and exceptions as errors
+    """
+
+    def __init__(self, plugin: Any, socket_path: str):
+        """
+        Initialize RpcServer.
+
+        Args:
+            plugin: main.Plugin instance (after _main)
+            socket_path: Unix socket to listen on (replaced if stale)
+        """
+        self.plugin = plugin
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests: int = 0
+
+    def methods(self) -> List[str]:
+        return sorted(
+            name
+            for name, member in inspect.getmembers(type(self.plugin))
+            if not name.startswith("_") and inspect.iscoroutinefunction(member)
+        )
+
+    async def start(self) -> None:
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        # Restrictive umask while binding: the socket controls iptables/routes
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=self.socket_path, limit=MAX_REQUEST_BYTES
+            )
+        finally:
+            os.umask(old_umask)
+        print(f"Headless: listening on {self.socket_path}")
+
+    async def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+
+    async def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one request; never raises."""
+        request_id = request.get("id")
+        method_name = request.get("method")
+        params = request.get("params") or {}
+        if not isinstance(method_name, str) or method_name not in self.methods():
+            return {"id": request_id, "error": {"message": f"Unknown method: {method_name}"}}
+        method = getattr(self.plugin, method_name)
+        self.requests += 1
+        try:
+            if isinstance(params, list):
+                result = await method(*params)
+            elif isinstance(params, dict):
+                result = await method(**params)
+            else:
+                return {"id": request_id, "error": {"message": "params must be an object or array"}}
+        except TypeError as e:
+            return {"id": request_id, "error": {"message": f"Bad params for {method_name}: {e}"}}
+        except Exception as e:
+            print(f"Headless: {method_name} raised: {e}")
+            return {"id": request_id, "error": {"message": f"{method_name} failed: {e}"}}
+        return {"id": request_id, "result": result}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    response = {"id": None, "error": {"message": "Request too large"}}
+                    writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise TypeError("request must be an object")
+                except (ValueError, TypeError) as e:
+                    response = {"id": None, "error": {"message": f"Invalid request: {e}"}}
+                else:
+                    response = await self.dispatch(request)
+                writer.write(json.dumps(response, default=str).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+class RpcError(Exception):
+    """Daemon unreachable or the call returned an error."""
+
+
+class RpcClient:
+    """Client side of RpcServer; one connection for many calls."""
+
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        """
+        Initialize RpcClient.
+
+        Args:
+            socket_path: Daemon socket
+            timeout: Seconds to wait for each response
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._next_id = 0
+
+    async def __aenter__(self) -> Self:
+        try:
+            self._reader, self._writer = await asyncio.open_unix_connection(
+                self.socket_path, limit=MAX_REQUEST_BYTES
+            )
+        except OSError as e:
+            raise RpcError(f"Cannot reach daemon at {self.socket_path}: {e}") from e
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def call(self, method: str, params: Any = None) -> Any:
+        """Call a Plugin method; returns its result dict."""
+        if self._writer is None or self._reader is None:
+            raise RpcError("Not connected: use RpcClient in 'async with'")
+        self._next_id += 1
+        request = {"id": self._next_id, "method": method, "params": params or {}}
+        self._writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+        if not line:
+            raise RpcError("Daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RpcError(response["error"].get("message", "Unknown error"))
+        return response.get("result")
+
+
+async def serve(socket_path: str, plugin_module: Any) -> None:
+    """Run Plugin._main, serve until SIGINT/SIGTERM, then Plugin._unload."""
+    plugin = plugin_module.Plugin()
+    await plugin._main()
+    server = RpcServer(plugin, socket_path)
+    await server.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        print("Headless: shutting down")
+        await server.stop()
+        await plugin._unload()
+
+
+async def bench(client: RpcClient, cycles: int, warmup: int = 0) -> Dict[str, Any]:
+    """
+    Time connect/disconnect cycles through the daemon.
+
+    Args:
+        client: Connected RpcClient
+        cycles: Measured connect+disconnect cycles
+        warmup: Unmeasured cycles run first (caches, page cache)
+
+    Returns:
+        {'cycles', 'failures', 'operations': {op: {'wallMs': stats,
+         'totalMs': stats, 'phases': {phase: stats}}}}; stats from percentiles()
+    """
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    failures = 0
+    for cycle in range(warmup + cycles):
+        for operation, enable in (("connect", True), ("disconnect", False)):
+            started_at = time.monotonic()
+            result = await client.call("toggle_connection", {"enable": enable})
+            wall_ms = (time.monotonic() - started_at) * 1000
+            if not result.get("success"):
+                failures += 1
+                print(f"Headless: {operation} failed: {result.get('error')}", file=sys.stderr)
+                continue
+            if cycle < warmup:
+                continue
+            op_samples = samples.setdefault(operation, {})
+            op_samples.setdefault("wallMs", []).append(wall_ms)
+            timings = result.get("timings") or {}
+            if "totalMs" in timings:
+                op_samples.setdefault("totalMs", []).append(timings["totalMs"])
+            for phase, ms in (timings.get("phases") or {}).items():
+                op_samples.setdefault(f"phase:{phase}", []).append(ms)
+    operations = {}
+    for operation, op_samples in samples.items():
+        operations[operation] = {
+            "wallMs": percentiles(op_samples.get("wallMs", [])),
+            "totalMs": percentiles(op_samples.get("totalMs", [])),
+            "phases": {
+                key.split(":", 1)[1]: percentiles(values)
+                for key, values in op_samples.items()
+                if key.startswith("phase:")
+            },
+        }
+    return {"cycles": cycles, "failures": failures, "operations": operations}
+
+
+def format_bench(report: Dict[str, Any]) -> str:
+    """Human-readable table of a bench() report."""
+    lines = [f"{report['cycles']} cycles, {report['failures']} failed calls"]
+    header = f"{'':28}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  ms"
+    for operation, data in report["operations"].items():
+        lines.extend(["", operation, header])
+        rows = [("wall (client)", data["wallMs"]), ("total (server)", data["totalMs"])]
+        rows += [(f"  {phase}", stats) for phase, stats in sorted(data["phases"].items())]
+        for label, stats in rows:
+            lines.append(
+                f"{label:28}"
+                + "".join(f"{stats[key]:>9.1f}" for key in ("p50", "p95", "p99", "max"))
+            )
+    return "\n".join(lines)
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.src.headless",
+        description="Run the Xray Decky backend without Decky Loader.",
+    )
+    parser.add_argument("--socket", default=default_socket_path(), help="Daemon Unix socket")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    daemon = commands.add_parser("daemon", help="Host the plugin backend")
+    daemon.add_argument("--settings-dir", help="Directory for settings.json")
+    daemon.add_argument("--runtime-dir", help="Directory for configs, logs and certs")
+    daemon.add_argument("--xray", help="xray-core binary (default: bundled)")
+
+    commands.add_parser("connect", help="Connect (toggle_connection true)")
+    commands.add_parser("disconnect", help="Disconnect (toggle_connection false)")
+    commands.add_parser("status", help="Connection status")
+    commands.add_parser("probe", help="xray-core capabilities and TUN privileges")
+
+    bench_parser = commands.add_parser("bench", help="Time connect/disconnect cycles")
+    bench_parser.add_argument("--cycles", type=int, default=20)
+    bench_parser.add_argument("--warmup", type=int, default=1)
+    bench_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    call = commands.add_parser("call", help="Call any Plugin method")
+    call.add_argument("method")
+    call.add_argument("params", nargs="?", default="{}", help="JSON object or array")
+    return parser.parse_args(argv)
+
+
+async def _run_client(args: argparse.Namespace) -> int:
+    async with RpcClient(args.socket) as client:
+        if args.command == "bench":
+            report = await bench(client, args.cycles, args.warmup)
+            print(json.dumps(report, indent=2) if args.json else format_bench(report))
+            return 1 if report["failures"] else 0
+        if args.command == "probe":
+            result = {
+                "capabilities": await client.call("get_xray_capabilities"),
+                "tunPrivileges": await client.call("check_tun_privileges"),
+            }
+        elif args.command == "call":
+            result = await client.call(args.method, json.loads(args.params))
+        else:
+            method, params = {
+                "connect": ("toggle_connection", {"enable": True}),
+                "disconnect": ("toggle_connection", {"enable": False}),
+                "status": ("get_connection_status", {}),
+            }[args.command]
+            result = await client.call(method, params)
+    print(json.dumps(result, indent=2))
+    failed = isinstance(result, dict) and result.get("success") is False
+    return 1 if failed else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.command == "daemon":
+        plugin_module = load_plugin_module(args.settings_dir, args.runtime_dir, args.xray)
+        asyncio.run(serve(args.socket, plugin_module))
+        return 0
+    try:
+        return asyncio.run(_run_client(args))
+    except RpcError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,98 @@
 """
 Import HTTP server for VLESS link import via web form.
 
-Serves GET /import (HTML form), GET /import/static/* (CSS/JS), POST /import (validate and store VLESS).
+Serves GET /import (HTML form), GET /import/static/* (CSS/JS), POST /import (validate and store VLESS),
+POST /import/batch (many links/subscriptions into the node store, NDJSON progress),
+GET /status (read-only dashboard) and GET /status/events (Server-Sent Events).
+The server is started on demand (ImportServer.ensure_started) and stops itself
+after an idle period, so no LAN port is open while the import page is unused.
 Contract: specs/002-vless-import-qr/contracts/import-http-api.md
 """
 
+import asyncio
+import json
+import ssl
 import time
 from pathlib import Path
-from typing import Awaitable, Callable, Optional
+from typing import AsyncIterator, Awaitable, Callable, Optional
 
 from aiohttp import web
 
+from .node_store import NodeStore, probe_latency
+from .static_assets import StaticAssetCache
+from .status_broadcaster import StatusBroadcaster
+from .cert_utils import ensure_cert_key, generate_cert_key, needs_renewal
 from .config_parser import (
     validate_vless_url,
     parse_vless_url,
     parse_subscription_url,
+    subscription_links,
     build_vless_config,
 )
 
+# POST /import/batch limits
+MAX_BATCH_ITEMS = 1000
+MAX_LINE_BYTES = 1024 * 1024
+BATCH_PROBE_CONCURRENCY = 8
+# SSE comment sent when no event arrived for this long (keeps proxies/NAT open)
+SSE_KEEPALIVE = 15.0
+
+
+async def _iter_lines(content) -> AsyncIterator[bytes]:
+    """Lines of a request body as they arrive (no line length limit below MAX_LINE_BYTES)."""
+    buffer = b""
+    async for chunk in content.iter_chunked(64 * 1024):
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError("Line too long")
+    if buffer:
+        yield buffer
+
 
 def create_import_app(
     settings,
     static_dir: Path,
     on_vless_saved: Optional[Callable[[], Awaitable[None]]] = None,
+    on_request: Optional[Callable[[], None]] = None,
+    assets: Optional[StaticAssetCache] = None,
+    nodes: Optional[NodeStore] = None,
+    status: Optional[StatusBroadcaster] = None,
 ) -> web.Application:
-    """Create aiohttp app for import page. static_dir: path to backend/static."""
-    app = web.Application()
+    """
+    Create aiohttp app for import page. static_dir: path to backend/static.
+    on_request is called for every request (idle tracking). assets: shared
+    in-memory asset cache (created for static_dir if not given). nodes: node
+    store for batch imports (created on settings if not given). status: live
+    status broadcaster; /status routes are only added when given.
+    """
+    if assets is None:
+        assets = StaticAssetCache(static_dir)
+    if nodes is None:
+        nodes = NodeStore(settings)
+    middlewares = []
+    if on_request is not None:
+
+        @web.middleware
+        async def track_activity(request: web.Request, handler):
+            on_request()
+            return await handler(request)
 
-    async def get_import_page(_request: web.Request) -> web.StreamResponse:
+        middlewares.append(track_activity)
+    app = web.Application(middlewares=middlewares)
+
+    async def get_import_page(request: web.Request) -> web.StreamResponse:
         """GET /import — serve import page HTML. Same form when opened directly (no redirect or auth)."""
-        html_path = static_dir / "import.html"
-        if not html_path.is_file():
+        response = await assets.response(request, "import.html")
+        if response.status == 404:
             return web.Response(status=404, text="import.html not found")
-        return web.FileResponse(html_path, headers={"Content-Type": "text/html"})
+        return response
+
+    async def get_static(request: web.Request) -> web.StreamResponse:
+        """GET /import/static/{path} — CSS/images from memory (compressed, ETag)."""
+        return await assets.response(request, request.match_info["path"])
 
     async def post_import(request: web.Request) -> web.Response:
         """
@@ -115,8 +175,388 @@ def create_import_app(
                 status=500,
             )
 
+    async def post_import_batch(request: web.Request) -> web.StreamResponse:
+        """
+        POST /import/batch — many VLESS links and/or base64 subscriptions, one per
+        line (plain text, or NDJSON objects with a "link" field), parsed as the
+        body arrives. Every node is stored in the node store (vlessConfig is only
+        set if none exists yet). Streams one NDJSON line per node:
+        { item, status: added|duplicate|invalid|full, id?, name?, error?, latencyMs? }
+        and a final { done: true, added, duplicate, invalid, full }.
+        ?probe=1 adds the TCP connect latency of each node.
+        """
+        probe = request.query.get("probe", "").lower() in ("1", "true", "yes")
+        response = web.StreamResponse(
+            headers={"Content-Type": "application/x-ndjson", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+
+        # Bounded: parsing waits for the client to read results (backpressure)
+        results: asyncio.Queue = asyncio.Queue(maxsize=64)
+        semaphore = asyncio.Semaphore(BATCH_PROBE_CONCURRENCY)
+        imported_at = int(time.time())
+
+        async def probed(config) -> Optional[int]:
+            async with semaphore:
+                return await probe_latency(config["address"], config["port"])
+
+        def invalid(item: int, error: str):
+            return {"item": item, "status": "invalid", "error": error}, None
+
+        async def read_items() -> None:
+            item = 0
+            try:
+                async for raw in _iter_lines(request.content):
+                    text = raw.decode("utf-8", errors="replace").strip()
+                    if not text:
+                        continue
+                    item += 1
+                    if item > MAX_BATCH_ITEMS:
+                        await results.put(invalid(item, "Too many items"))
+                        return
+                    if text.startswith("{"):
+                        try:
+                            text = str((json.loads(text) or {}).get("link", "")).strip()
+                        except (ValueError, AttributeError):
+                            text = ""
+                    if text.lower().startswith("vless://"):
+                        entries = [(text, "single")]
+                    else:
+                        entries = [(link, "subscription") for link in subscription_links(text)]
+                    if not entries:
+                        await results.put(invalid(item, "Invalid VLESS URL format"))
+                        continue
+                    for link, config_type in entries:
+                        parsed = parse_vless_url(link)
+                        if not parsed:
+                            await results.put(invalid(item, "Invalid VLESS URL format"))
+                            continue
+                        config = build_vless_config(parsed, link, config_type)
+                        config["lastValidatedAt"] = imported_at
+                        nid, status = nodes.add(config)
+                        result = {
+                            "item": item,
+                            "status": status,
+                            "id": nid,
+                            "name": config.get("name"),
+                            "address": config["address"],
+                            "port": config["port"],
+                        }
+                        task = (
+                            asyncio.ensure_future(probed(config))
+                            if probe and status != "full"
+                            else None
+                        )
+                        await results.put((result, task))
+            except Exception as e:
+                await results.put(invalid(item, str(e)))
+            finally:
+                await results.put(None)
+
+        counts = {"added": 0, "duplicate": 0, "invalid": 0, "full": 0}
+        first_added = None
+        reader = asyncio.ensure_future(read_items())
+        try:
+            while True:
+                entry = await results.get()
+                if entry is None:
+                    break
+                result, task = entry
+                if task is not None:
+                    result["latencyMs"] = await task
+                counts[result["status"]] += 1
+                if result["status"] == "added" and first_added is None:
+                    first_added = result["id"]
+                await response.write((json.dumps(result) + "\n").encode("utf-8"))
+        finally:
+            reader.cancel()
+            while not results.empty():
+                entry = results.get_nowait()
+                if entry is not None and entry[1] is not None:
+                    entry[1].cancel()
+
+        if first_added is not None:
+            if not settings.getSetting("vlessConfig", None):
+                settings.setSetting("vlessConfig", nodes.config_for(first_added))
+                settings.commit()
+            if on_vless_saved is not None:
+                await on_vless_saved()
+
+        await response.write((json.dumps({"done": True, **counts}) + "\n").encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def get_status_page(request: web.Request) -> web.StreamResponse:
+        """GET /status — read-only dashboard (connection state, throughput)."""
+        return await assets.response(request, "status.html")
+
+    async def get_status_events(request: web.Request) -> web.StreamResponse:
+        """
+        GET /status/events — Server-Sent Events: 'status' (ConnectionState
+        without uptime, on change) and 'throughput' (per-second rates).
+        """
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            }
+        )
+        await response.prepare(request)
+        queue = status.subscribe()
+        try:
+            while True:
+                if on_request is not None:
+                    # An open dashboard counts as activity for the idle timer,
+                    # also while nothing changes and only keepalives are sent
+                    on_request()
+                try:
+                    item = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                if item is None:
+                    break
+                event, data = item
+                await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            status.unsubscribe(queue)
+        return response
+
     app.router.add_get("/import", get_import_page)
     app.router.add_post("/import", post_import)
-    app.router.add_routes([web.static("/import/static", str(static_dir))])
+    app.router.add_post("/import/batch", post_import_batch)
+    if status is not None:
+        app.router.add_get("/status", get_status_page)
+        app.router.add_get("/status/events", get_status_events)
+    app.router.add_get("/import/static/{path:.+}", get_static)
 
     return app
+
+
+class ImportServer:
+    """
+    Import HTTPS server started on first use and stopped when idle.
+
+    Responsibilities:
+    - Load/generate the TLS cert and bind 0.0.0.0 on demand (port, port+1, ...)
+    - Keep the static asset cache, node store and one SSLContext (session ticket keys) across restarts; renew the
+      cert in the background before it expires
+    - Track request activity and shut down after idle_timeout seconds
+    - Log bind time and idle shutdowns
+    """
+
+    DEFAULT_PORT = 8765
+    PORT_ATTEMPTS = 11  # try port, port+1, ... port+10
+    DEFAULT_IDLE_TIMEOUT = 600
+
+    def __init__(
+        self,
+        settings,
+        static_dir: Path,
+        runtime_dir: str,
+        on_vless_saved: Optional[Callable[[], Awaitable[None]]] = None,
+        nodes: Optional[NodeStore] = None,
+        status: Optional[StatusBroadcaster] = None,
+    ):
+        """
+        Initialize ImportServer.
+
+        Args:
+            settings: SettingsManager (importServer.port / idleTimeout, vlessConfig)
+            static_dir: Path to backend/static
+            runtime_dir: Directory for cert.pem/key.pem (DECKY_PLUGIN_RUNTIME_DIR)
+            on_vless_saved: Called after the import page saved a config
+            nodes: Node store for batch imports (default: on settings)
+            status: Live status broadcaster for /status (optional)
+        """
+        self.settings = settings
+        self.static_dir = Path(static_dir)
+        self.runtime_dir = runtime_dir
+        self.on_vless_saved = on_vless_saved
+        self.port: Optional[int] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._idle_task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._cert_lock = asyncio.Lock()
+        self._ssl: Optional[ssl.SSLContext] = None
+        self._renew_task: Optional[asyncio.Task] = None
+        self._assets = StaticAssetCache(self.static_dir)
+        self.nodes = nodes if nodes is not None else NodeStore(settings)
+        self.status = status
+        self._last_activity = time.monotonic()
+
+    def is_running(self) -> bool:
+        return self._runner is not None
+
+    def touch(self) -> None:
+        """Record activity (resets the idle timer)."""
+        self._last_activity = time.monotonic()
+
+    def _idle_timeout(self) -> float:
+        config = self.settings.getSetting("importServer", {})
+        return float(config.get("idleTimeout", self.DEFAULT_IDLE_TIMEOUT))
+
+    async def prepare_certificate(self) -> Optional[ssl.SSLContext]:
+        """
+        Load the TLS cert (self-signed, so Paste works from any device) into the
+        shared SSLContext, generating it in an executor if it is missing or
+        expired. A cert that is merely close to expiry is used as is and
+        renewed in the background.
+
+        Returns:
+            SSLContext, or None if the cert could not be created/loaded
+        """
+        if not self.runtime_dir:
+            return None
+        async with self._cert_lock:
+            if self._ssl is None:
+                loop = asyncio.get_running_loop()
+                try:
+                    cert_path, key_path = await loop.run_in_executor(
+                        None, ensure_cert_key, Path(self.runtime_dir), 0
+                    )
+                    self._ssl = _server_ssl_context(cert_path, key_path)
+                except Exception as e:
+                    print(f"Xray Decky Plugin: Import server TLS cert failed: {e}")
+                    return None
+        if self._renew_task is None or self._renew_task.done():
+            self._renew_task = asyncio.ensure_future(self._renew_if_due())
+        return self._ssl
+
+    async def _renew_if_due(self) -> None:
+        cert_path = Path(self.runtime_dir) / "cert.pem"
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, needs_renewal, cert_path):
+            return
+        async with self._cert_lock:
+            try:
+                cert_path, key_path = await loop.run_in_executor(
+                    None, generate_cert_key, Path(self.runtime_dir)
+                )
+                # New handshakes use the new cert; ticket keys are kept
+                self._ssl.load_cert_chain(str(cert_path), str(key_path))
+            except Exception as e:
+                print(f"Xray Decky Plugin: Import server cert renewal failed: {e}")
+                return
+        print("Xray Decky Plugin: Import server certificate renewed")
+
+    async def ensure_started(self) -> Optional[int]:
+        """
+        Start the server if it is not running.
+
+        Returns:
+            Bound port, or None if the server could not start
+        """
+        self.touch()
+        async with self._start_lock:
+            if self._runner is not None:
+                return self.port
+            return await self._start()
+
+    async def _start(self) -> Optional[int]:
+        if not self.runtime_dir:
+            print("Xray Decky Plugin: DECKY_PLUGIN_RUNTIME_DIR not set, import server not started")
+            return None
+        if not self.static_dir.is_dir():
+            print("Xray Decky Plugin: backend/static not found, import server not started")
+            return None
+
+        started_at = time.monotonic()
+        ssl_context = await self.prepare_certificate()
+        if ssl_context is None:
+            print("Xray Decky Plugin: Import server not started (no TLS cert)")
+            return None
+        await self._assets.load()
+
+        # ImportServerConfig: port from settings, default 8765, range 1024–65535.
+        # Bind to 0.0.0.0 so the import page is reachable from LAN (QR scan).
+        import_server_config = self.settings.getSetting("importServer", {"port": self.DEFAULT_PORT})
+        port = int(import_server_config.get("port", self.DEFAULT_PORT))
+        port = max(1024, min(65535, port))
+        for attempt in range(self.PORT_ATTEMPTS):
+            try_port = port + attempt
+            if try_port > 65535:
+                break
+            runner = web.AppRunner(
+                create_import_app(
+                    self.settings,
+                    self.static_dir,
+                    on_vless_saved=self.on_vless_saved,
+                    on_request=self.touch,
+                    assets=self._assets,
+                    nodes=self.nodes,
+                    status=self.status,
+                )
+            )
+            try:
+                await runner.setup()
+                site = web.TCPSite(runner, "0.0.0.0", try_port, ssl_context=ssl_context)
+                await site.start()
+            except OSError as e:
+                await runner.cleanup()
+                if attempt == 0:
+                    print(f"Xray Decky Plugin: Port {try_port} failed: {e}, trying next ports...")
+                continue
+
+            self._runner = runner
+            self.port = try_port
+            if try_port != port:
+                import_server_config["port"] = try_port
+                self.settings.setSetting("importServer", import_server_config)
+                self.settings.commit()
+            self.touch()
+            self._idle_task = asyncio.ensure_future(self._stop_when_idle())
+            print(
+                f"Xray Decky Plugin: Import server listening on 0.0.0.0:{try_port} (HTTPS), "
+                f"started in {(time.monotonic() - started_at) * 1000:.0f}ms"
+            )
+            return try_port
+
+        print(
+            f"Xray Decky Plugin: Import server could not start on ports {port}-{port + self.PORT_ATTEMPTS - 1}. "
+            "Check firewall or free a port."
+        )
+        return None
+
+    async def _stop_when_idle(self) -> None:
+        while True:
+            timeout = self._idle_timeout()
+            if self.status is not None and self.status.subscriber_count():
+                # An open /status/events stream keeps the server up
+                self.touch()
+            idle = time.monotonic() - self._last_activity
+            if idle >= timeout:
+                print(f"Xray Decky Plugin: Import server idle for {idle:.0f}s, stopping")
+                self._idle_task = None
+                await self.stop()
+                return
+            await asyncio.sleep(timeout - idle)
+
+    async def stop(self) -> None:
+        """Stop the server (no-op if not running). The SSLContext is kept."""
+        idle_task, self._idle_task = self._idle_task, None
+        if idle_task is not None and not idle_task.done():
+            idle_task.cancel()
+        runner, self._runner = self._runner, None
+        self.port = None
+        if self.status is not None:
+            # Let open /status/events streams end instead of waiting for them
+            self.status.disconnect_all()
+        if runner is not None:
+            await runner.cleanup()
+
+
+def _server_ssl_context(cert_path: Path, key_path: Path) -> ssl.SSLContext:
+    """Server context with session resumption enabled (tickets)."""
+    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
+    # TLS 1.2 session tickets; ticket keys live in the context, so reusing it
+    # across server restarts keeps resumption working for returning phones
+    ssl_context.options &= ~ssl.OP_NO_TICKET
+    # TLS 1.3 tickets issued per full handshake
+    ssl_context.num_tickets = 2
+    ssl_context.load_cert_chain(str(cert_path), str(key_path))
+    return ssl_context
@@ -2,11 +2,14 @@
 Kill Switch - Blocks all traffic when proxy disconnects unexpectedly
 
 Uses iptables rules to block all outgoing traffic except xray-core process.
+Rules are installed in one iptables-restore transaction (both or neither) and
+removed with iptables -D using the exact spec that was added.
 """
 
-import asyncio
 import time
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+
+from .command_runner import DEFAULT_RUNNER, CommandRunner
 
 
 class KillSwitch:
@@ -16,13 +19,35 @@ class KillSwitch:
     When activated, blocks all outgoing traffic except xray-core process.
     """
 
-    def __init__(self):
-        """Initialize KillSwitch."""
+    CHAIN = "OUTPUT"
+    COMMAND_TIMEOUT = 5.0
+
+    def __init__(self, runner: Optional[CommandRunner] = None):
+        """
+        Initialize KillSwitch.
+
+        Args:
+            runner: Command runner for iptables (default: the shared runner)
+        """
+        self.runner = runner or DEFAULT_RUNNER
         self.is_active: bool = False
         self.activated_at: Optional[float] = None
         self.rule_ids: List[str] = []
+        # (rule id, rule spec after the chain name) in insertion order
+        self._rules: List[Tuple[str, List[str]]] = []
         self.xray_process_id: Optional[int] = None
 
+    def _rule_specs(self, xray_process_id: int) -> List[Tuple[str, List[str]]]:
+        return [
+            # Rule 1: Allow xray-core process
+            (
+                f"xray-allow-{xray_process_id}",
+                ["-m", "owner", "--pid-owner", str(xray_process_id), "-j", "ACCEPT"],
+            ),
+            # Rule 2: Block all other traffic
+            ("kill-switch-block-all", ["-j", "DROP"]),
+        ]
+
     async def activate(self, xray_process_id: int) -> Dict[str, Any]:
         """
         Activate kill switch - block all traffic except xray-core.
@@ -41,47 +66,20 @@ class KillSwitch:
 
             self.xray_process_id = xray_process_id
 
-            # Apply iptables rules
-            # Rule 1: Allow xray-core process
-            rule1_result = await self._apply_rule(
-                [
-                    "iptables",
-                    "-A",
-                    "OUTPUT",
-                    "-m",
-                    "owner",
-                    "--pid-owner",
-                    str(xray_process_id),
-                    "-j",
-                    "ACCEPT",
-                ],
-                f"xray-allow-{xray_process_id}",
-            )
-
-            if not rule1_result["success"]:
-                return {
-                    "success": False,
-                    "error": f"Failed to apply allow rule: {rule1_result.get('error')}",
-                    "errorCode": "IPTABLES_FAILED",
-                }
-
-            # Rule 2: Block all other traffic
-            rule2_result = await self._apply_rule(
-                ["iptables", "-A", "OUTPUT", "-j", "DROP"], "kill-switch-block-all"
-            )
-
-            if not rule2_result["success"]:
-                # Cleanup first rule if second failed
-                await self._remove_rule(f"xray-allow-{xray_process_id}")
+            # Apply both iptables rules atomically
+            rules = self._rule_specs(xray_process_id)
+            apply_result = await self._apply_rules(rules)
+            if not apply_result["success"]:
                 return {
                     "success": False,
-                    "error": f"Failed to apply block rule: {rule2_result.get('error')}",
+                    "error": f"Failed to apply kill switch rules: {apply_result.get('error')}",
                     "errorCode": "IPTABLES_FAILED",
                 }
 
             self.is_active = True
             self.activated_at = time.time()
-            self.rule_ids = [f"xray-allow-{xray_process_id}", "kill-switch-block-all"]
+            self._rules = rules
+            self.rule_ids = [rule_id for rule_id, _ in rules]
 
             return {"success": True, "activatedAt": int(self.activated_at)}
 
@@ -103,13 +101,13 @@ class KillSwitch:
             if not self.is_active:
                 return {"success": True, "message": "Kill switch not active"}
 
-            # Remove rules in reverse order
-            for rule_id in reversed(self.rule_ids):
-                await self._remove_rule(rule_id)
+            # Remove the DROP rule first so traffic flows again right away
+            await self._remove_rules(list(reversed(self._rules)))
 
             self.is_active = False
             self.activated_at = None
             self.rule_ids = []
+            self._rules = []
             self.xray_process_id = None
 
             return {"success": True}
@@ -121,67 +119,76 @@ class KillSwitch:
                 "errorCode": "KILL_SWITCH_ERROR",
             }
 
-    async def _apply_rule(self, command: List[str], rule_id: str) -> Dict[str, Any]:
+    @classmethod
+    def _restore_lines(cls, action: str, rules: List[Tuple[str, List[str]]]) -> List[str]:
+        """iptables-restore input applying action (-A/-D) to rules in one commit."""
+        return (
+            ["*filter"]
+            + [" ".join([action, cls.CHAIN] + spec) for _, spec in rules]
+            + ["COMMIT"]
+        )
+
+    async def _apply_rules(self, rules: List[Tuple[str, List[str]]]) -> Dict[str, Any]:
         """
-        Apply an iptables rule.
+        Append rules to the chain in one iptables-restore transaction.
 
         Args:
-            command: iptables command as list
-            rule_id: Identifier for the rule
+            rules: (rule id, spec) pairs
 
         Returns:
             Dictionary with result
         """
-        try:
-            process = await asyncio.create_subprocess_exec(
-                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        result = await self.runner.run_batch(
+            ["iptables-restore", "--noflush"],
+            self._restore_lines("-A", rules),
+            timeout=self.COMMAND_TIMEOUT,
+        )
+        if result.ok:
+            return {"success": True, "ruleIds": [rule_id for rule_id, _ in rules]}
+        if not result.not_found:
+            return {"success": False, "error": result.error()}
+
+        # No iptables-restore: one iptables call per rule, undone on failure
+        applied: List[Tuple[str, List[str]]] = []
+        for rule_id, spec in rules:
+            result = await self.runner.run(
+                ["iptables", "-A", self.CHAIN] + spec, timeout=self.COMMAND_TIMEOUT
             )
-
-            await process.wait()
-
-            if process.returncode == 0:
-                return {"success": True, "ruleId": rule_id}
-            else:
-                stderr = await process.stderr.read()
-                error_msg = (
-                    stderr.decode("utf-8", errors="ignore")
-                    if stderr
-                    else "Unknown error"
-                )
-                return {"success": False, "error": error_msg}
-
-        except FileNotFoundError:
-            return {"success": False, "error": "iptables command not found"}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-
-    async def _remove_rule(self, rule_id: str) -> Dict[str, Any]:
+            if not result.ok:
+                await self._remove_rules(list(reversed(applied)))
+                if result.not_found:
+                    return {"success": False, "error": "iptables command not found"}
+                return {"success": False, "error": result.error()}
+            applied.append((rule_id, spec))
+        return {"success": True, "ruleIds": [rule_id for rule_id, _ in rules]}
+
+    async def _remove_rules(self, rules: List[Tuple[str, List[str]]]) -> None:
         """
-        Remove an iptables rule.
+        Delete rules by their spec (iptables -D), in one transaction when all
+        of them still exist. Rules that are already gone do not stop the
+        others from being removed.
 
         Args:
-            rule_id: Identifier for the rule to remove
-
-        Returns:
-            Dictionary with result
+            rules: (rule id, spec) pairs, in removal order
         """
-        try:
-            # Try to remove rule (may not exist, that's OK)
-            # We'll try different methods to find and remove the rule
-
-            # Method 1: Try to remove by rule number (if we tracked it)
-            # For now, we'll use a simpler approach: remove all our rules
-
-            # Note: In production, you'd want to track rule numbers more carefully
-            # This is a simplified implementation
-
-            return {"success": True}
-
-        except Exception as e:
-            # Don't fail deactivation if rule removal fails
-            # Log the error but continue
-            print(f"Warning: Failed to remove iptables rule {rule_id}: {e}")
-            return {"success": True}  # Return success to allow cleanup to continue
+        if not rules:
+            return
+        result = await self.runner.run_batch(
+            ["iptables-restore", "--noflush"],
+            self._restore_lines("-D", rules),
+            timeout=self.COMMAND_TIMEOUT,
+        )
+        if result.ok:
+            return
+        # A rule is missing (the transaction is all-or-nothing) or there is no
+        # iptables-restore: delete one by one
+        for rule_id, spec in rules:
+            result = await self.runner.run(
+                ["iptables", "-D", self.CHAIN] + spec, timeout=self.COMMAND_TIMEOUT
+            )
+            if not result.ok:
+                # Don't fail deactivation if rule removal fails
+                print(f"Warning: Failed to remove iptables rule {rule_id}: {result.error()}")
 
     def get_status(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,242 @@
+"""
+LAN Addresses - In-process, cached discovery of the host's LAN IPv4 addresses
+
+Addresses are dumped over rtnetlink (RTM_GETADDR) instead of running
+`hostname -I` / `ip route get`, and kept until a netlink address or route
+change arrives, so the import page URL is resolved without subprocesses or
+blocking the event loop. Addresses on the default-route interface come first;
+the rest are alternatives for the QR code.
+"""
+
+import asyncio
+import socket
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# rtnetlink constants (linux/netlink.h, linux/rtnetlink.h, linux/if_addr.h)
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+RT_SCOPE_UNIVERSE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+_NLMSGHDR = struct.Struct("=LHHLL")
+_IFADDRMSG = struct.Struct("=BBBBI")
+_RTATTR = struct.Struct("=HH")
+
+# Never offered: loopback and the TUN interface xray-core creates
+EXCLUDED_INTERFACES = ("lo", "xray0")
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _iter_messages(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """(type, payload) of each netlink message in a datagram."""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            return
+        yield msg_type, data[offset + _NLMSGHDR.size : offset + length]
+        offset += _align(length)
+
+
+def _parse_ifaddr(payload: bytes) -> Optional[Dict[str, str]]:
+    """Address and interface of an RTM_NEWADDR payload (IPv4, global scope)."""
+    if len(payload) < _IFADDRMSG.size:
+        return None
+    family, _, _, scope, index = _IFADDRMSG.unpack_from(payload)
+    if family != socket.AF_INET or scope != RT_SCOPE_UNIVERSE:
+        return None
+    attrs: Dict[int, bytes] = {}
+    offset = _IFADDRMSG.size
+    while offset + _RTATTR.size <= len(payload):
+        length, attr_type = _RTATTR.unpack_from(payload, offset)
+        if length < _RTATTR.size:
+            break
+        attrs[attr_type] = payload[offset + _RTATTR.size : offset + length]
+        offset += _align(length)
+    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+    if raw is None or len(raw) != 4:
+        return None
+    if IFA_LABEL in attrs:
+        interface = attrs[IFA_LABEL].rstrip(b"\0").decode("utf-8", errors="ignore")
+    else:
+        try:
+            interface = socket.if_indextoname(index)
+        except OSError:
+            interface = str(index)
+    return {"address": socket.inet_ntoa(raw), "interface": interface}
+
+
+def dump_addresses() -> List[Dict[str, str]]:
+    """All global-scope IPv4 addresses via an RTM_GETADDR dump."""
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        sock.settimeout(1.0)
+        body = _IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)
+        header = _NLMSGHDR.pack(
+            _NLMSGHDR.size + len(body), RTM_GETADDR, NLM_F_REQUEST | NLM_F_DUMP, 1, 0
+        )
+        sock.send(header + body)
+        addresses = []
+        while True:
+            data = sock.recv(65536)
+            for msg_type, payload in _iter_messages(data):
+                if msg_type == NLMSG_DONE:
+                    return addresses
+                if msg_type == NLMSG_ERROR:
+                    raise OSError("RTM_GETADDR failed")
+                if msg_type == RTM_NEWADDR:
+                    entry = _parse_ifaddr(payload)
+                    if entry is not None:
+                        addresses.append(entry)
+
+
+def default_route_interfaces() -> List[str]:
+    """Interfaces of IPv4 default routes from /proc/net/route, lowest metric first."""
+    routes = []
+    try:
+        with open("/proc/net/route") as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                if len(fields) > 6 and fields[1] == "00000000":
+                    routes.append((int(fields[6]), fields[0]))
+    except OSError:
+        return []
+    return [iface for _, iface in sorted(routes)]
+
+
+def _outgoing_address() -> Optional[str]:
+    """Source address for the default route (UDP connect sends no packet)."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except OSError:
+        return None
+
+
+class LanAddressResolver:
+    """
+    Cached LAN address lookup, invalidated by netlink change events.
+
+    Responsibilities:
+    - Dump IPv4 addresses in-process and rank default-route ones first
+    - Keep the result until RTM_NEWADDR/DELADDR or a route/link change
+    - Fall back to the outgoing socket address when netlink is unavailable
+    """
+
+    def __init__(self, excluded_interfaces=EXCLUDED_INTERFACES):
+        """
+        Initialize LanAddressResolver.
+
+        Args:
+            excluded_interfaces: Interface names never returned
+        """
+        self.excluded_interfaces = tuple(excluded_interfaces)
+        self._cache: Optional[List[Dict[str, str]]] = None
+        self._monitor: Optional[socket.socket] = None
+        self.lookups: int = 0
+        self.invalidations: int = 0
+
+    async def get_addresses(self) -> List[Dict[str, str]]:
+        """
+        LAN addresses, default-route interface first. A cache miss reads
+        kernel state (netlink dump, /proc) in the default executor.
+
+        Returns:
+            List of {'address': str, 'interface': str}; may be empty
+        """
+        if self._cache is not None:
+            return list(self._cache)
+        self._start_monitor()
+        self.lookups += 1
+        invalidations = self.invalidations
+        addresses = await asyncio.get_running_loop().run_in_executor(None, self._lookup)
+        if self._monitor is not None and self.invalidations == invalidations:
+            # Only cache while change events can invalidate it, and not a
+            # result that a change during the lookup already made stale
+            self._cache = addresses
+        return list(addresses)
+
+    def _lookup(self) -> List[Dict[str, str]]:
+        """Blocking part of get_addresses(): dump, filter and rank addresses."""
+        try:
+            addresses = [
+                a
+                for a in dump_addresses()
+                if a["interface"] not in self.excluded_interfaces
+                and not a["address"].startswith(("127.", "169.254."))
+            ]
+        except OSError:
+            fallback = _outgoing_address()
+            addresses = (
+                [{"address": fallback, "interface": ""}]
+                if fallback and not fallback.startswith("127.")
+                else []
+            )
+        rank = {iface: i for i, iface in enumerate(default_route_interfaces())}
+        addresses.sort(key=lambda a: rank.get(a["interface"], len(rank)))
+        return addresses
+
+    async def get_primary_address(self) -> Optional[str]:
+        """First LAN address, or None."""
+        addresses = await self.get_addresses()
+        return addresses[0]["address"] if addresses else None
+
+    def invalidate(self) -> None:
+        self._cache = None
+        self.invalidations += 1
+
+    def close(self) -> None:
+        """Stop listening for netlink events."""
+        if self._monitor is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._monitor.fileno())
+        except RuntimeError:
+            pass
+        self._monitor.close()
+        self._monitor = None
+        self._cache = None
+
+    def _start_monitor(self) -> None:
+        if self._monitor is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+            sock.setblocking(False)
+        except OSError as e:
+            print(f"LanAddressResolver: netlink monitor unavailable: {e}")
+            return
+        loop.add_reader(sock.fileno(), self._on_netlink_event)
+        self._monitor = sock
+
+    def _on_netlink_event(self) -> None:
+        # Drain the socket; any address/route/link change invalidates the cache
+        try:
+            while self._monitor is not None:
+                self._monitor.recv(65536)
+        except BlockingIOError:
+            pass
+        except OSError:
+            # ENOBUFS: events were dropped, the cache may be stale either way
+            pass
+        self.invalidate()
@@ -0,0 +1,254 @@
+"""
+Loop Monitor - Opt-in event-loop lag and blocking-call instrumentation
+
+Decky runs every plugin on one shared asyncio loop, so a blocking call in the
+backend stalls the whole loader. When enabled, this module measures:
+
+- loop lag: a heartbeat task sleeps for a short interval and records how late
+  it wakes up;
+- slow callbacks: asyncio's debug-mode "Executing ... took N seconds" reports
+  (loop.slow_callback_duration), captured from the asyncio logger; they name
+  the coroutine but carry no stack;
+- what is blocking: a watchdog thread samples the loop thread's stack while a
+  heartbeat is overdue, which points at the blocking call itself.
+
+Results are aggregated per call site; get_report() returns the top offenders.
+"""
+
+import asyncio
+import logging
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+STACK_LIMIT = 8
+
+_CORO_PATTERN = re.compile(r"coro=<(.+?)>(?: |$)")
+
+
+def _stack_snippet(frame) -> List[str]:
+    """Innermost STACK_LIMIT frames as 'file:line in func' strings."""
+    return [
+        f"{entry.filename}:{entry.lineno} in {entry.name}"
+        for entry in traceback.extract_stack(frame)[-STACK_LIMIT:]
+    ]
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Receives asyncio's slow-callback warnings (debug mode only)."""
+
+    def __init__(self, monitor: "LoopMonitor"):
+        super().__init__(logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not isinstance(record.msg, str) or not record.msg.startswith("Executing "):
+            return
+        if not isinstance(record.args, tuple) or len(record.args) != 2:
+            return
+        handle, duration = record.args
+        self.monitor._record_slow_callback(handle, duration)
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and records the slowest callers.
+
+    Responsibilities:
+    - Heartbeat task measuring wake-up lateness (lag)
+    - asyncio debug slow-callback capture with task stacks
+    - Watchdog thread sampling the loop thread's stack during stalls
+    - Aggregated top-offender report
+    """
+
+    HEARTBEAT_INTERVAL = 0.02
+    # Lag / callback duration that counts as a stall
+    THRESHOLD = 0.1
+
+    def __init__(self, threshold: float = THRESHOLD):
+        """
+        Initialize LoopMonitor.
+
+        Args:
+            threshold: Seconds of lag or callback time reported as a stall
+        """
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._handler: Optional[_SlowCallbackHandler] = None
+        self._saved_debug: Optional[bool] = None
+        self._saved_slow_duration: Optional[float] = None
+        self._last_beat = time.monotonic()
+        # (site, stack) sampled during the current stall, reported with the
+        # stall's full duration once the heartbeat runs again
+        self._stall: Optional[Tuple[str, List[str]]] = None
+        self._stall_sampled = False
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.started_at: Optional[float] = None
+        self.beats: int = 0
+        self.max_lag: float = 0.0
+        self.total_lag: float = 0.0
+        self.stalls: int = 0
+        self._recent_lags: Deque[float] = deque(maxlen=500)
+        self._offenders: Dict[str, Dict[str, Any]] = {}
+
+    def is_active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running loop (enables asyncio debug mode)."""
+        if self.is_active():
+            return
+        self._reset_stats()
+        self.started_at = time.time()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+
+        self._saved_debug = self._loop.get_debug()
+        self._saved_slow_duration = self._loop.slow_callback_duration
+        self._loop.set_debug(True)
+        self._loop.slow_callback_duration = self.threshold
+        self._handler = _SlowCallbackHandler(self)
+        logging.getLogger("asyncio").addHandler(self._handler)
+
+        self._last_beat = time.monotonic()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        self._stopping.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="xray-decky-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        print(f"LoopMonitor: started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self) -> None:
+        """Stop monitoring and restore the loop's debug settings."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        self._stopping.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+        if self._handler is not None:
+            logging.getLogger("asyncio").removeHandler(self._handler)
+            self._handler = None
+        if self._loop is not None:
+            self._loop.set_debug(bool(self._saved_debug))
+            self._loop.slow_callback_duration = self._saved_slow_duration
+        print("LoopMonitor: stopped")
+
+    async def _heartbeat(self) -> None:
+        interval = self.HEARTBEAT_INTERVAL
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            with self._lock:
+                self._last_beat = now
+                stall, self._stall = self._stall, None
+                self._stall_sampled = False
+                self.beats += 1
+                self.total_lag += lag
+                self.max_lag = max(self.max_lag, lag)
+                self._recent_lags.append(lag)
+                if lag >= self.threshold:
+                    self.stalls += 1
+            if stall is not None:
+                self._add_offender(stall[0], lag, stall[1], "stall")
+
+    def _watch(self) -> None:
+        """Watchdog thread: sample the loop thread's stack during a stall."""
+        while not self._stopping.wait(self.HEARTBEAT_INTERVAL):
+            with self._lock:
+                overdue = time.monotonic() - self._last_beat - self.HEARTBEAT_INTERVAL
+                if overdue < self.threshold or self._stall_sampled:
+                    continue
+                self._stall_sampled = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                stack = _stack_snippet(frame)
+                with self._lock:
+                    self._stall = (stack[-1] if stack else "?", stack)
+
+    def _record_slow_callback(self, handle: Any, duration: float) -> None:
+        if isinstance(handle, str):
+            # Python formats the handle before logging; keep the coroutine
+            # and the line it was suspended at, e.g. "main() running at x.py:8"
+            match = _CORO_PATTERN.search(handle)
+            key = match.group(1) if match else handle[:200]
+            stack: List[str] = []
+        else:
+            key = repr(getattr(handle, "_callback", handle))
+            source = getattr(handle, "_source_traceback", None) or []
+            stack = [f"{f.filename}:{f.lineno} in {f.name}" for f in source[-STACK_LIMIT:]]
+        self._add_offender(key, duration, stack, "callback")
+
+    def _add_offender(self, key: str, duration: float, stack: List[str], kind: str) -> None:
+        with self._lock:
+            entry = self._offenders.setdefault(
+                key, {"site": key, "kind": kind, "count": 0, "totalMs": 0.0, "maxMs": 0.0}
+            )
+            entry["count"] += 1
+            entry["totalMs"] += duration * 1000
+            if duration * 1000 >= entry["maxMs"]:
+                entry["maxMs"] = duration * 1000
+                entry["stack"] = stack
+
+    def get_report(self, limit: int = 10) -> Dict[str, Any]:
+        """
+        Get lag statistics and the slowest call sites.
+
+        Args:
+            limit: Number of offenders to return
+
+        Returns:
+            {
+                'active': bool,
+                'thresholdMs': int,
+                'beats': int,
+                'stalls': int,
+                'maxLagMs': float,
+                'avgLagMs': float,
+                'p99LagMs': float,  # Over the last 500 heartbeats
+                'offenders': [{'site', 'kind', 'count', 'totalMs', 'maxMs', 'stack'}]
+            }
+        """
+        with self._lock:
+            lags = sorted(self._recent_lags)
+            offenders = sorted(
+                (dict(entry) for entry in self._offenders.values()),
+                key=lambda entry: entry["maxMs"],
+                reverse=True,
+            )[:limit]
+            beats = self.beats
+            report = {
+                "active": self.is_active(),
+                "startedAt": int(self.started_at) if self.started_at else None,
+                "thresholdMs": int(self.threshold * 1000),
+                "beats": beats,
+                "stalls": self.stalls,
+                "maxLagMs": round(self.max_lag * 1000, 1),
+                "avgLagMs": round(self.total_lag / beats * 1000, 2) if beats else 0.0,
+                "p99LagMs": round(lags[int(len(lags) * 0.99)] * 1000, 1) if lags else 0.0,
+            }
+        for entry in offenders:
+            entry["totalMs"] = round(entry["totalMs"], 1)
+            entry["maxMs"] = round(entry["maxMs"], 1)
+        report["offenders"] = offenders
+        return report
@@ -0,0 +1,295 @@
+"""
+Metrics - Minimal in-process metrics registry with an OpenMetrics endpoint
+
+Counters, gauges and histograms with labels, rendered in the OpenMetrics
+text format for a desktop Prometheus. No client library is needed in the
+Decky runtime. Values owned by other components (supervisor restarts,
+settings writes, loop lag, xray-core traffic) are pulled by collectors right
+before each scrape instead of being pushed on every change.
+
+MetricsServer serves GET /metrics over plain HTTP, on 127.0.0.1 unless the
+metrics.listen setting says otherwise.
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Seconds; covers sub-millisecond steps up to slow connects
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# TYPE {self.name} {self.TYPE}", f"# HELP {self.name} {self.help}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic total (exposed as <name>_total)."""
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Mirror a total counted elsewhere (collectors only)."""
+        self._values[self._key(labels)] = value
+
+    def get(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    TYPE = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def remove(self, **labels: Any) -> None:
+        self._values.pop(self._key(labels), None)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (bucket counts, sum)
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the enclosed block (also for blocks that await)."""
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started_at, **labels)
+
+    def count(self, **labels: Any) -> int:
+        values = self._values.get(self._key(labels))
+        return sum(values[0]) if values else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        return lines
+
+
+class Registry:
+    """
+    Set of metrics plus collectors run before each scrape.
+
+    Responsibilities:
+    - Create and look up metrics by name
+    - Run collectors that copy externally owned values into metrics
+    - Render everything as OpenMetrics text
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Awaitable[None]]] = []
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} already registered differently")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]) -> None:
+        """Register an async callable run before each render."""
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        """Run collectors and return the OpenMetrics exposition."""
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception as e:
+                print(f"Metrics: collector failed: {e}")
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; modules define their metrics on it at import time
+REGISTRY = Registry()
+
+
+class MetricsServer:
+    """
+    Plain-HTTP /metrics endpoint.
+
+    Responsibilities:
+    - Bind metrics.listen:metrics.port (default 127.0.0.1:9465)
+    - Render the registry per scrape
+    """
+
+    DEFAULT_LISTEN = "127.0.0.1"
+    DEFAULT_PORT = 9465
+
+    def __init__(self, registry: Registry = REGISTRY):
+        """
+        Initialize MetricsServer.
+
+        Args:
+            registry: Registry to expose
+        """
+        self.registry = registry
+        self.address: Optional[Tuple[str, int]] = None
+        self._runner: Optional[web.AppRunner] = None
+        self.scrapes: int = 0
+
+    def is_running(self) -> bool:
+        return self._runner is not None
+
+    async def _handle(self, _request: web.Request) -> web.Response:
+        self.scrapes += 1
+        body = await self.registry.render()
+        return web.Response(body=body.encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self, listen: str = DEFAULT_LISTEN, port: int = DEFAULT_PORT) -> Dict[str, Any]:
+        """
+        Start serving (restarts if already running).
+
+        Returns:
+            { 'success': bool, 'listen': str, 'port': int, 'error': str | None }
+        """
+        await self.stop()
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, listen, port).start()
+        except OSError as e:
+            await runner.cleanup()
+            print(f"Metrics: cannot listen on {listen}:{port}: {e}")
+            return {"success": False, "listen": listen, "port": port, "error": str(e)}
+        self._runner = runner
+        self.address = (listen, port)
+        print(f"Metrics: serving http://{listen}:{port}/metrics")
+        return {"success": True, "listen": listen, "port": port}
+
+    async def stop(self) -> None:
+        runner, self._runner = self._runner, None
+        self.address = None
+        if runner is not None:
+            await runner.cleanup()
@@ -0,0 +1,162 @@
+"""
+Node Store - Imported VLESS nodes kept alongside the active vlessConfig
+
+Batch imports (POST /import/batch) add every node of a provider list here
+instead of overwriting vlessConfig; select_node copies one of them into
+vlessConfig. Nodes are deduplicated by their connection parameters, so
+re-importing the same subscription only refreshes names.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import REGISTRY
+
+SETTINGS_KEY = "nodes"
+MAX_NODES = 500
+PROBE_TIMEOUT = 3.0
+
+PROBE_SECONDS = REGISTRY.histogram(
+    "xray_decky_node_probe_seconds", "TCP connect latency of node probes"
+)
+PROBE_FAILURES = REGISTRY.counter(
+    "xray_decky_node_probe_failures", "Node probes that failed or timed out"
+)
+
+# Every VLESSConfig field identifies a node (e.g. mux=1 makes a different
+# node) except these import/validation metadata and the store id
+_METADATA_FIELDS = frozenset(
+    ("id", "name", "sourceUrl", "configType", "importedAt", "isValid", "lastValidatedAt")
+)
+# Always part of the identity, as None when absent; other fields only when
+# present, so ids of nodes stored before they existed do not change
+_IDENTITY_FIELDS = (
+    "uuid",
+    "address",
+    "port",
+    "flow",
+    "encryption",
+    "network",
+    "security",
+    "realityConfig",
+)
+
+
+def node_id(config: Dict[str, Any]) -> str:
+    """Stable id from the node's connection parameters."""
+    identity = {field: config.get(field) for field in _IDENTITY_FIELDS}
+    identity.update(
+        (field, value)
+        for field, value in config.items()
+        if field not in _METADATA_FIELDS and field not in identity
+    )
+    data = json.dumps(identity, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:12]
+
+
+async def probe_latency(address: str, port: int, timeout: float = PROBE_TIMEOUT) -> Optional[int]:
+    """
+    TCP connect time to a node in milliseconds (includes DNS resolution).
+
+    Returns:
+        Latency in ms, or None if unreachable within timeout
+    """
+    started_at = time.monotonic()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        PROBE_FAILURES.inc()
+        return None
+    elapsed = time.monotonic() - started_at
+    PROBE_SECONDS.observe(elapsed)
+    latency = int(elapsed * 1000)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return latency
+
+
+class NodeStore:
+    """
+    Persistent list of imported nodes (settings key 'nodes').
+
+    Responsibilities:
+    - Add nodes with dedup by connection parameters
+    - List, look up and remove nodes
+    - Persist through the settings manager (writes are coalesced there)
+    """
+
+    def __init__(self, settings, max_nodes: int = MAX_NODES):
+        """
+        Initialize NodeStore.
+
+        Args:
+            settings: SettingsManager (getSetting/setSetting/commit)
+            max_nodes: Maximum number of stored nodes
+        """
+        self.settings = settings
+        self.max_nodes = max_nodes
+
+    def _nodes(self) -> List[Dict[str, Any]]:
+        return self.settings.getSetting(SETTINGS_KEY, []) or []
+
+    def _save(self, nodes: List[Dict[str, Any]]) -> None:
+        self.settings.setSetting(SETTINGS_KEY, nodes)
+        self.settings.commit()
+
+    def list(self) -> List[Dict[str, Any]]:
+        """All nodes in import order."""
+        return list(self._nodes())
+
+    def get(self, node_id_: str) -> Optional[Dict[str, Any]]:
+        return next((n for n in self._nodes() if n.get("id") == node_id_), None)
+
+    def find(self, config: Dict[str, Any]) -> Optional[str]:
+        """Id of the stored node with config's connection parameters, or None."""
+        nid = node_id(config)
+        return nid if self.get(nid) is not None else None
+
+    def config_for(self, node_id_: str) -> Optional[Dict[str, Any]]:
+        """VLESSConfig of a node (without the store id), for vlessConfig."""
+        node = self.get(node_id_)
+        if node is None:
+            return None
+        return {key: value for key, value in node.items() if key != "id"}
+
+    def add(self, config: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Store a node unless an identical one exists.
+
+        Args:
+            config: VLESSConfig built by build_vless_config
+
+        Returns:
+            (node id, status) with status 'added', 'duplicate' or 'full'
+        """
+        nid = node_id(config)
+        nodes = self._nodes()
+        for existing in nodes:
+            if existing.get("id") == nid:
+                if config.get("name") and existing.get("name") != config["name"]:
+                    existing["name"] = config["name"]
+                    self._save(nodes)
+                return nid, "duplicate"
+        if len(nodes) >= self.max_nodes:
+            return nid, "full"
+        nodes.append({**config, "id": nid})
+        self._save(nodes)
+        return nid, "added"
+
+    def remove(self, node_id_: str) -> bool:
+        """Remove a node; False if it does not exist."""
+        nodes = self._nodes()
+        remaining = [n for n in nodes if n.get("id") != node_id_]
+        if len(remaining) == len(nodes):
+            return False
+        self._save(remaining)
+        return True
@@ -0,0 +1,64 @@
+"""
+Phase Timer - Wall-clock timings for the phases of an operation
+
+Used by the connect path to log where time goes (settings, interface lookup,
+config render, xray start, routes...). Phases may overlap when they run
+concurrently; the total is measured separately from the first phase start.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+class PhaseTimer:
+    """
+    Records the duration of named phases.
+
+    Usage:
+        timer = PhaseTimer("connect")
+        with timer.phase("render"):
+            ...
+        timer.log()
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize PhaseTimer.
+
+        Args:
+            name: Operation name used in the log line
+        """
+        self.name = name
+        self.phases: Dict[str, float] = {}
+        self._started_at = time.monotonic()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block (also for blocks that await)."""
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.monotonic() - started_at
+
+    def total(self) -> float:
+        """Seconds since the timer was created."""
+        return time.monotonic() - self._started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Timings in milliseconds.
+
+        Returns:
+            {'totalMs': int, 'phases': {name: ms}}
+        """
+        return {
+            "totalMs": int(self.total() * 1000),
+            "phases": {name: int(sec * 1000) for name, sec in self.phases.items()},
+        }
+
+    def log(self) -> None:
+        """Print a one-line summary."""
+        phases = ", ".join(f"{name} {sec * 1000:.0f}ms" for name, sec in self.phases.items())
+        print(f"Xray Decky Plugin: {self.name} took {self.total() * 1000:.0f}ms ({phases})")
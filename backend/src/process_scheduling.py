@@ -0,0 +1,313 @@
+"""
+Process Scheduling - CPU/IO priority and cgroup placement for xray-core
+
+Applies a scheduling policy to every thread of a running process: nice level,
+scheduler class (SCHED_OTHER/BATCH/IDLE), IO priority and CPU affinity. Threads
+the Go runtime creates later inherit these from the thread that spawns them.
+Where cgroup v2 is writable (plugin runs as root), the process is also moved
+into its own cgroup with cpu.weight and memory.high; the cpu and memory
+controllers are enabled for it in the parent's cgroup.subtree_control.
+
+All steps are best-effort; the returned report lists what was applied and what
+failed, so the effect can be checked from the status API.
+"""
+
+import ctypes
+import os
+import platform
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# The default changes nothing: xray-core keeps the plugin's priorities and
+# cgroup until set_process_scheduling opts in. SCHED_BATCH/SCHED_IDLE are not
+# preempted on wakeup, which delays packets of a game that routes through xray.
+DEFAULT_SCHEDULING: Dict[str, Any] = {
+    "nice": 0,
+    "policy": "normal",  # "normal", "batch" or "idle"
+    "ioClass": None,  # "best-effort", "idle" or None (leave as is)
+    "ioLevel": 7,  # 0 (highest) - 7 (lowest), best-effort class only
+    "cpus": None,  # CPU affinity, e.g. [2, 3]; None = all CPUs
+    "cpuWeight": None,  # cgroup v2 cpu.weight (default 100); None = no cgroup
+    "memoryHigh": None,  # cgroup v2 memory.high, e.g. "128M"; None = no cgroup
+}
+
+# memory.high accepts bytes with an optional K/M/G/T suffix, or "max"
+MEMORY_HIGH_PATTERN = re.compile(r"[1-9]\d*[KMGT]?|max")
+
+SCHED_POLICIES = {
+    "normal": os.SCHED_OTHER,
+    "batch": os.SCHED_BATCH,
+    "idle": os.SCHED_IDLE,
+}
+
+IOPRIO_CLASSES = {"best-effort": 2, "idle": 3}
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_SYSCALLS = {"x86_64": (251, 252), "aarch64": (30, 31)}  # (set, get)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+CGROUP_NAME = "xray-decky"
+# Limit file -> (config key, controller providing it)
+CGROUP_LIMITS = {"cpu.weight": ("cpuWeight", "cpu"), "memory.high": ("memoryHigh", "memory")}
+
+
+def validate_scheduling(config: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Merge a partial scheduling config over the defaults and validate it.
+
+    Args:
+        config: Partial scheduling configuration
+
+    Returns:
+        Tuple of (merged config, error message)
+    """
+    merged = dict(DEFAULT_SCHEDULING)
+    merged.update({k: v for k, v in (config or {}).items() if k in DEFAULT_SCHEDULING})
+
+    if not isinstance(merged["nice"], int) or not -20 <= merged["nice"] <= 19:
+        return None, "nice must be an integer from -20 to 19"
+    if merged["policy"] not in SCHED_POLICIES:
+        return None, f"policy must be one of {', '.join(SCHED_POLICIES)}"
+    if merged["ioClass"] is not None and merged["ioClass"] not in IOPRIO_CLASSES:
+        return None, f"ioClass must be one of {', '.join(IOPRIO_CLASSES)} or null"
+    if not isinstance(merged["ioLevel"], int) or not 0 <= merged["ioLevel"] <= 7:
+        return None, "ioLevel must be an integer from 0 to 7"
+    cpus = merged["cpus"]
+    if cpus is not None:
+        available = os.sched_getaffinity(0)
+        if not cpus or not all(isinstance(c, int) and c in available for c in cpus):
+            return None, f"cpus must be a non-empty subset of {sorted(available)}"
+    weight = merged["cpuWeight"]
+    if weight is not None and (not isinstance(weight, int) or not 1 <= weight <= 10000):
+        return None, "cpuWeight must be an integer from 1 to 10000"
+    memory_high = merged["memoryHigh"]
+    if memory_high is not None:
+        if (
+            isinstance(memory_high, bool)
+            or not isinstance(memory_high, (int, str))
+            or not MEMORY_HIGH_PATTERN.fullmatch(str(memory_high))
+        ):
+            return None, 'memoryHigh must be a positive byte count (e.g. "128M") or "max"'
+        merged["memoryHigh"] = str(memory_high)
+    return merged, None
+
+
+def _thread_ids(pid: int) -> List[int]:
+    """All thread IDs of pid (just pid if /proc is unavailable)."""
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        return [pid]
+
+
+def _ioprio_syscalls() -> Optional[Tuple[Any, int, int]]:
+    """libc syscall() and the ioprio_set/get numbers for this architecture."""
+    numbers = IOPRIO_SYSCALLS.get(platform.machine())
+    if numbers is None:
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    return libc.syscall, numbers[0], numbers[1]
+
+
+def _apply_ioprio(tid: int, io_class: str, io_level: int) -> None:
+    """ioprio_set(IOPRIO_WHO_PROCESS, tid, class|level)."""
+    syscalls = _ioprio_syscalls()
+    if syscalls is None:
+        raise OSError(f"ioprio_set not supported on {platform.machine()}")
+    syscall, set_nr, _ = syscalls
+    level = io_level if io_class == "best-effort" else 0
+    value = (IOPRIO_CLASSES[io_class] << IOPRIO_CLASS_SHIFT) | level
+    if syscall(set_nr, IOPRIO_WHO_PROCESS, tid, value) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def _read_words(path: str) -> List[str]:
+    with open(path) as f:
+        return f.read().split()
+
+
+def _enable_controllers(parent: str, controllers: List[str]) -> List[str]:
+    """
+    Enable controllers for the children of parent (cgroup.subtree_control).
+
+    The controllers stay enabled at the parent on removal of the xray cgroup:
+    other children may rely on them, and enabling alone limits nothing.
+
+    Returns:
+        Errors for controllers that are unavailable or could not be enabled
+    """
+    errors: List[str] = []
+    available = _read_words(os.path.join(parent, "cgroup.controllers"))
+    enabled = _read_words(os.path.join(parent, "cgroup.subtree_control"))
+    missing = []
+    for controller in controllers:
+        if controller not in available:
+            errors.append(f"{controller} controller not available in {parent}")
+        elif controller not in enabled:
+            missing.append(controller)
+    if missing:
+        try:
+            with open(os.path.join(parent, "cgroup.subtree_control"), "w") as f:
+                f.write(" ".join(f"+{controller}" for controller in missing))
+        except OSError as e:
+            errors.append(f"enabling {', '.join(missing)} controller: {e}")
+    return errors
+
+
+def _apply_cgroup(pid: int, config: Dict[str, Any], errors: List[str]) -> str:
+    """
+    Move pid into the xray cgroup and set its limits. A limit that cannot be
+    set is appended to errors; the process is moved regardless.
+
+    Returns:
+        The cgroup path
+    """
+    path = os.path.join(CGROUP_ROOT, CGROUP_NAME)
+    if not os.path.isfile(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+        raise OSError("cgroup v2 not mounted")
+    limits = {
+        name: (config[key], controller)
+        for name, (key, controller) in CGROUP_LIMITS.items()
+        if config[key] is not None
+    }
+    errors.extend(
+        f"cgroup: {e}"
+        for e in _enable_controllers(
+            CGROUP_ROOT, [controller for _, controller in limits.values()]
+        )
+    )
+    os.makedirs(path, exist_ok=True)
+    for name, (value, _) in limits.items():
+        target = os.path.join(path, name)
+        if not os.path.exists(target):
+            # Controller not enabled for the cgroup: the limit would be ignored
+            errors.append(f"cgroup: {name} not available in {path}")
+            continue
+        try:
+            with open(target, "w") as f:
+                f.write(str(value))
+        except OSError as e:
+            errors.append(f"cgroup: {name}: {e}")
+    with open(os.path.join(path, "cgroup.procs"), "w") as f:
+        f.write(str(pid))
+    return path
+
+
+def remove_cgroup() -> Optional[str]:
+    """
+    Remove the xray cgroup (uninstall). It must be empty: stop xray-core first.
+
+    Returns:
+        Error message, or None if removed or absent
+    """
+    try:
+        os.rmdir(os.path.join(CGROUP_ROOT, CGROUP_NAME))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def apply_scheduling(pid: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply a scheduling config to all threads of pid (best-effort, idempotent).
+
+    Args:
+        pid: Process ID
+        config: Validated scheduling config (see validate_scheduling)
+
+    Returns:
+        Report of the values read back from the process, plus errors
+    """
+    errors: List[str] = []
+    tids = _thread_ids(pid)
+
+    steps = [
+        ("nice", lambda tid: os.setpriority(os.PRIO_PROCESS, tid, config["nice"])),
+        (
+            "policy",
+            lambda tid: os.sched_setscheduler(
+                tid, SCHED_POLICIES[config["policy"]], os.sched_param(0)
+            ),
+        ),
+    ]
+    if config["ioClass"] is not None:
+        steps.append(
+            ("ioClass", lambda tid: _apply_ioprio(tid, config["ioClass"], config["ioLevel"]))
+        )
+    if config["cpus"] is not None:
+        steps.append(("cpus", lambda tid: os.sched_setaffinity(tid, config["cpus"])))
+
+    for name, step in steps:
+        for tid in tids:
+            try:
+                step(tid)
+            except ProcessLookupError:
+                continue  # thread exited
+            except OSError as e:
+                errors.append(f"{name}: {e}")
+                break
+
+    cgroup = None
+    if config["cpuWeight"] is not None or config["memoryHigh"] is not None:
+        try:
+            cgroup = _apply_cgroup(pid, config, errors)
+        except OSError as e:
+            errors.append(f"cgroup: {e}")
+
+    report = read_scheduling(pid)
+    report["threads"] = len(tids)
+    report["cgroup"] = cgroup
+    report["errors"] = errors
+    return report
+
+
+def read_scheduling(pid: int) -> Dict[str, Any]:
+    """
+    Read back the scheduling state of pid's main thread and its cgroup limits.
+
+    Returns:
+        Dictionary with nice, policy, ioPriority, cpus, cpuWeight, memoryHigh
+    """
+    report: Dict[str, Any] = {"pid": pid}
+    try:
+        report["nice"] = os.getpriority(os.PRIO_PROCESS, pid)
+        policy = os.sched_getscheduler(pid)
+        report["policy"] = next(
+            (name for name, value in SCHED_POLICIES.items() if value == policy),
+            str(policy),
+        )
+        report["cpus"] = sorted(os.sched_getaffinity(pid))
+    except OSError:
+        return report
+
+    syscalls = _ioprio_syscalls()
+    if syscalls is not None:
+        syscall, _, get_nr = syscalls
+        value = syscall(get_nr, IOPRIO_WHO_PROCESS, pid)
+        if value >= 0:
+            io_class = value >> IOPRIO_CLASS_SHIFT
+            names = {v: k for k, v in IOPRIO_CLASSES.items()}
+            report["ioPriority"] = {
+                "class": names.get(io_class, "none" if io_class == 0 else str(io_class)),
+                "level": value & ((1 << IOPRIO_CLASS_SHIFT) - 1),
+            }
+
+    try:
+        with open(f"/proc/{pid}/cgroup") as f:
+            cgroup_rel = f.read().strip().split("::", 1)[-1]
+        cgroup_dir = CGROUP_ROOT + cgroup_rel
+        for key, name in (("cpuWeight", "cpu.weight"), ("memoryHigh", "memory.high")):
+            try:
+                with open(os.path.join(cgroup_dir, name)) as f:
+                    report[key] = f.read().strip()
+            except OSError:
+                pass
+    except OSError:
+        pass
+    return report
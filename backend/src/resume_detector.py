@@ -0,0 +1,131 @@
+"""
+Resume Detector - Notices when the device wakes from suspend
+
+CLOCK_BOOTTIME keeps counting while the system is suspended, CLOCK_MONOTONIC
+does not; a jump in their difference between two checks is time spent asleep.
+When gdbus is available, logind's PrepareForSleep(false) signal is watched as
+well so resume is reported immediately instead of on the next clock check.
+"""
+
+import asyncio
+import shutil
+import time
+from typing import Awaitable, Callable, List, Optional
+
+
+def _sleep_offset() -> float:
+    """Seconds the system has spent suspended since boot."""
+    return time.clock_gettime(time.CLOCK_BOOTTIME) - time.clock_gettime(
+        time.CLOCK_MONOTONIC
+    )
+
+
+class ResumeDetector:
+    """
+    Calls a handler once per resume from suspend.
+
+    Responsibilities:
+    - Poll the BOOTTIME/MONOTONIC offset for suspend jumps
+    - Follow logind PrepareForSleep signals through gdbus, if present
+    - De-duplicate the two sources so each resume is reported once
+    """
+
+    POLL_INTERVAL = 5.0
+    # Offset growth that counts as a suspend (clock jitter is microseconds)
+    MIN_SLEEP = 2.0
+
+    def __init__(self, on_resume: Callable[[float], Awaitable[None]]):
+        """
+        Initialize ResumeDetector.
+
+        Args:
+            on_resume: Called with the seconds spent asleep (0 if unknown)
+        """
+        self.on_resume = on_resume
+        self.resume_count: int = 0
+        self.last_resume_at: Optional[float] = None
+        self._offset = _sleep_offset()
+        self._tasks: List[asyncio.Task] = []
+        self._logind_process: Optional[asyncio.subprocess.Process] = None
+        self._handling = False
+
+    def start(self) -> None:
+        """Start watching for resumes."""
+        if self._tasks:
+            return
+        self._offset = _sleep_offset()
+        self._tasks.append(asyncio.ensure_future(self._poll()))
+        if shutil.which("gdbus"):
+            self._tasks.append(asyncio.ensure_future(self._watch_logind()))
+
+    async def stop(self) -> None:
+        """Stop watching."""
+        tasks, self._tasks = self._tasks, []
+        if self._logind_process is not None and self._logind_process.returncode is None:
+            self._logind_process.kill()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _poll(self) -> None:
+        """Detect suspend from the BOOTTIME/MONOTONIC offset."""
+        while True:
+            await asyncio.sleep(self.POLL_INTERVAL)
+            offset = _sleep_offset()
+            slept, self._offset = offset - self._offset, offset
+            if slept >= self.MIN_SLEEP:
+                await self._fire(slept)
+
+    async def _watch_logind(self) -> None:
+        """Follow logind PrepareForSleep signals (false = resumed)."""
+        try:
+            self._logind_process = await asyncio.create_subprocess_exec(
+                "gdbus",
+                "monitor",
+                "--system",
+                "--dest",
+                "org.freedesktop.login1",
+                "--object-path",
+                "/org/freedesktop/login1",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError:
+            return
+        try:
+            async for line in self._logind_process.stdout:
+                text = line.decode("utf-8", errors="ignore")
+                if "PrepareForSleep" in text and "false" in text:
+                    # Consume the offset jump so the poller does not report
+                    # the same resume again
+                    offset = _sleep_offset()
+                    slept, self._offset = offset - self._offset, offset
+                    await self._fire(max(0.0, slept))
+        finally:
+            if self._logind_process.returncode is None:
+                self._logind_process.kill()
+            await self._logind_process.wait()
+
+    def _recently_fired(self) -> bool:
+        return (
+            self.last_resume_at is not None
+            and time.monotonic() - self.last_resume_at < self.POLL_INTERVAL
+        )
+
+    async def _fire(self, slept: float) -> None:
+        if self._handling or self._recently_fired():
+            return
+        self._handling = True
+        self.resume_count += 1
+        self.last_resume_at = time.monotonic()
+        print(f"ResumeDetector: resumed from suspend (asleep {slept:.0f}s)")
+        try:
+            await self.on_resume(slept)
+        except Exception as e:
+            print(f"ResumeDetector: resume handler failed: {e}")
+        finally:
+            self._handling = False
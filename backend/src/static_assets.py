@@ -0,0 +1,167 @@
+"""
+Static Assets - In-memory, precompressed assets for the import page
+
+The import page is opened from a phone over (often weak) Wi-Fi. Files in
+backend/static are read once, compressed once (gzip, plus brotli when the
+optional `brotli` module is installed) and served from memory with strong
+ETags and Cache-Control, so repeat loads are answered with 304 and first
+loads transfer compressed bytes.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+try:
+    import brotli  # Optional; gzip only without it
+except ImportError:
+    brotli = None
+
+# Types worth compressing (PNG/ICO are already compressed or tiny)
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+# Smaller bodies are not worth the Content-Encoding overhead
+MIN_COMPRESS_SIZE = 256
+
+HTML_CACHE_CONTROL = "no-cache"
+ASSET_CACHE_CONTROL = "public, max-age=3600"
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+class Asset:
+    """One file with its compressed variants."""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        etag = hashlib.sha256(body).hexdigest()[:20]
+        # encoding -> (body, etag); ETags differ per encoding (strong validators)
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, f'"{etag}"')}
+        if content_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_SIZE:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.variants["gzip"] = (gz, f'"{etag}-gz"')
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.variants["br"] = (br, f'"{etag}-br"')
+
+    def etags(self) -> List[str]:
+        return [etag for _, etag in self.variants.values()]
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    """Encodings from Accept-Encoding, excluding q=0 ones."""
+    accepted = []
+    for item in header.split(","):
+        parts = [p.strip() for p in item.split(";")]
+        if not parts[0]:
+            continue
+        if any(p.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000") for p in parts[1:]):
+            continue
+        accepted.append(parts[0].lower())
+    return accepted
+
+
+class StaticAssetCache:
+    """
+    Serves files of a static directory from memory.
+
+    Responsibilities:
+    - Load and precompress all files once (in an executor)
+    - Negotiate Content-Encoding (br, gzip, identity)
+    - Answer If-None-Match with 304
+    """
+
+    def __init__(self, static_dir: Path):
+        """
+        Initialize StaticAssetCache.
+
+        Args:
+            static_dir: Directory with import.html, import.css and assets/
+        """
+        self.static_dir = Path(static_dir)
+        self._assets: Optional[Dict[str, Asset]] = None
+        self._load_lock = asyncio.Lock()
+        self.hits: int = 0
+        self.not_modified: int = 0
+
+    async def load(self) -> None:
+        """Read and compress all files (once)."""
+        async with self._load_lock:
+            if self._assets is None:
+                self._assets = await asyncio.get_running_loop().run_in_executor(
+                    None, self._read_all
+                )
+
+    def _read_all(self) -> Dict[str, Asset]:
+        assets: Dict[str, Asset] = {}
+        if not self.static_dir.is_dir():
+            return assets
+        for path in sorted(self.static_dir.rglob("*")):
+            if not path.is_file():
+                continue
+            rel_path = path.relative_to(self.static_dir).as_posix()
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            if content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+            cache_control = (
+                HTML_CACHE_CONTROL if content_type.startswith("text/html") else ASSET_CACHE_CONTROL
+            )
+            assets[rel_path] = Asset(path.read_bytes(), content_type, cache_control)
+        return assets
+
+    async def response(self, request: web.Request, rel_path: str) -> web.Response:
+        """
+        Build the response for a file relative to static_dir.
+
+        Args:
+            request: Incoming request (Accept-Encoding, If-None-Match)
+            rel_path: e.g. 'import.html' or 'assets/image/favicon.svg'
+
+        Returns:
+            200 with the best encoding, 304 if the client copy is current, or 404
+        """
+        await self.load()
+        asset = self._assets.get(rel_path)
+        if asset is None:
+            return web.Response(status=404, text="Not found")
+
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        encoding = next(
+            (e for e in ("br", "gzip") if e in asset.variants and e in accepted),
+            "identity",
+        )
+        body, etag = asset.variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if if_none_match:
+            client_etags = {tag.strip() for tag in if_none_match.split(",")}
+            if "*" in client_etags or client_etags.intersection(asset.etags()):
+                self.not_modified += 1
+                return web.Response(status=304, headers=headers)
+
+        self.hits += 1
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        response = web.Response(body=body, headers=headers)
+        response.content_type = asset.content_type.split(";")[0]
+        if "charset=" in asset.content_type:
+            response.charset = "utf-8"
+        return response
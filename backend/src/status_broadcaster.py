@@ -0,0 +1,143 @@
+"""
+Status Broadcaster - One sampler, many live-status viewers
+
+The import server's /status/events stream (Server-Sent Events) is fed from
+here. A single sampler task runs while at least one viewer is subscribed and
+fans each sample out to per-viewer queues, so N open dashboards cost one
+connection-state read and one xray-core stats query per interval. Events are
+only published when their data changed; new viewers get the latest value of
+every event right away.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+Event = Tuple[str, Any]
+
+
+class ThroughputMeter:
+    """Turns cumulative byte counters into per-second rates."""
+
+    def __init__(self):
+        self._last: Optional[Tuple[float, int, int]] = None
+        self._rates: Dict[str, int] = {"uplinkBps": 0, "downlinkBps": 0}
+
+    def update(self, uplink: int, downlink: int, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Args:
+            uplink: Bytes sent since xray-core started
+            downlink: Bytes received since xray-core started
+            now: Monotonic timestamp (default: time.monotonic()); the same
+                timestamp again (a reused reading) keeps the previous rates
+
+        Returns:
+            {'uplinkBps', 'downlinkBps', 'uplinkTotal', 'downlinkTotal'}
+        """
+        now = time.monotonic() if now is None else now
+        if self._last is not None and self._last[0] == now:
+            return {**self._rates, "uplinkTotal": uplink, "downlinkTotal": downlink}
+        rates = {"uplinkBps": 0, "downlinkBps": 0}
+        if self._last is not None:
+            last_at, last_up, last_down = self._last
+            elapsed = now - last_at
+            # Counters restart with a new xray-core instance: skip that interval
+            if elapsed > 0 and uplink >= last_up and downlink >= last_down:
+                rates = {
+                    "uplinkBps": int((uplink - last_up) / elapsed),
+                    "downlinkBps": int((downlink - last_down) / elapsed),
+                }
+        self._last = (now, uplink, downlink)
+        self._rates = rates
+        return {**rates, "uplinkTotal": uplink, "downlinkTotal": downlink}
+
+    def reset(self) -> None:
+        self._last = None
+        self._rates = {"uplinkBps": 0, "downlinkBps": 0}
+
+
+class StatusBroadcaster:
+    """
+    Shared sampler with fan-out to subscriber queues.
+
+    Responsibilities:
+    - Run the sampler only while someone is subscribed
+    - Publish events whose data changed since the previous sample
+    - Drop the oldest queued event for viewers that fall behind
+    - Disconnect all viewers (server shutdown)
+    """
+
+    INTERVAL = 1.0
+    QUEUE_SIZE = 16
+
+    def __init__(
+        self,
+        sampler: Callable[[], Awaitable[Dict[str, Any]]],
+        interval: float = INTERVAL,
+    ):
+        """
+        Initialize StatusBroadcaster.
+
+        Args:
+            sampler: Returns {event name: JSON-serializable data} per interval
+            interval: Seconds between samples
+        """
+        self.sampler = sampler
+        self.interval = interval
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._latest: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.samples: int = 0
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> "asyncio.Queue[Optional[Event]]":
+        """
+        Register a viewer. The queue yields (event, data) tuples, or None when
+        the viewer should disconnect.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        for event, data in self._latest.items():
+            queue.put_nowait((event, data))
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def disconnect_all(self) -> None:
+        """Ask every viewer to disconnect (e.g. before the server stops)."""
+        for queue in list(self._subscribers):
+            self._offer(queue, None)
+
+    def publish(self, event: str, data: Any) -> None:
+        """Send an event to all viewers (also outside the sampling interval)."""
+        self._latest[event] = data
+        for queue in self._subscribers:
+            self._offer(queue, (event, data))
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, item: Optional[Event]) -> None:
+        if queue.full():
+            # Slow viewer: drop its oldest event rather than stall the sampler
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                sample = await self.sampler()
+            except Exception as e:
+                print(f"StatusBroadcaster: sampler failed: {e}")
+                sample = {}
+            self.samples += 1
+            for event, data in sample.items():
+                if self._latest.get(event) != data:
+                    self.publish(event, data)
+            await asyncio.sleep(self.interval)
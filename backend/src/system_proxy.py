@@ -5,11 +5,12 @@ Configures system proxy using gsettings (GNOME/GTK) and kwriteconfig5 (KDE/Qt).
 Based on nekoray's QvProxyConfigurator implementation.
 """
 
-import asyncio
 import os
 import shutil
 from typing import Dict, Any, Optional, List, Tuple
 
+from .command_runner import DEFAULT_RUNNER, CommandRunner
+
 
 class SystemProxyManager:
     """
@@ -25,9 +26,16 @@ class SystemProxyManager:
     DEFAULT_SOCKS_PORT = 10808
     DEFAULT_HTTP_PORT = 10809
     PROXY_ADDRESS = "127.0.0.1"
+    COMMAND_TIMEOUT = 5.0
+
+    def __init__(self, runner: Optional[CommandRunner] = None):
+        """
+        Initialize SystemProxyManager.
 
-    def __init__(self):
-        """Initialize SystemProxyManager."""
+        Args:
+            runner: Command runner for gsettings/kwriteconfig5 (default: the shared runner)
+        """
+        self.runner = runner or DEFAULT_RUNNER
         self._is_active: bool = False
         self._socks_port: Optional[int] = None
         self._http_port: Optional[int] = None
@@ -48,23 +56,40 @@ class SystemProxyManager:
         Returns:
             Tuple of (return_code, stdout, stderr)
         """
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                program,
-                *args,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await proc.communicate()
-            return (
-                proc.returncode or 0,
-                stdout.decode("utf-8", errors="ignore"),
-                stderr.decode("utf-8", errors="ignore"),
-            )
-        except FileNotFoundError:
+        result = await self.runner.run([program] + args, timeout=self.COMMAND_TIMEOUT)
+        if result.not_found:
             return (-1, "", f"Command not found: {program}")
-        except Exception as e:
-            return (-1, "", str(e))
+        return (result.returncode, result.stdout, result.stderr)
+
+    async def _run_actions(self, actions: List[Tuple[str, List[str]]]) -> List[bool]:
+        """
+        Run proxy configuration commands. gsettings writes are independent
+        keys and run concurrently; kwriteconfig5 edits one file and the KIO
+        reload signal must follow it, so those run in order afterwards.
+
+        Returns:
+            Success flag per action, in the order given
+        """
+        concurrent = [i for i, (program, _) in enumerate(actions) if program == "gsettings"]
+        results: List[bool] = [False] * len(actions)
+
+        outcomes = await self.runner.run_many(
+            [[actions[i][0]] + actions[i][1] for i in concurrent],
+            timeout=self.COMMAND_TIMEOUT,
+        )
+        for i, outcome in zip(concurrent, outcomes):
+            results[i] = outcome.ok
+            if not outcome.ok and outcome.stderr:
+                print(f"SystemProxy: {actions[i][0]} {' '.join(actions[i][1])} failed: {outcome.stderr}")
+
+        for i, (program, args) in enumerate(actions):
+            if i in concurrent:
+                continue
+            returncode, _, stderr = await self._run_command(program, args)
+            results[i] = returncode == 0
+            if returncode != 0 and stderr:
+                print(f"SystemProxy: {program} {' '.join(args)} failed: {stderr}")
+        return results
 
     async def _has_gsettings(self) -> bool:
         """Check if gsettings is available."""
@@ -98,7 +123,6 @@ class SystemProxyManager:
         effective_http_port = http_port if has_http else socks_port
 
         actions: List[Tuple[str, List[str]]] = []
-        results: List[bool] = []
 
         # Check available tools
         has_gs = await self._has_gsettings()
@@ -227,11 +251,7 @@ class SystemProxyManager:
             )
 
         # Execute all actions
-        for program, args in actions:
-            returncode, _, stderr = await self._run_command(program, args)
-            results.append(returncode == 0)
-            if returncode != 0 and stderr:
-                print(f"SystemProxy: {program} {' '.join(args)} failed: {stderr}")
+        results = await self._run_actions(actions)
 
         success_count = results.count(True)
         total_count = len(results)
@@ -261,7 +281,6 @@ class SystemProxyManager:
             Dictionary with success status
         """
         actions: List[Tuple[str, List[str]]] = []
-        results: List[bool] = []
 
         has_gs = await self._has_gsettings()
         has_kw = await self._has_kwriteconfig5()
@@ -307,12 +326,8 @@ class SystemProxyManager:
                 )
             )
 
-        # Execute all actions
-        for program, args in actions:
-            returncode, _, stderr = await self._run_command(program, args)
-            results.append(returncode == 0)
-            if returncode != 0 and stderr:
-                print(f"SystemProxy: {program} {' '.join(args)} failed: {stderr}")
+        # Execute all actions (failures are logged; clearing is best effort)
+        await self._run_actions(actions)
 
         self._is_active = False
         self._socks_port = None
@@ -320,6 +335,15 @@ class SystemProxyManager:
 
         return {"success": True}
 
+    def restore_state(self, socks_port: int, http_port: Optional[int]) -> None:
+        """
+        Mark the system proxy as active without reapplying it (the desktop
+        settings persist; used when re-attaching to a running connection).
+        """
+        self._is_active = True
+        self._socks_port = socks_port
+        self._http_port = http_port
+
     def get_status(self) -> Dict[str, Any]:
         """
         Get current system proxy status.
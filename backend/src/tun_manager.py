@@ -8,6 +8,8 @@ import os
 import asyncio
 from typing import Dict, Any, Optional
 
+from .command_runner import DEFAULT_RUNNER, CommandRunner
+
 
 class TUNManager:
     """
@@ -21,9 +23,18 @@ class TUNManager:
 
     TUN_INTERFACE = "xray0"
     ROUTE_METRIC = 100
+    COMMAND_TIMEOUT = 5.0
+    # Where network interfaces appear (overridden by tests with stand-in tools)
+    SYSFS_NET = "/sys/class/net"
+
+    def __init__(self, runner: Optional[CommandRunner] = None):
+        """
+        Initialize TUNManager.
 
-    def __init__(self):
-        """Initialize TUNManager."""
+        Args:
+            runner: Command runner for ip (default: the shared runner)
+        """
+        self.runner = runner or DEFAULT_RUNNER
         self.tun_interface: Optional[str] = None
         self.has_privileges: bool = False
         self.last_check: Optional[float] = None
@@ -82,52 +93,22 @@ class TUNManager:
         Returns:
             Dictionary with test result
         """
-        try:
-            # Try to create a temporary TUN interface
-            test_interface = "test-tun0"
-
-            # Use ip command to create test interface
-            process = await asyncio.create_subprocess_exec(
-                "ip",
-                "tuntap",
-                "add",
-                "mode",
-                "tun",
-                test_interface,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
+        # Try to create a temporary TUN interface
+        test_interface = "test-tun0"
+        result = await self.runner.run(
+            ["ip", "tuntap", "add", "mode", "tun", test_interface],
+            timeout=self.COMMAND_TIMEOUT,
+        )
+        if result.ok:
+            # Success - clean up test interface
+            await self.runner.run(
+                ["ip", "tuntap", "del", "mode", "tun", test_interface],
+                timeout=self.COMMAND_TIMEOUT,
             )
-
-            await process.wait()
-
-            if process.returncode == 0:
-                # Success - clean up test interface
-                cleanup_process = await asyncio.create_subprocess_exec(
-                    "ip",
-                    "tuntap",
-                    "del",
-                    "mode",
-                    "tun",
-                    test_interface,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                await cleanup_process.wait()
-                return {"success": True}
-            else:
-                stderr = await process.stderr.read()
-                error_msg = (
-                    stderr.decode("utf-8", errors="ignore")
-                    if stderr
-                    else "Permission denied"
-                )
-                return {"success": False, "error": error_msg}
-
-        except FileNotFoundError:
-            # ip command not found
+            return {"success": True}
+        if result.not_found:
             return {"success": False, "error": "ip command not found"}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        return {"success": False, "error": result.error("Permission denied")}
 
     async def _test_ip_command(self) -> Dict[str, Any]:
         """
@@ -136,26 +117,12 @@ class TUNManager:
         Returns:
             Dictionary with test result
         """
-        try:
-            process = await asyncio.create_subprocess_exec(
-                "ip",
-                "link",
-                "show",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-
-            await process.wait()
-
-            if process.returncode == 0:
-                return {"success": True}
-            else:
-                return {"success": False, "error": "ip command failed"}
-
-        except FileNotFoundError:
+        result = await self.runner.run(["ip", "link", "show"], timeout=self.COMMAND_TIMEOUT)
+        if result.ok:
+            return {"success": True}
+        if result.not_found:
             return {"success": False, "error": "ip command not found"}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        return {"success": False, "error": "ip command failed"}
 
     async def _test_tun_device_access(self) -> Dict[str, Any]:
         """
@@ -169,8 +136,9 @@ class TUNManager:
             if os.path.exists(tun_device):
                 # Try to open the device (read-only check)
                 try:
-                    with open(tun_device, "rb"):
-                        pass
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, _open_and_close, tun_device
+                    )
                     return {"success": True}
                 except PermissionError:
                     return {"success": False, "error": "Permission denied"}
@@ -181,30 +149,19 @@ class TUNManager:
 
     async def get_physical_interface(self) -> Optional[str]:
         """Get the default route's interface (e.g. wlan0) for sockopt.interface binding."""
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                "ip",
-                "-4",
-                "route",
-                "show",
-                "default",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await proc.wait()
-            if proc.returncode != 0:
-                return None
-            out = await proc.stdout.read()
-            for line in out.decode("utf-8", errors="ignore").strip().split("\n"):
-                parts = line.split()
-                for i, p in enumerate(parts):
-                    if p == "dev" and i + 1 < len(parts):
-                        dev = parts[i + 1]
-                        if dev and dev != self.TUN_INTERFACE:
-                            return dev
-                        break
-        except Exception:
-            pass
+        result = await self.runner.run(
+            ["ip", "-4", "route", "show", "default"], timeout=self.COMMAND_TIMEOUT
+        )
+        if not result.ok:
+            return None
+        for line in result.stdout.strip().split("\n"):
+            parts = line.split()
+            for i, p in enumerate(parts):
+                if p == "dev" and i + 1 < len(parts):
+                    dev = parts[i + 1]
+                    if dev and dev != self.TUN_INTERFACE:
+                        return dev
+                    break
         return None
 
     async def setup_system_route(self) -> Dict[str, Any]:
@@ -212,77 +169,50 @@ class TUNManager:
         Add default route via xray0. Xray's proxy outbound must use sockopt.interface
         to bind to the physical interface (wlan0) - that bypasses routing and avoids loop.
         """
-        try:
-            dev = self.TUN_INTERFACE
-            for _ in range(20):
-                proc = await asyncio.create_subprocess_exec(
-                    "ip",
-                    "link",
-                    "show",
-                    dev,
-                    stdout=asyncio.subprocess.DEVNULL,
-                    stderr=asyncio.subprocess.DEVNULL,
-                )
-                await proc.wait()
-                if proc.returncode == 0:
-                    break
-                await asyncio.sleep(0.25)
-            else:
-                return {"success": False, "error": f"Interface {dev} did not appear"}
-
-            proc = await asyncio.create_subprocess_exec(
-                "ip",
-                "route",
-                "add",
-                "default",
-                "dev",
-                dev,
-                "metric",
-                str(self.ROUTE_METRIC),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await proc.wait()
-            if proc.returncode == 0:
-                self._route_added = True
-                return {"success": True}
-            err = (await proc.stderr.read()).decode("utf-8", errors="ignore").strip()
-            return {"success": False, "error": err}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        dev = self.TUN_INTERFACE
+        # Wait for xray-core to create the interface (sysfs, no ip process per poll)
+        for _ in range(20):
+            if os.path.exists(os.path.join(self.SYSFS_NET, dev)):
+                break
+            await asyncio.sleep(0.25)
+        else:
+            return {"success": False, "error": f"Interface {dev} did not appear"}
+
+        result = await self.runner.run(
+            ["ip", "route", "add", "default", "dev", dev, "metric", str(self.ROUTE_METRIC)],
+            timeout=self.COMMAND_TIMEOUT,
+        )
+        if result.ok:
+            self._route_added = True
+            return {"success": True}
+        return {"success": False, "error": result.error()}
+
+    async def detect_system_route(self) -> bool:
+        """
+        Check whether the default route via xray0 exists (e.g. added by a
+        previous plugin instance) and track it so it is removed on disconnect.
+        """
+        result = await self.runner.run(
+            ["ip", "route", "show", "default", "dev", self.TUN_INTERFACE],
+            timeout=self.COMMAND_TIMEOUT,
+        )
+        self._route_added = result.ok and bool(result.stdout.strip())
+        return self._route_added
 
     async def remove_system_route(self) -> Dict[str, Any]:
         """Remove default route via xray0. Also cleanup legacy fwmark rule if present."""
-        try:
-            # Remove legacy fwmark rule/table from previous versions (ignore errors)
-            for args in [
-                ["ip", "rule", "del", "fwmark", "0x206", "table", "100"],
-                ["ip", "route", "del", "default", "table", "100"],
-            ]:
-                proc = await asyncio.create_subprocess_exec(
-                    *args,
-                    stdout=asyncio.subprocess.DEVNULL,
-                    stderr=asyncio.subprocess.DEVNULL,
-                )
-                await proc.wait()
-            if not self._route_added:
-                return {"success": True}
-            proc = await asyncio.create_subprocess_exec(
-                "ip",
-                "route",
-                "del",
-                "default",
-                "dev",
-                self.TUN_INTERFACE,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            await proc.wait()
-            self._route_added = False
-            return {"success": True}
-        except Exception as e:
-            self._route_added = False
-            return {"success": False, "error": str(e)}
+        # Legacy fwmark rule/table from previous versions may be absent:
+        # -force keeps the batch going past failed lines (errors ignored)
+        lines = ["rule del fwmark 0x206 table 100", "route del default table 100"]
+        if self._route_added:
+            lines.append(f"route del default dev {self.TUN_INTERFACE}")
+        result = await self.runner.run_batch(
+            ["ip", "-force", "-batch", "-"], lines, timeout=self.COMMAND_TIMEOUT
+        )
+        self._route_added = False
+        if result.not_found or result.timed_out:
+            return {"success": False, "error": result.error()}
+        return {"success": True}
 
     async def create_tun_interface(
         self, interface_name: Optional[str] = None
@@ -335,3 +265,9 @@ class TUNManager:
             "hasPrivileges": self.has_privileges,
             "tunInterface": self.tun_interface,
         }
+
+
+def _open_and_close(path: str) -> None:
+    """Open path read-only and close it again (raises OSError if not permitted)."""
+    with open(path, "rb"):
+        pass
@@ -0,0 +1,133 @@
+"""
+Xray Capabilities - Probes which features the installed xray-core supports
+
+Runs `xray version` once per binary and checks for geodata files next to it.
+Version and features are cached in SettingsManager keyed by binary path, size
+and mtime, so a new or updated binary is probed again and an unchanged one
+never is. Geodata files are installed separately from the binary, so they are
+checked on every call (two stat calls).
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Minimum xray-core version for each optional config feature
+FEATURE_MIN_VERSIONS: Dict[str, Tuple[int, int, int]] = {
+    "tun": (26, 1, 23),  # TUN inbound
+    "xudp": (1, 8, 0),  # mux.xudpConcurrency / xudpProxyUDP443
+    "observatory": (1, 4, 0),
+}
+
+GEODATA_FILES = ("geoip.dat", "geosite.dat")
+
+VERSION_PATTERN = re.compile(r"Xray\s+v?(\d+)\.(\d+)\.(\d+)")
+
+PROBE_TIMEOUT = 5.0
+
+SETTINGS_KEY = "xrayCapabilities"
+
+
+def parse_version(output: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Parse the version from `xray version` output.
+
+    Args:
+        output: Output such as "Xray 26.1.23 (Xray, Penetrates Everything.) ..."
+
+    Returns:
+        Version tuple, or None if not found
+    """
+    match = VERSION_PATTERN.search(output)
+    if not match:
+        return None
+    return (int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+
+def _binary_key(binary_path: str) -> Optional[Dict[str, Any]]:
+    """Cache key for the binary, or None if it does not exist."""
+    try:
+        st = os.stat(binary_path)
+    except OSError:
+        return None
+    return {"path": binary_path, "size": st.st_size, "mtime": st.st_mtime_ns}
+
+
+def _geodata(binary_path: str) -> Dict[str, bool]:
+    """Which geodata files exist in xray-core's asset directory."""
+    asset_dir = os.environ.get("XRAY_LOCATION_ASSET") or os.path.dirname(binary_path)
+    return {name: os.path.isfile(os.path.join(asset_dir, name)) for name in GEODATA_FILES}
+
+
+async def _run_version(binary_path: str) -> str:
+    """Return `xray version` output (empty string on failure)."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            binary_path,
+            "version",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+    except OSError:
+        return ""
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return ""
+    return stdout.decode("utf-8", errors="ignore")
+
+
+async def probe_capabilities(binary_path: str, settings) -> Dict[str, Any]:
+    """
+    Get xray-core capabilities, probing the binary only if it changed.
+
+    Args:
+        binary_path: Path to xray-core binary
+        settings: SettingsManager used as the probe cache
+
+    Returns:
+        {
+            'available': bool,
+            'binary': { 'path', 'size', 'mtime' },
+            'version': str | None,
+            'features': { 'tun': bool, 'xudp': bool, 'observatory': bool },
+            'geodata': { 'geoip.dat': bool, 'geosite.dat': bool },
+            'probedAt': int
+        }
+    """
+    key = _binary_key(binary_path)
+    if key is None:
+        return {"available": False, "features": {}, "geodata": {}}
+
+    geodata = _geodata(binary_path)
+    cached = settings.getSetting(SETTINGS_KEY, None)
+    if cached and cached.get("binary") == key:
+        return dict(cached, geodata=geodata)
+
+    version = parse_version(await _run_version(binary_path))
+    features = {
+        name: version is not None and version >= min_version
+        for name, min_version in FEATURE_MIN_VERSIONS.items()
+    }
+
+    result = {
+        "available": version is not None,
+        "binary": key,
+        "version": ".".join(str(part) for part in version) if version else None,
+        "features": features,
+        "probedAt": int(time.time()),
+    }
+    if version is not None:
+        # Don't cache a failed probe; the binary may just be starting up slowly
+        settings.setSetting(SETTINGS_KEY, result)
+        settings.commit()
+    result = dict(result, geodata=geodata)
+    print(
+        f"XrayCapabilities: xray-core {result['version']}, "
+        f"features {features}, geodata {geodata}"
+    )
+    return result
@@ -6,10 +6,28 @@ Generates xray-core configuration files from VLESSConfig.
 """
 
 import asyncio
+import hashlib
 import json
 import os
+import signal
 import tempfile
-from typing import Dict, Any, Optional
+import time
+from collections import OrderedDict, deque
+from typing import (
+    Any,
+    BinaryIO,
+    ClassVar,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .process_scheduling import DEFAULT_SCHEDULING, apply_scheduling, read_scheduling
+from .resource_profiles import DEFAULT_PROFILE, build_environment, build_policy
 
 
 class XrayManager:
@@ -17,72 +35,439 @@ class XrayManager:
     Manages xray-core process lifecycle.
 
     Responsibilities:
-    - Generate xray-core JSON configuration
+    - Generate xray-core JSON configuration (content-addressed, cached)
+    - Validate configs with `xray run -test` (cached per config content)
     - Start/stop xray-core subprocess
     - Monitor process health
     - Handle process crashes
+    - Hand over inbound ports to a new instance without unbinding them
+    - Re-attach to an instance that survived a plugin reload (pidfile)
     """
 
-    def __init__(self, xray_binary_path: str = "backend/out/xray-core"):
+    SOCKS_PORT = 10808  # Standard SOCKS port, avoids Steam ports
+    HTTP_PORT = 10809
+    # The API inbound is per instance: during a handover the new instance
+    # listens on the other port, so API calls never reach the retiring one
+    API_PORT = 10085
+    API_STANDBY_PORT = 10086
+    API_TAG = "api"
+    PROXY_TAG = "proxy"
+    API_TIMEOUT = 3.0
+    STARTUP_GRACE = 0.5
+    HANDOVER_READY_TIMEOUT = 5.0
+    DRAIN_TIMEOUT = 10.0
+    DRAIN_POLL_INTERVAL = 0.25
+    # SIGTERM -> SIGKILL grace on stop: a multiple of recent clean shutdown
+    # times, clamped (a healthy xray-core exits in a few milliseconds)
+    STOP_GRACE_MIN = 0.2
+    STOP_GRACE_MAX = 2.0
+    STOP_GRACE_FACTOR = 4
+    VALIDATE_TIMEOUT = 10.0
+    CONFIG_CACHE_SIZE = 4
+    CONFIG_PREFIX = "xray-config-"
+    CONFIG_INDEX = "xray-config-index.json"
+    LOG_FILE = "xray.log"
+    LOG_MAX_BYTES = 1024 * 1024
+    PID_FILE = "xray.pid"
+    ADOPT_PROBE_TIMEOUT = 1.0
+
+    # Used instead of geoip:private when geoip.dat is not installed
+    PRIVATE_CIDRS: ClassVar[List[str]] = [
+        "0.0.0.0/8",
+        "10.0.0.0/8",
+        "100.64.0.0/10",
+        "127.0.0.0/8",
+        "169.254.0.0/16",
+        "172.16.0.0/12",
+        "192.168.0.0/16",
+        "224.0.0.0/4",
+        "255.255.255.255/32",
+        "::1/128",
+        "fc00::/7",
+        "fe80::/10",
+    ]
+
+    # VLESSConfig fields that affect the rendered config (not e.g. timestamps)
+    # Bump when _build_xray_config changes, so cached renders are not reused
+    CONFIG_TEMPLATE_VERSION = 4
+    RENDER_FIELDS = (
+        "uuid",
+        "address",
+        "port",
+        "flow",
+        "encryption",
+        "network",
+        "security",
+        "realityConfig",
+        "mux",
+    )
+
+    # setsockopt(SOL_SOCKET, SO_REUSEPORT, 1) on Linux, so a second instance can
+    # bind the same inbound ports while the first one is still listening
+    REUSEPORT_SOCKOPT: ClassVar[Dict[str, Any]] = {
+        "customSockopt": [
+            {"system": "linux", "type": "int", "level": "1", "opt": "15", "value": "1"}
+        ]
+    }
+
+    def __init__(
+        self,
+        xray_binary_path: str = "backend/out/xray-core",
+        runtime_dir: Optional[str] = None,
+    ):
         """
         Initialize XrayManager.
 
         Args:
             xray_binary_path: Path to xray-core binary
+            runtime_dir: Directory for rendered configs (default: system temp dir)
         """
         self.xray_binary_path = xray_binary_path
+        self.runtime_dir = runtime_dir or tempfile.gettempdir()
+        # Render key -> config path, most recently used last (persisted so the
+        # first connect after a reboot reuses the rendered file)
+        self._config_cache: "OrderedDict[str, str]" = self._load_config_index()
+        # Serializes cache misses: a sweep must not remove a file another
+        # render just wrote. Created per event loop, like CommandRunner's slot
+        self._render_lock: Optional[asyncio.Lock] = None
+        self._render_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        # (config path, binary identity) -> `xray run -test` result
+        self._validated: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Result of xray_capabilities.probe_capabilities(); None = not probed
+        self.capabilities: Optional[Dict[str, Any]] = None
+        # Resource profile for new configs/processes, and of the running process
+        self.resource_profile: str = DEFAULT_PROFILE
+        self.running_profile: Optional[str] = None
+        # CPU/IO scheduling for the xray-core process (see process_scheduling)
+        self.scheduling: Dict[str, Any] = dict(DEFAULT_SCHEDULING)
+        self.scheduling_report: Optional[Dict[str, Any]] = None
+        # XUDP mux for every node (xudp setting); a node can request it itself
+        self.xudp: bool = False
+        # asyncio Process, or _AdoptedProcess after adopt()
         self.process: Optional[asyncio.subprocess.Process] = None
+        self._log_offset: int = 0
+        # Seconds from SIGTERM to exit of recent clean stops
+        self._shutdown_times: Deque[float] = deque(maxlen=8)
+        # Config of the running instance (the supervisor's restart target) and
+        # its inputs; set only once an instance runs it (start/handover/adopt)
         self.config_file: Optional[str] = None
+        self.api_port: int = self.API_PORT
         self.process_id: Optional[int] = None
+        self.tun_mode: bool = False
+        self.outbound_interface: Optional[str] = None
+        # Config on the running process's command line; differs from
+        # config_file after an in-place outbound update
+        self._launch_config: Optional[str] = None
+        # Config path -> {'tunMode', 'outboundInterface', 'apiPort'} it was rendered with
+        self._rendered: Dict[str, Dict[str, Any]] = {}
 
-    def generate_config(
+    async def generate_config(
         self,
         vless_config: Dict[str, Any],
         tun_mode: bool = False,
         outbound_interface: Optional[str] = None,
+        api_port: Optional[int] = None,
     ) -> str:
         """
         Generate xray-core JSON configuration from VLESSConfig.
 
+        Only renders: the running state (config_file, tun_mode, ...) changes
+        when start() or handover() succeeds with the returned path. A cache
+        miss writes the file, prunes the cache and saves the index in the
+        default executor.
+
         Args:
             vless_config: VLESSConfig dictionary
             tun_mode: Whether to enable TUN mode
             outbound_interface: For TUN mode, bind proxy to this interface (e.g. wlan0)
+            api_port: API inbound port (default: the running instance's port;
+                use standby_api_port() for a config passed to handover())
 
         Returns:
             Path to generated config file
         """
-        # Create temporary config file
-        config_dir = tempfile.gettempdir()
-        config_file = os.path.join(config_dir, f"xray-config-{os.getpid()}.json")
-
-        # Generate xray-core config
-        xray_config = self._build_xray_config(
-            vless_config, tun_mode, outbound_interface
-        )
+        api_port = api_port or self.api_port
+        key = self._render_key(vless_config, tun_mode, outbound_interface, api_port)
+        async with self._render_slot():
+            config_file = self._config_cache.get(key)
+            if config_file is not None and not os.path.exists(config_file):
+                # Deleted behind our back (e.g. a cleaned temp dir): render again
+                del self._config_cache[key]
+                config_file = None
+            if config_file is None:
+                xray_config = self._build_xray_config(
+                    vless_config, tun_mode, outbound_interface, api_port
+                )
+                loop = asyncio.get_running_loop()
+                config_file = await loop.run_in_executor(
+                    None, self._write_config, xray_config
+                )
+                self._config_cache[key] = config_file
+                keep = self._prune_config_cache()
+                await loop.run_in_executor(
+                    None,
+                    self._sweep_and_save_index,
+                    keep,
+                    list(self._config_cache.items()),
+                )
+            else:
+                self._config_cache.move_to_end(key)
 
-        # Write config file
-        with open(config_file, "w") as f:
-            json.dump(xray_config, f, indent=2)
+        self._rendered[config_file] = {
+            "tunMode": bool(tun_mode),
+            "outboundInterface": outbound_interface,
+            "apiPort": api_port,
+        }
+        return config_file
 
+    def _set_running_config(self, config_file: str) -> None:
+        """Record config_file (and its render inputs) as the running config."""
+        rendered = self._rendered.get(config_file, {})
         self.config_file = config_file
+        self.tun_mode = rendered.get("tunMode", False)
+        self.outbound_interface = rendered.get("outboundInterface")
+        self.api_port = rendered.get("apiPort", self.API_PORT)
+
+    def _render_slot(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._render_lock is None or self._render_lock_loop is not loop:
+            self._render_lock = asyncio.Lock()
+            self._render_lock_loop = loop
+        return self._render_lock
+
+    def standby_api_port(self) -> int:
+        """API port for the next instance, different from the running one's."""
+        if self.api_port == self.API_PORT:
+            return self.API_STANDBY_PORT
+        return self.API_PORT
+
+    def _render_key(
+        self,
+        vless_config: Dict[str, Any],
+        tun_mode: bool,
+        outbound_interface: Optional[str],
+        api_port: int,
+    ) -> str:
+        """Hash of every input that affects the rendered config."""
+        inputs = {
+            "template": self.CONFIG_TEMPLATE_VERSION,
+            "vless": {k: vless_config.get(k) for k in self.RENDER_FIELDS},
+            "tun": bool(tun_mode),
+            "interface": outbound_interface if tun_mode else None,
+            "profile": self.resource_profile,
+            "xudp": self.xudp,
+            "apiPort": api_port,
+            "capabilities": [
+                (self.capabilities or {}).get("features"),
+                (self.capabilities or {}).get("geodata"),
+            ],
+        }
+        encoded = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _write_config(self, xray_config: Dict[str, Any]) -> str:
+        """
+        Write a rendered config under its content hash (write-to-temp + rename).
+
+        Returns:
+            Path to the config file
+        """
+        data = json.dumps(xray_config, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+        config_file = os.path.join(
+            self.runtime_dir, f"{self.CONFIG_PREFIX}{digest}.json"
+        )
+        if os.path.isfile(config_file):
+            return config_file
+
+        os.makedirs(self.runtime_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{self.CONFIG_PREFIX}", suffix=".tmp", dir=self.runtime_dir
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, config_file)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
         return config_file
 
-    def _build_xray_config(
+    def _load_config_index(self) -> "OrderedDict[str, str]":
+        """Render key -> config path entries whose file still exists."""
+        try:
+            with open(os.path.join(self.runtime_dir, self.CONFIG_INDEX)) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return OrderedDict()
+        if not isinstance(entries, list):
+            return OrderedDict()
+        return OrderedDict(
+            (key, path)
+            for key, path in entries
+            if isinstance(key, str) and isinstance(path, str) and os.path.isfile(path)
+        )
+
+    def _prune_config_cache(self) -> Set[Optional[str]]:
+        """
+        Drop least recently used configs beyond CONFIG_CACHE_SIZE.
+
+        Returns:
+            Config paths whose files must be kept: the cache and the running config
+        """
+        while len(self._config_cache) > self.CONFIG_CACHE_SIZE:
+            self._config_cache.popitem(last=False)
+        keep = set(self._config_cache.values())
+        keep.add(self.config_file)
+        self._validated = {k: v for k, v in self._validated.items() if k[0] in keep}
+        return keep
+
+    def _sweep_and_save_index(
+        self, keep: Set[Optional[str]], entries: List[Tuple[str, str]]
+    ) -> None:
+        """
+        Blocking part of a cache miss: remove rendered configs and validation
+        markers not in keep (e.g. evicted, or left behind by a lost index or an
+        older version) except the pidfile's config, then persist the index
+        (write-to-temp + rename).
+        """
+        keep = set(keep)
+        record = self._read_pidfile()
+        if record is not None:
+            keep.add(record.get("configFile"))
+        try:
+            names = os.listdir(self.runtime_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if not name.startswith(self.CONFIG_PREFIX) or name == self.CONFIG_INDEX:
+                continue
+            path = os.path.join(self.runtime_dir, name)
+            # <config>.json, or its marker <config>.json.<binary>.valid
+            if path.split(".json", 1)[0] + ".json" in keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        path = os.path.join(self.runtime_dir, self.CONFIG_INDEX)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(entries, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"XrayManager: failed to save config index: {e}")
+
+    def _validation_marker(self, config_file: str, identity: str) -> str:
+        """Marker next to config_file recording that identity's binary accepted it."""
+        digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:12]
+        return f"{config_file}.{digest}.valid"
+
+    def _binary_identity(self) -> str:
+        """Identity of the xray-core binary; validation results depend on it."""
+        try:
+            st = os.stat(self.xray_binary_path)
+            return f"{self.xray_binary_path}:{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            return self.xray_binary_path
+
+    async def validate_config(self, config_file: str) -> Dict[str, Any]:
+        """
+        Check a config with `xray run -test`. Results are cached per config file
+        (which is named by content hash) and binary identity (path, size,
+        mtime), in memory and in a `.<binary>.valid` marker next to the file,
+        so a known-good config is never re-validated by the same binary and an
+        upgraded xray-core checks it again.
+
+        Args:
+            config_file: Path to xray-core config file
+
+        Returns:
+            Dictionary with success status and, on failure, xray's error
+        """
+        identity = self._binary_identity()
+        cached = self._validated.get((config_file, identity))
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        marker = self._validation_marker(config_file, identity)
+        if await loop.run_in_executor(None, _read_text, marker) == identity:
+            self._validated[(config_file, identity)] = {"success": True}
+            return self._validated[(config_file, identity)]
+
+        binary_error = self._check_binary()
+        if binary_error:
+            return binary_error
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.xray_binary_path,
+                "run",
+                "-test",
+                "-config",
+                config_file,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+            try:
+                stdout, _ = await asyncio.wait_for(
+                    process.communicate(), timeout=self.VALIDATE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                # Inconclusive: let start() report the real problem
+                return {"success": True, "validated": False}
+        except Exception as e:
+            return {"success": True, "validated": False, "error": str(e)}
+
+        if process.returncode != 0:
+            output = stdout.decode("utf-8", errors="ignore").strip()
+            result = {
+                "success": False,
+                "error": f"xray-core rejected the config: {output or process.returncode}",
+                "errorCode": "CONFIG_TEST_FAILED",
+            }
+            self._validated[(config_file, identity)] = result
+            return result
+
+        result = {"success": True}
+        self._validated[(config_file, identity)] = result
+        await loop.run_in_executor(None, _write_text, marker, identity)
+        return result
+
+    def supports(self, feature: str) -> bool:
+        """
+        Whether the probed xray-core supports a feature (see xray_capabilities).
+        Before a probe, features the config relied on previously are assumed.
+        """
+        if self.capabilities is None:
+            return feature in ("tun", "geoip.dat")
+        if feature.endswith(".dat"):
+            return bool(self.capabilities.get("geodata", {}).get(feature))
+        return bool(self.capabilities.get("features", {}).get(feature))
+
+    def _build_outbound(
         self,
         vless_config: Dict[str, Any],
         tun_mode: bool,
         outbound_interface: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        Build xray-core JSON configuration structure.
+        Build the VLESS "proxy" outbound.
 
         Args:
             vless_config: VLESSConfig dictionary
-            tun_mode: Whether to enable TUN mode
+            tun_mode: Whether TUN mode is enabled
+            outbound_interface: For TUN mode, bind proxy to this interface
 
         Returns:
-            xray-core configuration dictionary
+            xray-core outbound dictionary
         """
         # Extract VLESS config components
         uuid = vless_config.get("uuid")
@@ -97,7 +482,7 @@ class XrayManager:
         # Build outbound configuration (tag "proxy" for routing)
         outbound = {
             "protocol": "vless",
-            "tag": "proxy",
+            "tag": self.PROXY_TAG,
             "settings": {
                 "vnext": [
                     {
@@ -138,21 +523,83 @@ class XrayManager:
         if tun_mode and outbound_interface:
             outbound["streamSettings"]["sockopt"] = {"interface": outbound_interface}
 
-        # Build complete config
+        # XUDP for UDP only (TCP is not muxed), when the node (mux=1) or the
+        # xudp setting asks for it; servers without mux support drop such
+        # connections. Vision flows handle UDP themselves and reject mux.
+        mux_requested = bool(vless_config.get("mux")) or self.xudp
+        if mux_requested and not flow and self.supports("xudp"):
+            outbound["mux"] = {
+                "enabled": True,
+                "concurrency": -1,
+                "xudpConcurrency": 16,
+                "xudpProxyUDP443": "skip",
+            }
+
+        return outbound
+
+    def _build_xray_config(
+        self,
+        vless_config: Dict[str, Any],
+        tun_mode: bool,
+        outbound_interface: Optional[str] = None,
+        api_port: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build xray-core JSON configuration structure.
+
+        Args:
+            vless_config: VLESSConfig dictionary
+            tun_mode: Whether to enable TUN mode
+            api_port: API inbound port (default: API_PORT)
+
+        Returns:
+            xray-core configuration dictionary
+        """
+        outbound = self._build_outbound(vless_config, tun_mode, outbound_interface)
+
+        # Build complete config. The API inbound exposes HandlerService on
+        # loopback so update_outbound() can swap the proxy outbound in place,
+        # and StatsService for the proxy outbound's traffic counters. It is not
+        # shared via SO_REUSEPORT: each instance gets its own port.
+        policy = build_policy(self.resource_profile)
+        policy["system"] = {"statsOutboundUplink": True, "statsOutboundDownlink": True}
         config = {
             "log": {"loglevel": "warning"},
-            "inbounds": [],
+            "policy": policy,
+            "stats": {},
+            "api": {"tag": self.API_TAG, "services": ["HandlerService", "StatsService"]},
+            "inbounds": [
+                {
+                    "protocol": "dokodemo-door",
+                    "listen": "127.0.0.1",
+                    "port": api_port or self.API_PORT,
+                    "settings": {"address": "127.0.0.1"},
+                    "tag": self.API_TAG,
+                }
+            ],
             "outbounds": [outbound],
+            "routing": {
+                "rules": [
+                    {
+                        "type": "field",
+                        "inboundTag": [self.API_TAG],
+                        "outboundTag": self.API_TAG,
+                    }
+                ]
+            },
         }
+        rules = config["routing"]["rules"]
 
         # Always add SOCKS proxy inbound (needed for System Proxy mode)
-        # This allows System Proxy to work both with and without TUN mode
+        # This allows System Proxy to work both with and without TUN mode.
+        # SO_REUSEPORT lets handover() start the next instance on the same port.
         config["inbounds"].append(
             {
                 "protocol": "socks",
                 "listen": "127.0.0.1",
-                "port": 10808,  # Standard SOCKS port, avoids Steam ports
+                "port": self.SOCKS_PORT,
                 "settings": {"udp": True},
+                "streamSettings": {"sockopt": self.REUSEPORT_SOCKOPT},
                 "tag": "socks",
             }
         )
@@ -162,7 +609,8 @@ class XrayManager:
             {
                 "protocol": "http",
                 "listen": "127.0.0.1",
-                "port": 10809,  # HTTP proxy port
+                "port": self.HTTP_PORT,
+                "streamSettings": {"sockopt": self.REUSEPORT_SOCKOPT},
                 "tag": "http",
             }
         )
@@ -177,25 +625,23 @@ class XrayManager:
             }
 
             # Routing: TUN inbound -> proxy (VLESS); private IPs bypass via direct
-            # SOCKS/HTTP inbounds also route to proxy.
-            # Requires geoip.dat alongside the xray-core binary (shipped in release).
-            config["routing"] = {
-                "domainStrategy": "IPIfNonMatch",
-                "rules": [
+            # geoip:private needs geoip.dat alongside the xray-core binary
+            # (shipped in release); fall back to literal ranges without it.
+            private_ips = (
+                ["geoip:private"] if self.supports("geoip.dat") else self.PRIVATE_CIDRS
+            )
+            config["routing"]["domainStrategy"] = "IPIfNonMatch"
+            rules.extend(
+                [
                     # Bypass private/LAN IPs (127.x, 10.x, 192.168.x, etc.)
-                    {"type": "field", "ip": ["geoip:private"], "outboundTag": "direct"},
+                    {"type": "field", "ip": private_ips, "outboundTag": "direct"},
                     # All TUN traffic goes through VLESS proxy
                     {"type": "field", "inboundTag": ["tun"], "outboundTag": "proxy"},
-                    # SOCKS/HTTP inbound traffic goes through proxy
-                    {
-                        "type": "field",
-                        "inboundTag": ["socks", "http"],
-                        "outboundTag": "proxy",
-                    },
-                ],
-            }
+                ]
+            )
 
-            # TUN inbound — supported since xray-core v26.1.23.
+            # TUN inbound — supported since xray-core v26.1.23 (callers check
+            # supports("tun") before requesting TUN mode).
             # xray-core creates the TUN interface; no settings required.
             # System routing must still be set up externally (tun_manager).
             config["inbounds"].append(
@@ -207,65 +653,350 @@ class XrayManager:
 
             config["outbounds"].append(direct_outbound)
 
+        # SOCKS/HTTP inbound traffic goes through proxy. Explicit rule, because
+        # a re-added proxy outbound is no longer the first (default) outbound.
+        rules.append(
+            {
+                "type": "field",
+                "inboundTag": ["socks", "http"],
+                "outboundTag": self.PROXY_TAG,
+            }
+        )
+
         return config
 
-    async def start(self, config_file: str) -> Dict[str, Any]:
+    def _check_binary(self) -> Optional[Dict[str, Any]]:
+        """Return an error response if the xray-core binary is unusable."""
+        # Check if binary exists
+        if not os.path.exists(self.xray_binary_path):
+            return {
+                "success": False,
+                "error": f"xray-core binary not found at {self.xray_binary_path}",
+                "errorCode": "BINARY_NOT_FOUND",
+            }
+
+        # Check if binary is executable
+        if not os.access(self.xray_binary_path, os.X_OK):
+            return {
+                "success": False,
+                "error": f"xray-core binary is not executable: {self.xray_binary_path}",
+                "errorCode": "BINARY_NOT_EXECUTABLE",
+            }
+        return None
+
+    async def _spawn(
+        self, config_file: str, resource_profile: str
+    ) -> asyncio.subprocess.Process:
+        """
+        Start an xray-core subprocess for config_file.
+
+        Output goes to a log file rather than pipes and the process gets its own
+        session, so it keeps running if the plugin process goes away (a Go
+        program writing to a broken stdout pipe dies of SIGPIPE).
+        """
+        log = await asyncio.get_running_loop().run_in_executor(None, self._open_log)
+        with log:
+            self._log_offset = log.tell()
+            return await asyncio.create_subprocess_exec(
+                self.xray_binary_path,
+                "-config",
+                config_file,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=log,
+                stderr=asyncio.subprocess.STDOUT,
+                env=build_environment(resource_profile, os.environ),
+                start_new_session=True,
+            )
+
+    def _open_log(self) -> BinaryIO:
+        """Open the xray-core log for appending, truncating it beyond LOG_MAX_BYTES."""
+        log_path = os.path.join(self.runtime_dir, self.LOG_FILE)
+        os.makedirs(self.runtime_dir, exist_ok=True)
+        try:
+            if os.path.getsize(log_path) > self.LOG_MAX_BYTES:
+                os.truncate(log_path, 0)
+        except OSError:
+            pass
+        return open(log_path, "ab")
+
+    def _read_exit_error(self) -> str:
+        """Read the startup error of the last spawned xray-core from its log."""
+        # xray-core outputs startup errors to stdout (not stderr); both go
+        # to the log, starting at the offset recorded by _spawn().
+        try:
+            with open(os.path.join(self.runtime_dir, self.LOG_FILE), "rb") as log:
+                log.seek(self._log_offset)
+                output = log.read(64 * 1024)
+        except OSError:
+            return "Unknown error"
+        return output.decode("utf-8", errors="ignore").strip() or "Unknown error"
+
+    async def _write_pidfile(self) -> None:
+        """Record the running instance so a reloaded plugin can adopt it."""
+        record = {
+            "pid": self.process_id,
+            "binary": self.xray_binary_path,
+            "configFile": self.config_file,
+            "launchConfigFile": self._launch_config,
+            "tunMode": self.tun_mode,
+            "outboundInterface": self.outbound_interface,
+            "profile": self.running_profile,
+            "apiPort": self.api_port,
+            "startedAt": int(time.time()),
+        }
+        await asyncio.get_running_loop().run_in_executor(None, self._store_pidfile, record)
+
+    def _store_pidfile(self, record: Dict[str, Any]) -> None:
+        """Blocking part of _write_pidfile(): hash the config, write atomically."""
+        try:
+            with open(record["configFile"], "rb") as f:
+                record["configHash"] = hashlib.sha256(f.read()).hexdigest()
+            path = os.path.join(self.runtime_dir, self.PID_FILE)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"XrayManager: failed to write pidfile: {e}")
+
+    def _remove_pidfile(self) -> None:
+        try:
+            os.remove(os.path.join(self.runtime_dir, self.PID_FILE))
+        except OSError:
+            pass
+
+    def _read_pidfile(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.runtime_dir, self.PID_FILE)) as f:
+                record = json.load(f)
+            return record if isinstance(record, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _is_our_process(self, record: Dict[str, Any]) -> bool:
+        """True if the pidfile's PID is still xray-core running its config."""
+        try:
+            with open(f"/proc/{int(record['pid'])}/cmdline", "rb") as f:
+                argv = f.read().rstrip(b"\0").split(b"\0")
+        except (OSError, KeyError, TypeError, ValueError):
+            return False
+        launch_config = record.get("launchConfigFile") or record.get("configFile")
+        expected = [self.xray_binary_path, "-config", launch_config or ""]
+        # Suffix match: a script wrapper shows up with its interpreter first
+        return [a.decode("utf-8", errors="ignore") for a in argv[-3:]] == expected
+
+    def _is_leftover_instance(self, pid: int) -> bool:
+        """
+        True if pid runs one of our rendered configs (any binary path): an
+        xray-core of an earlier plugin instance whose pidfile was lost or not
+        adoptable.
         """
-        Start xray-core process with given config file.
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                argv = f.read().rstrip(b"\0").split(b"\0")
+        except OSError:
+            return False
+        if len(argv) < 2 or argv[-2] != b"-config":
+            return False
+        config_file = argv[-1].decode("utf-8", errors="ignore")
+        return os.path.dirname(config_file) == self.runtime_dir and os.path.basename(
+            config_file
+        ).startswith(self.CONFIG_PREFIX)
+
+    def _inbound_port_holders(self) -> Tuple[Set[int], Set[int], bool]:
+        """
+        Processes listening on the SOCKS/HTTP ports (blocking /proc scan, only
+        when something listens).
+
+        Returns:
+            (leftover xray-core pids, other pids, True if every listening
+            socket's owner was found)
+        """
+        listening: Set[str] = set()
+        for port in (self.SOCKS_PORT, self.HTTP_PORT):
+            listening |= _socket_inodes(port, _TCP_LISTEN)
+        leftovers: Set[int] = set()
+        others: Set[int] = set()
+        if not listening:
+            return leftovers, others, True
+        found: Set[str] = set()
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            held = (_process_socket_inodes(int(name)) or set()) & listening
+            if held:
+                found |= held
+                if self._is_leftover_instance(int(name)):
+                    leftovers.add(int(name))
+                else:
+                    others.add(int(name))
+        return leftovers, others, found == listening
+
+    async def _claim_inbound_ports(self) -> Optional[Dict[str, Any]]:
+        """
+        Make sure a fresh instance will be the only one on the SOCKS/HTTP ports.
+
+        The inbounds use SO_REUSEPORT for handover(), so a second xray-core
+        still listening there would silently get part of the connections.
+        Leftover instances of ours are terminated; any other or unidentified
+        listener makes start() fail instead.
+
+        Returns:
+            Error response, or None if the ports are free
+        """
+        leftovers, others, complete = await asyncio.get_running_loop().run_in_executor(
+            None, self._inbound_port_holders
+        )
+        if self.is_running():
+            # The managed instance is not a leftover
+            leftovers.discard(self.process.pid)
+            others.discard(self.process.pid)
+        if others or not complete:
+            holders = ", ".join(str(pid) for pid in sorted(others)) or "unknown"
+            return {
+                "success": False,
+                "error": (
+                    f"Proxy ports {self.SOCKS_PORT}/{self.HTTP_PORT} are in use by "
+                    f"another process (pid {holders})"
+                ),
+                "errorCode": "PORT_IN_USE",
+            }
+        for pid in leftovers:
+            print(f"XrayManager: stopping leftover xray-core on the proxy ports (pid {pid})")
+            await _terminate(_AdoptedProcess(pid), 5.0)
+        return None
+
+    async def probe_ready(self, pid: int) -> bool:
+        """
+        Readiness probe: pid owns the inbound listening sockets and the SOCKS
+        port accepts connections.
+        """
+        owned = _process_socket_inodes(pid)
+        if owned is None or not all(
+            _socket_inodes(port, _TCP_LISTEN) & owned
+            for port in (self.SOCKS_PORT, self.HTTP_PORT)
+        ):
+            return False
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection("127.0.0.1", self.SOCKS_PORT),
+                timeout=self.ADOPT_PROBE_TIMEOUT,
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    async def adopt(self) -> Dict[str, Any]:
+        """
+        Re-attach to an xray-core left running by a previous plugin instance.
+
+        The pidfile's PID must still run this binary with the recorded launch config
+        (checked via /proc/<pid>/cmdline), the config content must match the
+        recorded hash, and the readiness probe must pass. A surviving but
+        unhealthy instance is terminated; the pidfile is removed either way.
+
+        Returns:
+            Dictionary with success status, process ID and the recorded state
+            (configFile, tunMode, outboundInterface, profile, startedAt)
+        """
+        record = self._read_pidfile()
+        if record is None:
+            return {"success": False, "error": "No pidfile"}
+        if self.is_running():
+            return {"success": False, "error": "xray-core already managed"}
+
+        if not self._is_our_process(record):
+            self._remove_pidfile()
+            return {"success": False, "error": "Recorded xray-core is not running"}
+
+        pid = int(record["pid"])
+        process = _AdoptedProcess(pid)
+        config_file = record.get("configFile")
+        config_hash = await asyncio.get_running_loop().run_in_executor(
+            None, _file_sha256, config_file
+        )
+        config_ok = config_hash is not None and config_hash == record.get("configHash")
+
+        if not config_ok or not await self.probe_ready(pid):
+            print(f"XrayManager: stopping unhealthy orphaned xray-core (pid {pid})")
+            await _terminate(process, 5.0)
+            self._remove_pidfile()
+            return {"success": False, "error": "Recorded xray-core is unhealthy"}
+
+        self.process = process
+        self.process_id = pid
+        # Restarts of the adopted config keep its recorded inputs
+        self._rendered[config_file] = {
+            "tunMode": bool(record.get("tunMode")),
+            "outboundInterface": record.get("outboundInterface"),
+            "apiPort": record.get("apiPort") or self.API_PORT,
+        }
+        self._set_running_config(config_file)
+        self._launch_config = record.get("launchConfigFile") or config_file
+        self.running_profile = record.get("profile") or self.resource_profile
+        return {
+            "success": True,
+            "processId": pid,
+            "configFile": config_file,
+            "tunMode": self.tun_mode,
+            "outboundInterface": self.outbound_interface,
+            "profile": self.running_profile,
+            "startedAt": record.get("startedAt"),
+        }
+
+    async def start(
+        self, config_file: str, resource_profile: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Start xray-core process with given config file. A leftover xray-core
+        of ours still listening on the proxy ports is stopped first; any other
+        listener there fails the start (PORT_IN_USE).
 
         Args:
             config_file: Path to xray-core config file
+            resource_profile: "default", "gaming", "balanced" or "download" Go runtime
+                settings (see resource_profiles); default: self.resource_profile.
+                The config's policy block comes from generate_config().
 
         Returns:
             Dictionary with success status and process ID
         """
         try:
-            # Check if binary exists
-            if not os.path.exists(self.xray_binary_path):
-                return {
-                    "success": False,
-                    "error": f"xray-core binary not found at {self.xray_binary_path}",
-                    "errorCode": "BINARY_NOT_FOUND",
-                }
+            binary_error = self._check_binary()
+            if binary_error:
+                return binary_error
+            port_error = await self._claim_inbound_ports()
+            if port_error:
+                return port_error
 
-            # Check if binary is executable
-            if not os.access(self.xray_binary_path, os.X_OK):
-                return {
-                    "success": False,
-                    "error": f"xray-core binary is not executable: {self.xray_binary_path}",
-                    "errorCode": "BINARY_NOT_EXECUTABLE",
-                }
+            profile = resource_profile or self.resource_profile
 
             # Start xray-core subprocess
-            self.process = await asyncio.create_subprocess_exec(
-                self.xray_binary_path,
-                "-config",
-                config_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
+            self.process = await self._spawn(config_file, profile)
 
             self.process_id = self.process.pid
-            self.config_file = config_file
+            self.apply_scheduling()
 
             # Wait a moment to check if process started successfully
-            await asyncio.sleep(0.5)
+            await asyncio.sleep(self.STARTUP_GRACE)
 
             if self.process.returncode is not None:
                 # Process exited immediately (error)
-                # xray-core outputs startup errors to stdout (not stderr),
-                # so read both streams to capture the actual error message.
-                stderr = await self.process.stderr.read()
-                stdout = await self.process.stdout.read()
-                stderr_text = stderr.decode("utf-8", errors="ignore").strip() if stderr else ""
-                stdout_text = stdout.decode("utf-8", errors="ignore").strip() if stdout else ""
-                error_msg = stderr_text or stdout_text or "Unknown error"
+                error_msg = self._read_exit_error()
                 return {
                     "success": False,
                     "error": f"xray-core process failed to start: {error_msg}",
                     "errorCode": "PROCESS_START_FAILED",
                 }
 
+            # Again for Go runtime threads created during startup
+            self.apply_scheduling()
+            self._set_running_config(config_file)
+            self._launch_config = config_file
+            self.running_profile = profile
+            await self._write_pidfile()
+
             return {"success": True, "processId": self.process_id}
 
         except Exception as e:
@@ -275,40 +1006,313 @@ class XrayManager:
                 "errorCode": "PROCESS_START_ERROR",
             }
 
-    async def stop(self) -> Dict[str, Any]:
+    async def handover(self, config_file: str) -> Dict[str, Any]:
         """
-        Stop xray-core process.
+        Replace the running xray-core with a new instance without unbinding the
+        SOCKS/HTTP inbound ports.
+
+        The new instance binds the same ports via SO_REUSEPORT. Once it owns a
+        listening socket on every inbound port it becomes the managed process,
+        and the old instance is drained and terminated in the background.
+        Not usable in TUN mode: two instances cannot own the same TUN interface.
+
+        Args:
+            config_file: Path to the new xray-core config file, rendered with
+                api_port=standby_api_port()
 
         Returns:
-            Dictionary with success status
+            Dictionary with success status, process ID and handover duration
         """
+        old_process = self.process
+        if old_process is None or old_process.returncode is not None:
+            return await self.start(config_file)
+
         try:
-            if self.process is None:
-                return {"success": True, "message": "No process running"}
+            binary_error = self._check_binary()
+            if binary_error:
+                return binary_error
+
+            api_port = self._rendered.get(config_file, {}).get("apiPort", self.API_PORT)
+            if api_port == self.api_port:
+                return {
+                    "success": False,
+                    "error": f"xray-core handover failed: API port {api_port} is in use",
+                    "errorCode": "HANDOVER_FAILED",
+                }
+
+            started_at = time.monotonic()
+            profile = self.resource_profile
+            new_process = await self._spawn(config_file, profile)
+            ready = await self._wait_listening(
+                new_process,
+                (self.SOCKS_PORT, self.HTTP_PORT, api_port),
+                self.HANDOVER_READY_TIMEOUT,
+            )
+            if not ready:
+                if new_process.returncode is None:
+                    new_process.kill()
+                    await new_process.wait()
+                    error_msg = "new instance did not bind inbound ports"
+                else:
+                    error_msg = self._read_exit_error()
+                return {
+                    "success": False,
+                    "error": f"xray-core handover failed: {error_msg}",
+                    "errorCode": "HANDOVER_FAILED",
+                }
+
+            old_api_port = self.api_port
+            self.process = new_process
+            self.process_id = new_process.pid
+            self._set_running_config(config_file)
+            self._launch_config = config_file
+            self.running_profile = profile
+            self.apply_scheduling()
+            await self._write_pidfile()
+            asyncio.ensure_future(self._drain_and_stop(old_process, old_api_port))
+
+            return {
+                "success": True,
+                "processId": self.process_id,
+                "handoverMs": int((time.monotonic() - started_at) * 1000),
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"xray-core handover failed: {str(e)}",
+                "errorCode": "HANDOVER_FAILED",
+            }
+
+    async def _wait_listening(
+        self,
+        process: asyncio.subprocess.Process,
+        ports: Iterable[int],
+        timeout: float,
+    ) -> bool:
+        """Wait until process owns a listening TCP socket on every port."""
+        ports = set(ports)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.returncode is not None:
+                return False
+            owned = _process_socket_inodes(process.pid)
+            if owned is None:
+                # /proc unavailable: fall back to the startup grace period
+                await asyncio.sleep(self.STARTUP_GRACE)
+                return process.returncode is None
+            if all(_socket_inodes(port, _TCP_LISTEN) & owned for port in ports):
+                return True
+            await asyncio.sleep(0.05)
+        return False
 
-            # Terminate process
-            self.process.terminate()
+    async def _drain_and_stop(
+        self, process: asyncio.subprocess.Process, api_port: int
+    ) -> None:
+        """
+        Retire the old instance after a handover: remove its SOCKS/HTTP
+        inbounds through its own API port, so new connections only reach the
+        new instance, wait for its established connections to close, then
+        terminate it.
+        """
+        ports = (self.SOCKS_PORT, self.HTTP_PORT)
+        returncode, output = await self._run_api(
+            ["rmi", "socks", "http"], api_port=api_port
+        )
+        if returncode != 0:
+            # Still listening in the REUSEPORT group: drain until the timeout
+            print(f"XrayManager: failed to remove old inbounds: {output or returncode}")
+        deadline = time.monotonic() + self.DRAIN_TIMEOUT
+        while process.returncode is None and time.monotonic() < deadline:
+            owned = _process_socket_inodes(process.pid)
+            if owned is None:
+                break
+            if not any(_socket_inodes(port, _TCP_ESTABLISHED) & owned for port in ports):
+                break
+            await asyncio.sleep(self.DRAIN_POLL_INTERVAL)
 
-            # Wait for process to terminate (with timeout)
+        await _terminate(process, 5.0)
+
+    async def update_outbound(self, vless_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replace the "proxy" outbound of the running xray-core in place through
+        the HandlerService API, keeping inbounds, TUN and routing alive.
+
+        The on-disk config is regenerated and validated first (cached), so a
+        rejected outbound never replaces a working one and a later restart uses
+        the new outbound. If the add fails after the old outbound was removed,
+        the instance has no proxy outbound at all: outside TUN mode it is
+        replaced through handover(); in TUN mode an error is returned and the
+        caller restarts.
+
+        Args:
+            vless_config: VLESSConfig dictionary for the new outbound
+
+        Returns:
+            Dictionary with success status, process ID and method ('api' or
+            'handover')
+        """
+        if not self.is_running():
+            return {
+                "success": False,
+                "error": "xray-core is not running",
+                "errorCode": "API_UNAVAILABLE",
+            }
+
+        tun_mode = self.tun_mode
+        outbound_interface = self.outbound_interface
+        outbound = self._build_outbound(vless_config, tun_mode, outbound_interface)
+        config_file = await self.generate_config(
+            vless_config, tun_mode, outbound_interface, self.api_port
+        )
+        validation = await self.validate_config(config_file)
+        if not validation.get("success", False):
+            return validation
+
+        fd, outbound_file = tempfile.mkstemp(prefix="xray-outbound-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"outbounds": [outbound]}, f)
+
+            returncode, output = await self._run_api(["rmo", self.PROXY_TAG])
+            if returncode != 0:
+                # Nothing changed; the running outbound still works
+                return {
+                    "success": False,
+                    "error": f"HandlerService rmo failed: {output or returncode}",
+                    "errorCode": "API_UNAVAILABLE",
+                }
+            returncode, output = await self._run_api(["ado", outbound_file])
+        finally:
             try:
-                await asyncio.wait_for(self.process.wait(), timeout=5.0)
-            except asyncio.TimeoutError:
-                # Force kill if process doesn't terminate
-                self.process.kill()
-                await self.process.wait()
+                os.remove(outbound_file)
+            except OSError:
+                pass
 
-            # Cleanup config file
-            if self.config_file and os.path.exists(self.config_file):
-                try:
-                    os.remove(self.config_file)
-                except Exception:
-                    pass  # Ignore cleanup errors
+        if returncode != 0:
+            error = f"HandlerService ado failed: {output or returncode}"
+            if tun_mode:
+                return {"success": False, "error": error, "errorCode": "API_UNAVAILABLE"}
+            print(f"XrayManager: {error}; handing over to a new instance")
+            return await self._handover_outbound(vless_config)
+
+        # The instance now runs config_file's outbound: restarts and a plugin
+        # reload (adopt) must use it, not the config it was started with
+        self._set_running_config(config_file)
+        await self._write_pidfile()
+        return {"success": True, "processId": self.process_id, "method": "api"}
+
+    async def _handover_outbound(self, vless_config: Dict[str, Any]) -> Dict[str, Any]:
+        """update_outbound() fallback: move to a new instance with the new outbound."""
+        config_file = await self.generate_config(
+            vless_config, False, None, self.standby_api_port()
+        )
+        validation = await self.validate_config(config_file)
+        if not validation.get("success", False):
+            return validation
+        result = await self.handover(config_file)
+        if not result.get("success", False):
+            return result
+        return {**result, "method": "handover"}
+
+    async def _run_api(
+        self, args: List[str], api_port: Optional[int] = None
+    ) -> Tuple[int, str]:
+        """
+        Run an `xray api` client subcommand against the loopback API inbound.
 
+        Args:
+            args: Subcommand and its arguments
+            api_port: API port of the target instance (default: the running one)
+
+        Returns:
+            Tuple of (return_code, combined output)
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.xray_binary_path,
+                "api",
+                args[0],
+                f"--server=127.0.0.1:{api_port or self.api_port}",
+                *args[1:],
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        except OSError as e:
+            return (-1, str(e))
+        try:
+            stdout, _ = await asyncio.wait_for(
+                process.communicate(), timeout=self.API_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return (-1, "timed out")
+        return (process.returncode, stdout.decode("utf-8", errors="ignore").strip())
+
+    async def query_traffic(self) -> Optional[Dict[str, int]]:
+        """
+        Cumulative traffic of the proxy outbound since xray-core started
+        (StatsService, `xray api statsquery`).
+
+        Returns:
+            {'uplink': int, 'downlink': int} in bytes, or None if the API is unavailable
+        """
+        if not self.is_running():
+            return None
+        returncode, output = await self._run_api(
+            ["statsquery", f"-pattern=outbound>>>{self.PROXY_TAG}>>>traffic>>>"]
+        )
+        if returncode != 0:
+            return None
+        traffic = {"uplink": 0, "downlink": 0}
+        try:
+            stats = json.loads(output or "{}").get("stat") or []
+        except (ValueError, AttributeError):
+            return None
+        for stat in stats:
+            direction = str(stat.get("name", "")).rsplit(">>>", 1)[-1]
+            if direction in traffic:
+                # int64 values are JSON strings in protojson output
+                traffic[direction] = int(stat.get("value") or 0)
+        return traffic
+
+    def stop_grace(self) -> float:
+        """SIGTERM -> SIGKILL grace period adapted to recent shutdown times."""
+        if not self._shutdown_times:
+            return self.STOP_GRACE_MAX
+        grace = max(self._shutdown_times) * self.STOP_GRACE_FACTOR
+        return min(self.STOP_GRACE_MAX, max(self.STOP_GRACE_MIN, grace))
+
+    async def stop(self, grace: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Stop xray-core process.
+
+        Args:
+            grace: Seconds to wait after SIGTERM before SIGKILL
+                (default: adaptive, see stop_grace)
+
+        Returns:
+            Dictionary with success status and whether it had to be killed
+        """
+        try:
+            if self.process is None:
+                return {"success": True, "message": "No process running"}
+
+            # Terminate process (force kill if it doesn't exit in time)
+            elapsed = await _terminate(
+                self.process, grace if grace is not None else self.stop_grace()
+            )
+            if elapsed is not None:
+                self._shutdown_times.append(elapsed)
+            self._remove_pidfile()
+
+            # Rendered configs stay cached in runtime_dir for the next connect
             self.process = None
             self.process_id = None
             self.config_file = None
 
-            return {"success": True}
+            return {"success": True, "killed": elapsed is None}
 
         except Exception as e:
             return {
@@ -317,6 +1321,38 @@ class XrayManager:
                 "errorCode": "PROCESS_STOP_ERROR",
             }
 
+    def apply_scheduling(self) -> Optional[Dict[str, Any]]:
+        """
+        Apply self.scheduling (nice, scheduler class, IO priority, affinity,
+        cgroup) to the running xray-core process.
+
+        Returns:
+            Report of applied values, or None if no process is running
+        """
+        if not self.is_running():
+            return None
+        self.scheduling_report = apply_scheduling(self.process_id, self.scheduling)
+        if self.scheduling_report.get("errors"):
+            print(
+                f"XrayManager: scheduling partially applied: {self.scheduling_report['errors']}"
+            )
+        return self.scheduling_report
+
+    def get_scheduling_status(self) -> Optional[Dict[str, Any]]:
+        """
+        Current scheduling values of the xray-core process.
+
+        Returns:
+            Values read back from the process plus the last apply errors, or None
+        """
+        if not self.is_running():
+            return None
+        status = read_scheduling(self.process_id)
+        if self.scheduling_report is not None:
+            status["cgroup"] = self.scheduling_report.get("cgroup")
+            status["errors"] = self.scheduling_report.get("errors", [])
+        return status
+
     def is_running(self) -> bool:
         """
         Check if xray-core process is running.
@@ -350,3 +1386,171 @@ class XrayManager:
             return {"running": False, "processId": None}
 
         return {"running": True, "processId": self.process_id}
+
+
+# /proc/net/tcp socket states
+_TCP_ESTABLISHED = "01"
+_TCP_LISTEN = "0A"
+
+
+def _read_text(path: str) -> Optional[str]:
+    """Contents of a small text file, or None if it cannot be read."""
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_text(path: str, data: str) -> None:
+    """Write a small text file (a cache marker: failures are ignored)."""
+    try:
+        with open(path, "w") as f:
+            f.write(data)
+    except OSError:
+        pass
+
+
+def _file_sha256(path: Optional[str]) -> Optional[str]:
+    """SHA-256 of a file's content, or None if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (OSError, TypeError):
+        return None
+
+
+def _socket_inodes(port: int, state: str) -> Set[str]:
+    """Inodes of local TCP sockets on port in the given state (from /proc/net)."""
+    inodes: Set[str] = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 10 or fields[3] != state:
+                        continue
+                    local_port = int(fields[1].rsplit(":", 1)[1], 16)
+                    if local_port == port:
+                        inodes.add(fields[9])
+        except (OSError, ValueError):
+            continue
+    return inodes
+
+
+def _process_socket_inodes(pid: int) -> Optional[Set[str]]:
+    """Socket inodes held open by pid, or None if /proc is not readable."""
+    fd_dir = f"/proc/{pid}/fd"
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return None
+    inodes: Set[str] = set()
+    for fd in fds:
+        try:
+            target = os.readlink(os.path.join(fd_dir, fd))
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            inodes.add(target[8:-1])
+    return inodes
+
+
+async def _terminate(process, timeout: float) -> Optional[float]:
+    """
+    SIGTERM process, SIGKILL it if it has not exited after timeout.
+
+    Returns:
+        Seconds until a clean exit, or None if it was killed or already gone
+    """
+    if process.returncode is not None:
+        return None
+    started_at = time.monotonic()
+    try:
+        process.terminate()
+    except ProcessLookupError:
+        return None
+    try:
+        await asyncio.wait_for(process.wait(), timeout=timeout)
+        return time.monotonic() - started_at
+    except asyncio.TimeoutError:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+        return None
+
+
+class _AdoptedProcess:
+    """
+    Minimal asyncio Process stand-in for an xray-core that is not our child
+    (adopted after a plugin reload). Exit is detected through a pidfd; the
+    exit status of a non-child is not available and is reported as -1.
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._returncode: Optional[int] = None
+        self._exited: Optional[asyncio.Event] = None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        if self._returncode is None and not self._alive():
+            self._returncode = -1
+        return self._returncode
+
+    def _alive(self) -> bool:
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is not None:
+            raise ProcessLookupError(self.pid)
+        os.kill(self.pid, sig)
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+    async def wait(self) -> int:
+        if self.returncode is not None:
+            return self.returncode
+        if self._exited is None:
+            self._exited = asyncio.Event()
+            asyncio.ensure_future(self._watch())
+        await self._exited.wait()
+        return self.returncode
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        pidfd = None
+        try:
+            pidfd = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):
+            pass
+
+        if pidfd is not None:
+            readable = loop.create_future()
+            loop.add_reader(pidfd, lambda: readable.done() or readable.set_result(None))
+            try:
+                await readable
+            finally:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+        else:
+            while self._alive():
+                await asyncio.sleep(self.POLL_INTERVAL)
+
+        self._returncode = -1
+        self._exited.set()
@@ -0,0 +1,205 @@
+"""
+Xray Supervisor - Restarts xray-core after unexpected exits
+
+Watches the process started by XrayManager and restarts it from the cached
+config file with exponential backoff and jitter. Repeated exits inside a short
+window are treated as a crash loop and reported instead of retried forever.
+"""
+
+import asyncio
+import contextlib
+import random
+import time
+from collections import deque
+from typing import Any, AsyncContextManager, Awaitable, Callable, Deque, Dict, Optional
+
+from .xray_manager import XrayManager
+
+
+class XraySupervisor:
+    """
+    Supervises the xray-core process owned by an XrayManager.
+
+    Responsibilities:
+    - Detect unexpected process exits
+    - Restart xray-core with exponential backoff and jitter
+    - Detect crash loops (N exits within M seconds) and stop retrying
+    - Record restart counts and durations
+    - Run restarts and their callbacks under the owner's lock, if given
+    """
+
+    BASE_DELAY = 0.1
+    MAX_DELAY = 5.0
+    JITTER = 0.2
+    CRASH_LOOP_EXITS = 5
+    CRASH_LOOP_WINDOW = 60.0
+
+    def __init__(
+        self,
+        xray_manager: XrayManager,
+        on_restarted: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_crash_loop: Optional[Callable[[Optional[int]], Awaitable[None]]] = None,
+        lock: Optional[Callable[[], asyncio.Lock]] = None,
+    ):
+        """
+        Initialize XraySupervisor.
+
+        Args:
+            xray_manager: Manager whose process is supervised
+            on_restarted: Called with the new process ID after a successful restart
+            on_crash_loop: Called with the last process ID when retries are abandoned
+            lock: Returns the lock the owner holds while it drives xray-core
+                (connect, disconnect, reload); restarts wait for it. Owners
+                call stop() while holding it, which cancels a waiting restart.
+        """
+        self.xray_manager = xray_manager
+        self.on_restarted = on_restarted
+        self.on_crash_loop = on_crash_loop
+        self.lock = lock
+        self.restart_count: int = 0
+        self.last_exit_code: Optional[int] = None
+        self.last_exit_at: Optional[float] = None
+        self.last_restart_duration: Optional[float] = None
+        self.restart_durations: Deque[float] = deque(maxlen=20)
+        self.crash_loop: bool = False
+        self.restarting: bool = False
+        self._exit_times: Deque[float] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start watching the current xray-core process."""
+        if self.is_active():
+            return
+        self.crash_loop = False
+        self._exit_times.clear()
+        self._task = asyncio.ensure_future(self._watch())
+
+    async def stop(self) -> None:
+        """Stop watching. Call before an intentional xray-core stop."""
+        task = self._task
+        self._task = None
+        self.restarting = False
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def is_active(self) -> bool:
+        """True while the supervisor is watching or restarting xray-core."""
+        return self._task is not None and not self._task.done()
+
+    def _next_delay(self) -> float:
+        """Backoff delay for the current number of exits in the window."""
+        exponent = max(0, len(self._exit_times) - 1)
+        delay = min(self.MAX_DELAY, self.BASE_DELAY * (2**exponent))
+        return delay * (1 + random.uniform(-self.JITTER, self.JITTER))
+
+    def _owner_lock(self) -> AsyncContextManager[Any]:
+        return self.lock() if self.lock is not None else contextlib.nullcontext()
+
+    def _record_exit(self, returncode: Optional[int]) -> bool:
+        """
+        Record an exit and prune the crash-loop window.
+
+        Returns:
+            True if the exit completes a crash loop
+        """
+        now = time.monotonic()
+        self.last_exit_code = returncode
+        self.last_exit_at = time.time()
+        self._exit_times.append(now)
+        while self._exit_times and now - self._exit_times[0] > self.CRASH_LOOP_WINDOW:
+            self._exit_times.popleft()
+        return len(self._exit_times) >= self.CRASH_LOOP_EXITS
+
+    async def _watch(self) -> None:
+        """Wait for the supervised process to exit and restart it."""
+        while True:
+            process = self.xray_manager.process
+            if process is None:
+                return
+            returncode = await process.wait()
+            if self.xray_manager.process is not process:
+                # Process was replaced (e.g. handover); keep watching the new one
+                continue
+            if not await self._recover(process.pid, returncode):
+                return
+
+    async def _recover(self, process_id: Optional[int], returncode: Optional[int]) -> bool:
+        """
+        Restart xray-core after an exit, retrying with backoff until it starts
+        or a crash loop is detected.
+
+        Returns:
+            True if xray-core is running again
+        """
+        config_file = self.xray_manager.config_file
+        self.restarting = True
+        try:
+            while True:
+                if self._record_exit(returncode) or not config_file:
+                    self.crash_loop = True
+                    print(
+                        f"XraySupervisor: xray-core exited {len(self._exit_times)} times "
+                        f"in {int(self.CRASH_LOOP_WINDOW)}s (last code {returncode}), giving up"
+                    )
+                    if self.on_crash_loop is not None:
+                        async with self._owner_lock():
+                            await self.on_crash_loop(process_id)
+                    return False
+
+                delay = self._next_delay()
+                print(
+                    f"XraySupervisor: xray-core exited with code {returncode}, "
+                    f"restarting in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+                async with self._owner_lock():
+                    started_at = time.monotonic()
+                    result = await self.xray_manager.start(config_file)
+                    if result.get("success"):
+                        duration = time.monotonic() - started_at + delay
+                        self.restart_count += 1
+                        self.last_restart_duration = duration
+                        self.restart_durations.append(duration)
+                        new_pid = result.get("processId")
+                        print(
+                            f"XraySupervisor: xray-core restarted (pid {new_pid}) "
+                            f"in {duration:.2f}s"
+                        )
+                        if self.on_restarted is not None and new_pid is not None:
+                            await self.on_restarted(new_pid)
+                        return True
+
+                print(f"XraySupervisor: restart failed: {result.get('error')}")
+                process = self.xray_manager.process
+                returncode = process.returncode if process is not None else None
+        finally:
+            self.restarting = False
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get supervisor statistics.
+
+        Returns:
+            Dictionary with restart counters and crash-loop state
+        """
+        durations = list(self.restart_durations)
+        return {
+            "active": self.is_active(),
+            "restarting": self.restarting,
+            "restartCount": self.restart_count,
+            "crashLoop": self.crash_loop,
+            "lastExitCode": self.last_exit_code,
+            "lastExitAt": int(self.last_exit_at) if self.last_exit_at else None,
+            "lastRestartMs": int(self.last_restart_duration * 1000)
+            if self.last_restart_duration is not None
+            else None,
+            "avgRestartMs": int(sum(durations) / len(durations) * 1000)
+            if durations
+            else None,
+        }
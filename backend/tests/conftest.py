@@ -0,0 +1,98 @@
+"""Shared fixtures for backend tests."""
+
+import json
+import stat
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from backend.src.headless import load_plugin_module
+from backend.tests.fake_tools import env_for, install_fake_tools
+
+# Stand-in for the xray-core binary. Run mode (-config) sleeps until SIGTERM;
+# `version` prints $FAKE_XRAY_VERSION.
+# `api` and `run -test` invocations are appended to $FAKE_XRAY_LOG and exit
+# with $FAKE_XRAY_API_RC / $FAKE_XRAY_TEST_RC, emulating a reachable or
+# unreachable HandlerService and a valid or rejected config. $FAKE_XRAY_API_FAIL
+# names one api subcommand (e.g. ado) that fails while the others succeed.
+FAKE_XRAY = '''#!{python}
+import json, os, signal, sys, time
+
+args = sys.argv[1:]
+log = os.environ.get("FAKE_XRAY_LOG")
+if args == ["version"]:
+    print(os.environ.get("FAKE_XRAY_VERSION", "Xray 26.1.23 (Xray, Penetrates Everything.)"))
+    sys.exit(0)
+if args and (args[0] == "api" or "-test" in args):
+    entry = {{"argv": args}}
+    for arg in args[2:]:
+        if arg.endswith(".json") and os.path.isfile(arg):
+            with open(arg) as f:
+                entry["file"] = json.load(f)
+    if log:
+        with open(log, "a") as f:
+            f.write(json.dumps(entry) + "\\n")
+    if args[0] == "api":
+        rc = int(os.environ.get("FAKE_XRAY_API_RC", "0"))
+        if args[1] == os.environ.get("FAKE_XRAY_API_FAIL"):
+            rc = 1
+        if rc:
+            print("failed to dial 127.0.0.1:10085: connection refused")
+    else:
+        rc = int(os.environ.get("FAKE_XRAY_TEST_RC", "0"))
+        if rc:
+            print("Failed to start: infra/conf: invalid outbound")
+    sys.exit(rc)
+
+signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+while True:
+    time.sleep(1)
+'''
+
+
+@pytest.fixture
+def fake_xray(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Path to an executable xray-core stand-in; API calls logged to xray-api.log."""
+    binary = tmp_path / "xray-core"
+    binary.write_text(FAKE_XRAY.format(python=sys.executable))
+    binary.chmod(binary.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("FAKE_XRAY_LOG", str(tmp_path / "xray-api.log"))
+    monkeypatch.setenv("FAKE_XRAY_API_RC", "0")
+    monkeypatch.setenv("FAKE_XRAY_TEST_RC", "0")
+    return binary
+
+
+@pytest.fixture(scope="session")
+def plugin_module(tmp_path_factory: pytest.TempPathFactory) -> SimpleNamespace:
+    """
+    main.py imported once per session as the headless daemon does, with the
+    stand-in tools from fake_tools.py installed (put them on PATH with
+    plugin_tools). Default settings (metrics endpoint off); TUN interfaces
+    appear under a fake /sys/class/net.
+    """
+    root = tmp_path_factory.mktemp("plugin")
+    tools = install_fake_tools(root)
+    settings_dir = root / "settings"
+    settings_dir.mkdir()
+    (settings_dir / "settings.json").write_text(json.dumps({}))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DECKY_PLUGIN_SETTINGS_DIR", str(settings_dir))
+        mp.setenv("DECKY_PLUGIN_RUNTIME_DIR", str(root / "runtime"))
+        mp.setenv("XRAY_DECKY_XRAY_BINARY", str(tools["xray"]))
+        module = load_plugin_module()
+    module.tun_manager.SYSFS_NET = str(tools["sysfs_net"])
+    return SimpleNamespace(module=module, tools=tools, root=root)
+
+
+@pytest.fixture
+def plugin_tools(plugin_module: SimpleNamespace, monkeypatch: pytest.MonkeyPatch):
+    """Callable putting the stand-ins on PATH: plugin_tools(without=(), **extra_env)."""
+
+    def activate(without=(), **extra_env: str) -> None:
+        for key, value in {**env_for(plugin_module.tools, without), **extra_env}.items():
+            monkeypatch.setenv(key, value)
+
+    return activate
+
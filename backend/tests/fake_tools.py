@@ -0,0 +1,274 @@
+"""
+Stand-in system tools for end-to-end tests of the connect/disconnect path.
+
+install_fake_tools() writes executables named xray-core, ip, iptables,
+iptables-restore and gsettings into a directory meant to go first on PATH.
+They keep state (routes, firewall rules, proxy keys, the xray0 interface) in
+files under a state directory, so tests can check what was left behind.
+
+Per tool (NAME = basename upper-cased, '-' -> '_', xray-core -> XRAY):
+- FAKE_<NAME>_DELAY_MS: sleep before doing anything (simulated latency)
+- FAKE_<NAME>_FAIL: exit 1 when this substring occurs in argv or stdin
+Every invocation is appended to <state>/calls.log.
+
+running_plugin() drives main.Plugin through _main/_unload around a test body.
+"""
+
+import json
+import stat
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+TOOLS = ("xray-core", "ip", "iptables", "iptables-restore", "gsettings")
+
+FAKE_TOOL = r'''#!{python}
+import fcntl, json, os, signal, sys, time
+
+name = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+state = os.environ["FAKE_TOOLS_STATE"]
+key = "XRAY" if name == "xray-core" else name.upper().replace("-", "_")
+data = ""
+if name == "iptables-restore" or (name == "ip" and "-batch" in args):
+    data = sys.stdin.read()
+
+delay = float(os.environ.get(f"FAKE_{{key}}_DELAY_MS", "0") or 0)
+if delay:
+    time.sleep(delay / 1000)
+
+
+def locked(path, update):
+    """Read-modify-write a JSON state file under an exclusive lock."""
+    with open(os.path.join(state, path + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        full = os.path.join(state, path)
+        try:
+            with open(full) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            value = None
+        value, result = update(value)
+        with open(full, "w") as f:
+            json.dump(value, f)
+        return result
+
+
+with open(os.path.join(state, "calls.log"), "a") as log:
+    log.write(json.dumps([name] + args) + "\n")
+
+fail = os.environ.get(f"FAKE_{{key}}_FAIL")
+if fail and (fail in " ".join(args) or fail in data):
+    print(f"{{name}}: injected failure", file=sys.stderr)
+    sys.exit(1)
+
+
+def ip_route(words):
+    """route add/del/show on <state>/routes.json; returns exit code."""
+    op, spec = words[0], " ".join(words[1:])
+    def update(routes):
+        routes = routes or []
+        if op == "add":
+            if spec in routes:
+                return routes, 2
+            return routes + [spec], 0
+        if op == "del":
+            matches = [r for r in routes if r.startswith(spec) or spec.startswith(r)]
+            if not matches:
+                return routes, 2
+            routes.remove(matches[0])
+            return routes, 0
+        return routes, 0
+    if op == "show":
+        routes = locked("routes.json", lambda r: (r or [], r or []))
+        if spec == "default":
+            print("default via 192.168.1.1 dev wlan0 proto dhcp metric 600")
+        for route in routes:
+            if all(word in route.split() for word in words[1:] if word != "show"):
+                print(route)
+        return 0
+    return locked("routes.json", update)
+
+
+def iptables(lines):
+    """Apply -A/-D specs to <state>/rules.json atomically; returns exit code."""
+    def update(rules):
+        original = list(rules or [])
+        rules = list(original)
+        for line in lines:
+            op, spec = line[:2], line[3:].strip()
+            if op == "-A":
+                rules.append(spec)
+            elif op == "-D":
+                if spec not in rules:
+                    return original, 1
+                rules.remove(spec)
+        return rules, 0
+    return locked("rules.json", update)
+
+
+if name == "ip":
+    if "-batch" in args:
+        # -force: keep going past failed lines, like the real ip
+        rc = 0
+        for line in data.splitlines():
+            words = line.split()
+            if words[:1] == ["route"]:
+                rc = ip_route(words[1:]) or rc
+        sys.exit(0 if "-force" in args else rc)
+    words = [a for a in args if a not in ("-4", "-6")]
+    if words[:1] == ["route"]:
+        sys.exit(ip_route(words[1:]))
+    sys.exit(0)
+
+if name == "iptables":
+    if args[:1] == ["-S"]:
+        for rule in locked("rules.json", lambda r: (r or [], r or [])):
+            print(f"-A {{rule}}")
+        sys.exit(0)
+    sys.exit(iptables([" ".join(args)]))
+
+if name == "iptables-restore":
+    lines = [l for l in data.splitlines() if l.startswith(("-A", "-D"))]
+    if iptables(lines):
+        print("iptables-restore: line failed", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(0)
+
+if name == "gsettings":
+    if args[:1] == ["set"]:
+        locked("gsettings.json", lambda v: ({{**(v or {{}}), " ".join(args[1:3]): args[3]}}, 0))
+    elif args[:1] == ["get"]:
+        print(locked("gsettings.json", lambda v: (v or {{}}, (v or {{}}).get(" ".join(args[1:3]), ""))))
+    sys.exit(0)
+
+# xray-core
+if args == ["version"]:
+    print("Xray 26.1.23 (Xray, Penetrates Everything.)")
+    sys.exit(0)
+if args and args[0] == "api":
+    if args[1:2] == ["statsquery"]:
+        print(json.dumps({{"stat": []}}))
+    sys.exit(0)
+if "-test" in args:
+    sys.exit(0)
+
+config = {{}}
+if "-config" in args:
+    with open(args[args.index("-config") + 1]) as f:
+        config = json.load(f)
+interface = None
+if any(i.get("protocol") == "tun" for i in config.get("inbounds", [])):
+    interface = os.path.join(os.environ["FAKE_SYSFS_NET"], "xray0")
+    os.makedirs(interface, exist_ok=True)
+
+
+def stop(*_):
+    if interface:
+        try:
+            os.rmdir(interface)
+        except OSError:
+            pass
+    sys.exit(0)
+
+
+signal.signal(signal.SIGTERM, stop)
+while True:
+    time.sleep(1)
+'''
+
+
+def _env_key(tool: str) -> str:
+    return "XRAY" if tool == "xray-core" else tool.upper().replace("-", "_")
+
+
+def install_fake_tools(root: Path, tools: Iterable[str] = TOOLS) -> Dict[str, Path]:
+    """
+    Write stand-in tools under root.
+
+    Args:
+        root: Directory for bin/, state/ and sys/class/net/
+        tools: Tools to install (leave one out to emulate it missing)
+
+    Returns:
+        {'bin', 'state', 'sysfs_net', 'xray'} paths; put env_for(paths) in os.environ
+    """
+    paths = {
+        "bin": root / "bin",
+        "state": root / "state",
+        "sysfs_net": root / "sys" / "class" / "net",
+    }
+    for directory in paths.values():
+        directory.mkdir(parents=True, exist_ok=True)
+    script = FAKE_TOOL.format(python=sys.executable)
+    for tool in tools:
+        target = paths["bin"] / tool
+        target.write_text(script)
+        target.chmod(target.stat().st_mode | stat.S_IXUSR)
+    paths["xray"] = paths["bin"] / "xray-core"
+    return paths
+
+
+def env_for(paths: Dict[str, Path], without: Iterable[str] = ()) -> Dict[str, str]:
+    """
+    Environment making the stand-ins the only programs on PATH (so a real
+    gsettings or iptables in /usr/bin is never reached).
+
+    Args:
+        paths: Result of install_fake_tools()
+        without: Tools to hide (e.g. gsettings: no desktop proxy support)
+    """
+    bin_dir = paths["bin"]
+    without = sorted(without)
+    if without:
+        bin_dir = paths["bin"].with_name("bin-without-" + "-".join(without))
+        bin_dir.mkdir(exist_ok=True)
+        for tool in paths["bin"].iterdir():
+            link = bin_dir / tool.name
+            if tool.name not in without and not link.exists():
+                link.symlink_to(tool)
+    return {
+        "PATH": str(bin_dir),
+        "FAKE_TOOLS_STATE": str(paths["state"]),
+        "FAKE_SYSFS_NET": str(paths["sysfs_net"]),
+    }
+
+
+def latency_env(tool: str, ms: float) -> Dict[str, str]:
+    """Environment adding ms of latency to every call of tool."""
+    return {f"FAKE_{_env_key(tool)}_DELAY_MS": str(ms)}
+
+
+def failure_env(tool: str, pattern: str) -> Dict[str, str]:
+    """Environment making tool exit 1 when pattern occurs in its argv or stdin."""
+    return {f"FAKE_{_env_key(tool)}_FAIL": pattern}
+
+
+def read_state(paths: Dict[str, Path], name: str) -> List:
+    """Contents of a state file: 'routes' or 'rules' (lists), 'gsettings' (dict)."""
+    try:
+        return json.loads((paths["state"] / f"{name}.json").read_text())
+    except (OSError, ValueError):
+        return []
+
+
+# Connects need a stored, validated node; nothing listens on this address
+BENCH_VLESS_URL = (
+    "vless://11111111-1111-4111-8111-111111111111@127.0.0.1:9?security=none&type=tcp#bench"
+)
+
+
+@asynccontextmanager
+async def running_plugin(module, tun: bool = False):
+    """Plugin between _main and _unload, with a valid node and TUN mode set."""
+    plugin = module.Plugin()
+    await plugin._main()
+    try:
+        if not module.settings.getSetting("vlessConfig", None):
+            assert (await plugin.import_vless_config(BENCH_VLESS_URL))["success"]
+            await plugin.validate_vless_config()
+        assert (await plugin.toggle_tun_mode(tun))["success"]
+        yield plugin
+    finally:
+        await plugin._unload()
@@ -0,0 +1,27 @@
+"""Tests for import server certificate generation and renewal."""
+
+import ssl
+from pathlib import Path
+
+from backend.src.cert_utils import ensure_cert_key, needs_renewal
+from backend.src.import_server import _server_ssl_context
+
+
+def test_generates_ecdsa_cert_and_renews_when_due(tmp_path: Path) -> None:
+    cert_path, key_path = ensure_cert_key(tmp_path)
+    assert "BEGIN CERTIFICATE" in cert_path.read_text()
+    assert not needs_renewal(cert_path, renew_before_days=30)
+    context = _server_ssl_context(cert_path, key_path)
+    assert not context.options & ssl.OP_NO_TICKET
+    # PEM P-256 key is ~240 bytes; RSA-2048 would be ~1700
+    assert len(key_path.read_bytes()) < 400
+
+    original = cert_path.read_bytes()
+    assert ensure_cert_key(tmp_path) == (cert_path, key_path)
+    assert cert_path.read_bytes() == original
+
+    # Expires within 400 days: replaced
+    assert needs_renewal(cert_path, renew_before_days=400)
+    ensure_cert_key(tmp_path, renew_before_days=400)
+    assert cert_path.read_bytes() != original
+    assert not list(tmp_path.glob(".cert-*"))
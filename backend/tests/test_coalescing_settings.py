@@ -0,0 +1,58 @@
+"""Tests for the write-behind settings facade."""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from backend.src.coalescing_settings import CoalescingSettings
+
+
+class FakeSettingsManager:
+    """Decky SettingsManager stand-in (settings dict + JSON file)."""
+
+    def __init__(self, path: Path):
+        self.path = str(path)
+        self.settings = {}
+
+    def read(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.settings = json.load(f)
+
+
+def test_commits_coalesce_into_one_write(tmp_path: Path) -> None:
+    settings = CoalescingSettings(FakeSettingsManager(tmp_path / "settings.json"), debounce=0.05)
+    settings.read()
+
+    async def scenario() -> None:
+        settings.setSetting("killSwitch", {"enabled": True})
+        settings.commit()
+        settings.setSetting("connectionState", {"status": "connected"})
+        settings.commit()
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+    assert settings.writes == 1
+    assert json.loads((tmp_path / "settings.json").read_text()) == {
+        "killSwitch": {"enabled": True},
+        "connectionState": {"status": "connected"},
+    }
+
+
+def test_unchanged_content_is_not_rewritten(tmp_path: Path) -> None:
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"tunMode": {"enabled": False}}, indent=4))
+    settings = CoalescingSettings(FakeSettingsManager(path), debounce=0.05)
+    settings.read()
+
+    async def scenario() -> None:
+        settings.setSetting("tunMode", {"enabled": False})
+        settings.commit()
+        await settings.flush()
+
+    mtime = path.stat().st_mtime_ns
+    asyncio.run(scenario())
+    assert settings.writes == 0
+    assert settings.skipped_writes == 1
+    assert path.stat().st_mtime_ns == mtime
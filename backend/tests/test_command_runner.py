@@ -0,0 +1,81 @@
+"""Tests for the shared command runner and the kill switch rules it applies."""
+
+import asyncio
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from backend.src.command_runner import CommandRunner
+from backend.src.kill_switch import KillSwitch
+
+# Appends argv and stdin to $FAKE_CMD_LOG; fails if $FAKE_CMD_FAIL matches argv
+FAKE_COMMAND = """#!{python}
+import os, sys
+data = sys.stdin.read() if not sys.stdin.isatty() else ""
+with open(os.environ["FAKE_CMD_LOG"], "a") as f:
+    f.write(" ".join([os.path.basename(sys.argv[0])] + sys.argv[1:]) + "\\n" + data)
+sys.exit(1 if os.environ.get("FAKE_CMD_FAIL", "\\0") in " ".join(sys.argv) else 0)
+"""
+
+
+@pytest.fixture
+def fake_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name in ("iptables", "iptables-restore"):
+        script = bin_dir / name
+        script.write_text(FAKE_COMMAND.format(python=sys.executable))
+        script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.setenv("FAKE_CMD_LOG", str(tmp_path / "commands.log"))
+    return tmp_path / "commands.log"
+
+
+def test_timeout_missing_program_and_batch_stdin() -> None:
+    runner = CommandRunner(max_concurrency=2)
+
+    async def scenario() -> None:
+        slow = await runner.run([sys.executable, "-c", "import time; time.sleep(5)"], timeout=0.2)
+        assert slow.timed_out and not slow.ok and slow.duration < 2
+
+        missing = await runner.run(["no-such-command-xyz"])
+        assert missing.not_found and missing.returncode == 127
+
+        batch = await runner.run_batch(
+            [sys.executable, "-c", "import sys; print(sys.stdin.read().count(chr(10)))"],
+            ["route del a", "route del b", "route del c"],
+        )
+        assert batch.ok and batch.stdout.strip() == "3"
+
+    asyncio.run(scenario())
+    stats = runner.get_stats()
+    assert sum(s["timeouts"] for s in stats.values()) == 1
+    assert stats["no-such-command-xyz"]["failures"] == 1
+
+
+def test_kill_switch_applies_atomically_and_deletes_by_spec(
+    fake_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    kill_switch = KillSwitch(runner=CommandRunner())
+
+    async def scenario() -> None:
+        assert (await kill_switch.activate(1234))["success"]
+        # A rule already vanished: the -D transaction fails, rules go one by one
+        monkeypatch.setenv("FAKE_CMD_FAIL", "--noflush")
+        assert (await kill_switch.deactivate())["success"]
+
+    asyncio.run(scenario())
+    log = fake_path.read_text().splitlines()
+    assert log[:5] == [
+        "iptables-restore --noflush",
+        "*filter",
+        "-A OUTPUT -m owner --pid-owner 1234 -j ACCEPT",
+        "-A OUTPUT -j DROP",
+        "COMMIT",
+    ]
+    assert log[-2:] == [
+        "iptables -D OUTPUT -j DROP",
+        "iptables -D OUTPUT -m owner --pid-owner 1234 -j ACCEPT",
+    ]
@@ -0,0 +1,115 @@
+"""
+Connect/disconnect latency benchmark against stand-in system tools.
+
+Drives Plugin.toggle_connection through connect/disconnect cycles in two
+modes and fails when a p95 exceeds bench_thresholds.json:
+
+- tun: TUN mode on (xray0 appears, default route added/removed with ip, GNOME
+  proxy set/cleared with gsettings)
+- plain: TUN off, no gsettings on PATH (proxy ports only)
+
+Connect sets the system proxy only in TUN mode, so there is no separate
+system-proxy mode; the tun thresholds cover the systemProxy phase and the
+gsettings-backed disconnect cleanup a following connect waits for.
+
+XRAY_DECKY_BENCH_CYCLES (default 5) sets the measured cycles per mode,
+XRAY_DECKY_BENCH_TOOL_DELAY_MS adds latency to every ip/iptables/gsettings
+call, and XRAY_DECKY_BENCH_REPORT=<dir> writes <mode>.json reports. Run with
+-s to see the p50/p95/p99 table per phase.
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from backend.src.headless import bench, format_bench
+from backend.tests.fake_tools import failure_env, latency_env, read_state, running_plugin
+
+CYCLES = int(os.environ.get("XRAY_DECKY_BENCH_CYCLES", "5"))
+TOOL_DELAY_MS = os.environ.get("XRAY_DECKY_BENCH_TOOL_DELAY_MS", "0")
+REPORT_DIR = os.environ.get("XRAY_DECKY_BENCH_REPORT")
+THRESHOLDS = json.loads(Path(__file__).with_name("bench_thresholds.json").read_text())
+
+MODES = {
+    "tun": {"tun": True, "without": ()},
+    "plain": {"tun": False, "without": ("gsettings",)},
+}
+
+
+class LocalClient:
+    """headless.bench() client calling the plugin in-process."""
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    async def call(self, method: str, params: Any = None) -> Any:
+        return await getattr(self.plugin, method)(**(params or {}))
+
+
+def regressions(report: Dict[str, Any], limits: Dict[str, Any]) -> List[str]:
+    """p95 values above their limit ({operation: {'wallMs': ms, 'phases': {...}}})."""
+    found = []
+    for operation, limit in limits.items():
+        data = report["operations"].get(operation)
+        if data is None:
+            found.append(f"{operation}: no successful samples")
+            continue
+        checks = [("wall", data["wallMs"], limit.get("wallMs"))]
+        checks += [
+            (f"phase {phase}", data["phases"].get(phase), ms)
+            for phase, ms in limit.get("phases", {}).items()
+        ]
+        for label, stats, ms in checks:
+            if ms is not None and stats is not None and stats["p95"] > ms:
+                found.append(f"{operation} {label}: p95 {stats['p95']:.1f}ms > {ms}ms")
+    return found
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_connect_disconnect_latency(mode: str, plugin_module, plugin_tools) -> None:
+    plugin_tools(
+        MODES[mode]["without"],
+        **{
+            key: value
+            for tool in ("ip", "iptables", "iptables-restore", "gsettings")
+            for key, value in latency_env(tool, TOOL_DELAY_MS).items()
+        },
+    )
+
+    async def scenario() -> Dict[str, Any]:
+        async with running_plugin(plugin_module.module, tun=MODES[mode]["tun"]) as plugin:
+            report = await bench(LocalClient(plugin), CYCLES, warmup=1)
+            await plugin._await_cleanup()
+            return report
+
+    report = asyncio.run(scenario())
+    print(f"\n[{mode}] " + format_bench(report))
+    if REPORT_DIR:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        Path(REPORT_DIR, f"{mode}.json").write_text(json.dumps(report, indent=2))
+
+    assert report["failures"] == 0
+    assert read_state(plugin_module.tools, "routes") == []
+    found = regressions(report, THRESHOLDS[mode])
+    assert not found, "latency regression:\n" + "\n".join(found)
+
+
+def test_failed_route_keeps_proxy_connection(plugin_module, plugin_tools) -> None:
+    plugin_tools(**failure_env("ip", "route add"))
+
+    async def scenario() -> Dict[str, Any]:
+        async with running_plugin(plugin_module.module, tun=True) as plugin:
+            connected = await plugin.toggle_connection(True)
+            assert read_state(plugin_module.tools, "routes") == []
+            disconnected = await plugin.toggle_connection(False)
+            await plugin._await_cleanup()
+            return {"connect": connected, "disconnect": disconnected}
+
+    results = asyncio.run(scenario())
+    assert results["connect"]["success"] and results["connect"]["status"] == "connected"
+    assert results["disconnect"]["success"]
+    assert not (plugin_module.tools["sysfs_net"] / "xray0").exists()
@@ -0,0 +1,79 @@
+"""Independent connect steps run concurrently and fail independently."""
+
+import asyncio
+from typing import Any, Dict
+
+from backend.tests.fake_tools import latency_env, read_state, running_plugin
+
+TOOL_DELAY_MS = 150
+
+
+def test_gathered_phases_overlap(plugin_module, plugin_tools) -> None:
+    plugin_tools(**latency_env("ip", TOOL_DELAY_MS), **latency_env("gsettings", TOOL_DELAY_MS))
+
+    async def scenario() -> Dict[str, Any]:
+        async with running_plugin(plugin_module.module, tun=True) as plugin:
+            connected = await plugin.toggle_connection(True)
+            await plugin.toggle_connection(False)
+            await plugin._await_cleanup()
+            return connected
+
+    result = asyncio.run(scenario())
+    assert result["success"]
+    phases = result["timings"]["phases"]
+    for phase in ("privileges", "capabilities", "interface", "route", "systemProxy"):
+        assert phase in phases
+    assert min(phases["route"], phases["systemProxy"]) >= TOOL_DELAY_MS
+    # Run one after another, the phases would add up to at most the total;
+    # overlapping, route and systemProxy share their wall time
+    overlap = sum(phases.values()) - result["timings"]["totalMs"]
+    assert overlap >= 0.8 * min(phases["route"], phases["systemProxy"])
+
+
+def test_failed_step_leaves_connection_up(plugin_module, plugin_tools, monkeypatch) -> None:
+    plugin_tools()
+    module = plugin_module.module
+
+    async def broken_proxy(**ports) -> Dict[str, Any]:
+        raise RuntimeError("dconf is locked")
+
+    monkeypatch.setattr(module.system_proxy_manager, "set_system_proxy", broken_proxy)
+
+    async def scenario() -> Dict[str, Any]:
+        async with running_plugin(module, tun=True) as plugin:
+            connected = await plugin.toggle_connection(True)
+            # The route step ran to completion next to the failed proxy step
+            assert read_state(plugin_module.tools, "routes") != []
+            assert module.xray_manager.is_running()
+            assert module.get_connection_state().status == module.ConnectionStatus.CONNECTED
+            await plugin.toggle_connection(False)
+            await plugin._await_cleanup()
+            return connected
+
+    result = asyncio.run(scenario())
+    assert result["success"] and result["status"] == "connected"
+    assert "route" in result["timings"]["phases"]
+
+
+def test_failed_check_stops_connect_before_xray(
+    plugin_module, plugin_tools, monkeypatch
+) -> None:
+    plugin_tools()
+    module = plugin_module.module
+
+    async def no_interface() -> str:
+        raise OSError("netlink socket unavailable")
+
+    monkeypatch.setattr(module.tun_manager, "get_physical_interface", no_interface)
+
+    async def scenario() -> Dict[str, Any]:
+        async with running_plugin(module, tun=True) as plugin:
+            result = await plugin.toggle_connection(True)
+            assert not module.xray_manager.is_running()
+            assert read_state(plugin_module.tools, "routes") == []
+            return result
+
+    result = asyncio.run(scenario())
+    assert result["success"] is False
+    assert "netlink socket unavailable" in result["error"]
+    assert module.get_connection_state().status == module.ConnectionStatus.ERROR
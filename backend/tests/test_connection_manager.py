@@ -0,0 +1,42 @@
+"""Tests for ConnectionState uptime reporting."""
+
+import pytest
+
+from backend.src import connection_manager
+from backend.src.connection_manager import ConnectionState
+
+
+@pytest.fixture
+def clocks(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """Fake wall and monotonic clocks; suspend advances only the wall clock."""
+    now = {"wall": 1_700_000_000.0, "monotonic": 50.0}
+    monkeypatch.setattr(connection_manager.time, "time", lambda: now["wall"])
+    monkeypatch.setattr(connection_manager.time, "monotonic", lambda: now["monotonic"])
+    return now
+
+
+def test_uptime_excludes_suspend(clocks: dict) -> None:
+    state = ConnectionState()
+    state.set_connected(1234, "/tmp/config.json", {})
+
+    clocks["wall"] += 60
+    clocks["monotonic"] += 60
+    clocks["wall"] += 600  # asleep: CLOCK_MONOTONIC stands still
+    clocks["wall"] += 30
+    clocks["monotonic"] += 30
+
+    status = state.to_dict()
+    assert status["uptime"] == 90
+    assert status["connectedAt"] == 1_700_000_000
+
+
+def test_restored_connection_counts_from_connected_at(clocks: dict) -> None:
+    state = ConnectionState()
+    # Plugin reload: the connection started before this process
+    state.set_connected(1234, "/tmp/config.json", {}, connected_at=clocks["wall"] - 100)
+    clocks["monotonic"] += 5
+    clocks["wall"] += 5
+
+    assert state.to_dict()["uptime"] == 105
+    state.set_disconnected()
+    assert "uptime" not in state.to_dict()
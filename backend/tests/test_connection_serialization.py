@@ -0,0 +1,40 @@
+"""Connect, disconnect and reload run one at a time (no second xray-core)."""
+
+import asyncio
+import json
+
+from backend.tests.fake_tools import running_plugin
+
+
+def _xray_starts(tools) -> int:
+    calls = (tools["state"] / "calls.log").read_text().splitlines()
+    return sum(1 for call in map(json.loads, calls) if call[:2] == ["xray-core", "-config"])
+
+
+def test_concurrent_toggles_start_one_xray(plugin_module, plugin_tools) -> None:
+    plugin_tools()
+    module = plugin_module.module
+
+    async def scenario():
+        async with running_plugin(module) as plugin:
+            starts_before = _xray_starts(plugin_module.tools)
+            first, second = await asyncio.gather(
+                plugin.toggle_connection(True), plugin.toggle_connection(True)
+            )
+            running_pid = module.xray_manager.get_process_id()
+            assert _xray_starts(plugin_module.tools) == starts_before + 1
+            # Issued while connecting: applied after the connect, not undone by it
+            connect = asyncio.ensure_future(plugin.toggle_connection(True))
+            await asyncio.sleep(0.05)
+            disconnected = await plugin.toggle_connection(False)
+            await connect
+            status = module.get_connection_state().status
+            await plugin._await_cleanup()
+            return first, second, running_pid, disconnected, status
+
+    first, second, running_pid, disconnected, status = asyncio.run(scenario())
+    assert first["success"] and second["success"]
+    assert first["processId"] == second["processId"] == running_pid
+    assert disconnected["success"]
+    assert status == module.ConnectionStatus.DISCONNECTED
+    assert not module.xray_manager.is_running()
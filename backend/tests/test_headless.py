@@ -0,0 +1,103 @@
+"""Tests for the headless daemon's RPC layer and file-backed settings."""
+
+import asyncio
+import json
+import stat
+from pathlib import Path
+
+import pytest
+
+from backend.src.file_settings import SettingsManager
+from backend.src.headless import RpcClient, RpcError, RpcServer, bench, percentiles
+
+
+class FakePlugin:
+    def __init__(self):
+        self.connected = False
+
+    async def toggle_connection(self, enable: bool):
+        await asyncio.sleep(0.001)
+        self.connected = enable
+        return {"success": True, "timings": {"totalMs": 1, "phases": {"start": 1}}}
+
+    async def get_connection_status(self):
+        return {"status": "connected" if self.connected else "disconnected"}
+
+    async def _unload(self):
+        raise AssertionError("private methods must not be callable")
+
+
+def test_rpc_round_trip_and_bench(tmp_path: Path) -> None:
+    socket_path = str(tmp_path / "daemon.sock")
+    server = RpcServer(FakePlugin(), socket_path)
+
+    async def scenario():
+        await server.start()
+        try:
+            async with RpcClient(socket_path) as client:
+                assert (await client.call("toggle_connection", [True]))["success"]
+                assert (await client.call("get_connection_status"))["status"] == "connected"
+                with pytest.raises(RpcError, match="Unknown method"):
+                    await client.call("_unload")
+                with pytest.raises(RpcError, match="Bad params"):
+                    await client.call("toggle_connection", {"on": True})
+                return await bench(client, cycles=4, warmup=1)
+        finally:
+            await server.stop()
+
+    report = asyncio.run(scenario())
+    assert report["failures"] == 0
+    assert report["operations"]["connect"]["wallMs"]["count"] == 4
+    assert report["operations"]["disconnect"]["phases"]["start"]["p50"] == 1
+    assert not Path(socket_path).exists()
+
+
+def test_client_requires_async_with(tmp_path: Path) -> None:
+    socket_path = str(tmp_path / "daemon.sock")
+    server = RpcServer(FakePlugin(), socket_path)
+
+    async def scenario():
+        await server.start()
+        try:
+            client = RpcClient(socket_path)
+            with pytest.raises(RpcError, match="async with"):
+                await client.call("get_connection_status")
+            async with client:
+                assert (await client.call("get_connection_status"))["status"] == "disconnected"
+            with pytest.raises(RpcError, match="async with"):
+                await client.call("get_connection_status")
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_socket_is_private(tmp_path: Path) -> None:
+    socket_path = tmp_path / "daemon.sock"
+    server = RpcServer(FakePlugin(), str(socket_path))
+
+    async def scenario():
+        await server.start()
+        mode = stat.S_IMODE(socket_path.stat().st_mode)
+        await server.stop()
+        return mode
+
+    assert asyncio.run(scenario()) == 0o600
+
+
+def test_percentiles_nearest_rank() -> None:
+    stats = percentiles(range(1, 101))
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50, 95, 99, 100)
+    assert percentiles([])["count"] == 0
+
+
+def test_file_settings_round_trip(tmp_path: Path) -> None:
+    manager = SettingsManager(name="settings", settings_directory=str(tmp_path / "cfg"))
+    manager.read()
+    assert manager.getSetting("tunMode", {}) == {}
+    manager.setSetting("tunMode", {"enabled": True})
+
+    reloaded = SettingsManager(name="settings", settings_directory=str(tmp_path / "cfg"))
+    reloaded.read()
+    assert reloaded.getSetting("tunMode") == {"enabled": True}
+    assert json.loads(Path(manager.path).read_text()) == {"tunMode": {"enabled": True}}
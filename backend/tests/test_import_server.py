@@ -0,0 +1,140 @@
+"""Tests for the on-demand import server and batch import."""
+
+import asyncio
+import base64
+import json
+import ssl
+from pathlib import Path
+
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.test_utils import TestClient, TestServer
+
+from backend.src import import_server
+from backend.src.import_server import ImportServer, create_import_app
+from backend.src.node_store import NodeStore
+from backend.src.status_broadcaster import StatusBroadcaster
+
+
+class DictSettings:
+    """Minimal SettingsManager stand-in."""
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def getSetting(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def setSetting(self, key, value):
+        self.settings[key] = value
+
+    def commit(self):
+        pass
+
+
+def test_starts_on_demand_and_stops_when_idle(tmp_path: Path) -> None:
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    (static_dir / "import.html").write_text("<html></html>")
+    settings = DictSettings({"importServer": {"port": 28765, "idleTimeout": 0.3}})
+    server = ImportServer(settings, static_dir, str(tmp_path / "runtime"))
+
+    async def scenario() -> None:
+        assert not server.is_running()
+        port = await server.ensure_started()
+        assert port is not None and server.is_running()
+        assert await server.ensure_started() == port
+
+        client_ssl = ssl.create_default_context()
+        client_ssl.check_hostname = False
+        client_ssl.verify_mode = ssl.CERT_NONE
+        async with ClientSession(connector=TCPConnector(ssl=client_ssl)) as session:
+            for _ in range(3):
+                # Requests keep the server alive past the idle timeout
+                await asyncio.sleep(0.15)
+                async with session.get(f"https://127.0.0.1:{port}/import") as response:
+                    assert response.status == 200
+        assert server.is_running()
+
+        await asyncio.sleep(0.6)
+        assert not server.is_running()
+
+    asyncio.run(scenario())
+
+
+def test_open_status_stream_keeps_server_alive(tmp_path: Path, monkeypatch) -> None:
+    # A closed stream is noticed on the next keepalive write
+    monkeypatch.setattr(import_server, "SSE_KEEPALIVE", 0.1)
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    (static_dir / "status.html").write_text("<html></html>")
+    settings = DictSettings({"importServer": {"port": 28775, "idleTimeout": 0.3}})
+
+    async def quiet() -> dict:
+        return {}  # nothing changes: the stream only gets keepalives
+
+    status = StatusBroadcaster(quiet, interval=0.05)
+    server = ImportServer(settings, static_dir, str(tmp_path / "runtime"), status=status)
+
+    async def scenario() -> None:
+        port = await server.ensure_started()
+        client_ssl = ssl.create_default_context()
+        client_ssl.check_hostname = False
+        client_ssl.verify_mode = ssl.CERT_NONE
+        async with (
+            ClientSession(connector=TCPConnector(ssl=client_ssl)) as session,
+            session.get(f"https://127.0.0.1:{port}/status/events") as response,
+        ):
+            assert response.status == 200
+            await asyncio.sleep(0.8)
+            assert server.is_running()
+        await asyncio.sleep(0.8)
+        assert not server.is_running()
+
+    asyncio.run(scenario())
+
+
+def _link(host: str, name: str) -> str:
+    return f"vless://11111111-1111-4111-8111-111111111111@{host}:443?security=tls#{name}"
+
+
+def test_batch_import_streams_results_into_node_store(tmp_path: Path) -> None:
+    subscription = base64.b64encode(
+        json.dumps([_link("b.example.com", "B"), _link("c.example.com", "C")]).encode()
+    ).decode()
+    body = "\n".join(
+        [
+            _link("a.example.com", "A"),
+            "not a link",
+            subscription,
+            json.dumps({"link": _link("a.example.com", "A again")}),
+        ]
+    )
+    settings = DictSettings({})
+    nodes = NodeStore(settings)
+
+    async def scenario() -> list:
+        app = create_import_app(settings, tmp_path, nodes=nodes)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/import/batch", data=body.encode())
+            assert response.status == 200
+            assert response.headers["Content-Type"] == "application/x-ndjson"
+            return [json.loads(line) for line in (await response.text()).splitlines()]
+
+    lines = asyncio.run(scenario())
+    assert [(line.get("item"), line.get("status")) for line in lines[:-1]] == [
+        (1, "added"),
+        (2, "invalid"),
+        (3, "added"),
+        (3, "added"),
+        (4, "duplicate"),
+    ]
+    assert lines[-1] == {"done": True, "added": 3, "duplicate": 1, "invalid": 1, "full": 0}
+    assert [node["address"] for node in nodes.list()] == [
+        "a.example.com",
+        "b.example.com",
+        "c.example.com",
+    ]
+    # Duplicate refreshed the name; the first node became the active config
+    assert nodes.list()[0]["name"] == "A again"
+    assert settings.settings["vlessConfig"]["address"] == "a.example.com"
+    assert "id" not in settings.settings["vlessConfig"]
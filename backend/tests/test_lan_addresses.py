@@ -0,0 +1,62 @@
+"""Tests for netlink-based LAN address discovery."""
+
+import asyncio
+import socket
+import struct
+
+from backend.src import lan_addresses
+from backend.src.lan_addresses import (
+    IFA_LABEL,
+    IFA_LOCAL,
+    RTM_NEWADDR,
+    _iter_messages,
+    _parse_ifaddr,
+)
+
+
+def _rtattr(attr_type: int, value: bytes) -> bytes:
+    attr = struct.pack("=HH", 4 + len(value), attr_type) + value
+    return attr + b"\0" * (-len(attr) % 4)
+
+
+def _newaddr(address: str, label: str, scope: int = 0) -> bytes:
+    payload = struct.pack("=BBBBI", socket.AF_INET, 24, 0, scope, 2)
+    payload += _rtattr(IFA_LOCAL, socket.inet_aton(address))
+    payload += _rtattr(IFA_LABEL, label.encode() + b"\0")
+    return struct.pack("=LHHLL", 16 + len(payload), RTM_NEWADDR, 0, 1, 0) + payload
+
+
+def test_parses_rtm_newaddr_messages() -> None:
+    datagram = _newaddr("192.168.1.20", "wlan0") + _newaddr("10.0.0.5", "eth0")
+    messages = list(_iter_messages(datagram))
+    assert [t for t, _ in messages] == [RTM_NEWADDR, RTM_NEWADDR]
+    assert [_parse_ifaddr(payload) for _, payload in messages] == [
+        {"address": "192.168.1.20", "interface": "wlan0"},
+        {"address": "10.0.0.5", "interface": "eth0"},
+    ]
+
+    # Link/host scope addresses are not offered
+    _, host_scope = next(_iter_messages(_newaddr("10.0.0.5", "wlan0", scope=254)))
+    assert _parse_ifaddr(host_scope) is None
+
+
+def test_resolver_ranks_default_route_interface_first(monkeypatch) -> None:
+    monkeypatch.setattr(
+        lan_addresses,
+        "dump_addresses",
+        lambda: [
+            {"address": "172.17.0.1", "interface": "docker0"},
+            {"address": "10.8.0.2", "interface": "xray0"},
+            {"address": "192.168.1.20", "interface": "wlan0"},
+        ],
+    )
+    monkeypatch.setattr(lan_addresses, "default_route_interfaces", lambda: ["xray0", "wlan0"])
+
+    async def scenario() -> list:
+        resolver = lan_addresses.LanAddressResolver()
+        try:
+            return await resolver.get_addresses()
+        finally:
+            resolver.close()
+
+    assert [a["address"] for a in asyncio.run(scenario())] == ["192.168.1.20", "172.17.0.1"]
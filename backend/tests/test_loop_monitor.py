@@ -0,0 +1,30 @@
+"""Tests for the event-loop lag monitor."""
+
+import asyncio
+import time
+
+from backend.src.loop_monitor import LoopMonitor
+
+
+def _blocking_call() -> None:
+    time.sleep(0.3)
+
+
+def test_reports_blocking_call_site() -> None:
+    async def scenario() -> dict:
+        monitor = LoopMonitor(threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _blocking_call()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        assert not asyncio.get_running_loop().get_debug()
+        return monitor.get_report()
+
+    report = asyncio.run(scenario())
+    assert report["stalls"] == 1
+    assert report["maxLagMs"] >= 200
+    stalls = [o for o in report["offenders"] if o["kind"] == "stall"]
+    assert stalls and stalls[0]["site"].endswith("in _blocking_call")
+    callbacks = [o for o in report["offenders"] if o["kind"] == "callback"]
+    assert callbacks and "scenario() running at" in callbacks[0]["site"]
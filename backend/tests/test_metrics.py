@@ -0,0 +1,87 @@
+"""Tests for the in-process metrics registry and /metrics endpoint."""
+
+import asyncio
+import socket
+
+from aiohttp import ClientSession
+
+from backend.src.metrics import CONTENT_TYPE, MetricsServer, Registry
+from backend.tests.fake_tools import running_plugin
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_renders_openmetrics_text() -> None:
+    registry = Registry()
+    restarts = registry.counter("demo_restarts", "Restarts")
+    lag = registry.gauge("demo_lag_seconds", "Lag", ("stat",))
+    phases = registry.histogram("demo_phase_seconds", "Phases", ("phase",), buckets=(0.1, 1.0))
+    collected = []
+
+    async def collector() -> None:
+        collected.append(1)
+        lag.set(0.25, stat="max")
+
+    registry.add_collector(collector)
+    restarts.inc()
+    restarts.inc(2)
+    phases.observe(0.05, phase="start")
+    phases.observe(0.5, phase="start")
+    phases.observe(3, phase="start")
+
+    text = asyncio.run(registry.render())
+    lines = text.splitlines()
+    assert collected == [1]
+    assert "# TYPE demo_restarts counter" in lines
+    assert "demo_restarts_total 3" in lines
+    assert 'demo_lag_seconds{stat="max"} 0.25' in lines
+    assert 'demo_phase_seconds_bucket{phase="start",le="0.1"} 1' in lines
+    assert 'demo_phase_seconds_bucket{phase="start",le="1"} 2' in lines
+    assert 'demo_phase_seconds_bucket{phase="start",le="+Inf"} 3' in lines
+    assert 'demo_phase_seconds_count{phase="start"} 3' in lines
+    assert 'demo_phase_seconds_sum{phase="start"} 3.55' in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_metrics_server_serves_loopback_only_by_default() -> None:
+    registry = Registry()
+    registry.counter("demo_scrapes", "Scrapes").inc()
+    server = MetricsServer(registry)
+
+    async def scenario() -> None:
+        result = await server.start(port=0)
+        assert result["success"]
+        assert server.address[0] == "127.0.0.1"
+        site_port = server._runner.addresses[0][1]
+        try:
+            async with (
+                ClientSession() as session,
+                session.get(f"http://127.0.0.1:{site_port}/metrics") as response,
+            ):
+                assert response.status == 200
+                assert response.headers["Content-Type"] == CONTENT_TYPE
+                assert "demo_scrapes_total 1" in await response.text()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_plugin_endpoint_is_off_until_enabled(plugin_module, plugin_tools) -> None:
+    plugin_tools()
+    module = plugin_module.module
+
+    async def scenario() -> None:
+        async with running_plugin(module) as plugin:
+            assert not module.metrics_server.is_running()
+            port = _free_port()
+            assert (await plugin.set_metrics_endpoint(True, port=port))["success"]
+            assert module.metrics_server.is_running()
+            assert (await plugin.set_metrics_endpoint(False))["success"]
+            assert not module.metrics_server.is_running()
+
+    asyncio.run(scenario())
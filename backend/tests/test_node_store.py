@@ -0,0 +1,84 @@
+"""Tests for NodeStore dedup, identity and capacity."""
+
+from backend.src.node_store import NodeStore, node_id
+
+NODE = {
+    "sourceUrl": "vless://11111111-1111-4111-8111-111111111111@a.example.com:443",
+    "configType": "single",
+    "uuid": "11111111-1111-4111-8111-111111111111",
+    "address": "a.example.com",
+    "port": 443,
+    "security": "tls",
+    "importedAt": 1700000000,
+    "isValid": True,
+    "name": "A",
+}
+
+
+class DictSettings:
+    """Minimal SettingsManager stand-in."""
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def getSetting(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def setSetting(self, key, value):
+        self.settings[key] = value
+
+    def commit(self):
+        pass
+
+
+def test_reimport_is_duplicate_and_refreshes_name() -> None:
+    store = NodeStore(DictSettings({}))
+    nid, status = store.add(NODE)
+    assert status == "added"
+
+    again = dict(NODE, name="A (renamed)", importedAt=1800000000, configType="subscription")
+    assert store.add(again) == (nid, "duplicate")
+    assert [n["name"] for n in store.list()] == ["A (renamed)"]
+    assert store.find(dict(NODE, lastValidatedAt=123)) == nid
+
+
+def test_connection_parameters_make_distinct_nodes() -> None:
+    store = NodeStore(DictSettings({}))
+    store.add(NODE)
+
+    # Fields outside the fixed identity list count too, e.g. per-node mux
+    assert store.add(dict(NODE, mux=True))[1] == "added"
+    assert store.add(dict(NODE, port=8443))[1] == "added"
+    assert len(store.list()) == 3
+
+
+def test_ids_of_nodes_without_new_fields_are_unchanged() -> None:
+    # Stored before mux existed: the id must still match on re-import
+    legacy = {
+        field: NODE.get(field)
+        for field in (
+            "uuid",
+            "address",
+            "port",
+            "flow",
+            "encryption",
+            "network",
+            "security",
+            "realityConfig",
+        )
+    }
+    assert node_id(NODE) == node_id(legacy)
+
+
+def test_store_is_capped_at_max_nodes() -> None:
+    store = NodeStore(DictSettings({}), max_nodes=3)
+    for port in range(1, 4):
+        assert store.add(dict(NODE, port=port))[1] == "added"
+
+    assert store.add(dict(NODE, port=4))[1] == "full"
+    # A known node is still recognised when the store is full
+    assert store.add(dict(NODE, port=2, name="B"))[1] == "duplicate"
+    assert len(store.list()) == 3
+
+    assert store.remove(store.find(dict(NODE, port=1)))
+    assert store.add(dict(NODE, port=4))[1] == "added"
@@ -0,0 +1,79 @@
+"""Tests for xray-core scheduling config validation and cgroup placement."""
+
+from pathlib import Path
+
+import pytest
+
+from backend.src import process_scheduling
+from backend.src.process_scheduling import DEFAULT_SCHEDULING, validate_scheduling
+
+
+def test_default_changes_nothing() -> None:
+    merged, error = validate_scheduling({})
+
+    assert error is None
+    assert merged == DEFAULT_SCHEDULING
+    assert merged["nice"] == 0
+    assert merged["ioClass"] is None
+    # No cgroup limit requested: the process stays in the plugin's cgroup
+    assert merged["cpuWeight"] is None and merged["memoryHigh"] is None
+
+
+def test_memory_high_is_validated() -> None:
+    for value in ("128M", "max", 134217728):
+        merged, error = validate_scheduling({"memoryHigh": value})
+        assert error is None
+        assert merged["memoryHigh"] == str(value)
+
+    for value in ("128MB", "-1", 0, "0", True, 1.5, "1G\n"):
+        merged, error = validate_scheduling({"memoryHigh": value})
+        assert merged is None
+        assert "memoryHigh" in error
+
+
+@pytest.fixture
+def cgroup_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """cgroup v2 root stand-in with cpu and memory available, none enabled."""
+    (tmp_path / "cgroup.controllers").write_text("cpuset cpu io memory pids\n")
+    (tmp_path / "cgroup.subtree_control").write_text("\n")
+    monkeypatch.setattr(process_scheduling, "CGROUP_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def test_cgroup_enables_controllers_and_reports_skipped_limits(cgroup_root: Path) -> None:
+    config, _ = validate_scheduling({"cpuWeight": 50, "memoryHigh": "128M"})
+    path = cgroup_root / process_scheduling.CGROUP_NAME
+    path.mkdir()
+    (path / "cpu.weight").write_text("100\n")  # memory.high never appeared
+    errors: list = []
+
+    assert process_scheduling._apply_cgroup(4242, config, errors) == str(path)
+    assert (cgroup_root / "cgroup.subtree_control").read_text() == "+cpu +memory"
+    assert (path / "cpu.weight").read_text() == "50"
+    assert (path / "cgroup.procs").read_text() == "4242"
+    assert errors == [f"cgroup: memory.high not available in {path}"]
+
+
+def test_cgroup_reports_unavailable_controller(cgroup_root: Path) -> None:
+    (cgroup_root / "cgroup.controllers").write_text("cpu io pids\n")
+    (cgroup_root / "cgroup.subtree_control").write_text("cpu\n")
+    config, _ = validate_scheduling({"memoryHigh": "64M"})
+    errors: list = []
+
+    process_scheduling._apply_cgroup(4242, config, errors)
+    # Nothing to enable: cpu is on already and memory does not exist
+    assert (cgroup_root / "cgroup.subtree_control").read_text() == "cpu\n"
+    assert errors[0] == f"cgroup: memory controller not available in {cgroup_root}"
+    assert "memory.high not available" in errors[1]
+
+
+def test_remove_cgroup(cgroup_root: Path) -> None:
+    path = cgroup_root / process_scheduling.CGROUP_NAME
+    path.mkdir()
+    assert process_scheduling.remove_cgroup() is None
+    assert not path.exists()
+    assert process_scheduling.remove_cgroup() is None  # already gone
+
+    path.mkdir()
+    (path / "cgroup.procs").write_text("4242")  # a process still inside
+    assert process_scheduling.remove_cgroup() is not None
@@ -0,0 +1,69 @@
+"""Tests for resource profiles: Go runtime environment and xray policy."""
+
+import asyncio
+from pathlib import Path
+
+from backend.src.resource_profiles import (
+    DEFAULT_PROFILE,
+    RESOURCE_PROFILES,
+    build_environment,
+    build_policy,
+)
+from backend.src.xray_manager import XrayManager
+
+VLESS_CONFIG = {
+    "uuid": "8b3f1c7e-2a4d-4e5f-9a6b-1c2d3e4f5a6b",
+    "address": "node-a.example.com",
+    "port": 443,
+    "security": "tls",
+}
+
+BASE_ENV = {"PATH": "/usr/bin", "GOGC": "off", "GOMAXPROCS": "1"}
+
+
+def test_default_profile_keeps_inherited_environment() -> None:
+    assert RESOURCE_PROFILES[DEFAULT_PROFILE] == {"env": {}, "policy": {}}
+    assert build_environment(DEFAULT_PROFILE, BASE_ENV) == BASE_ENV
+    # Unknown names fall back to the default profile
+    assert build_environment("turbo", BASE_ENV) == BASE_ENV
+
+
+def test_profile_environment_replaces_go_runtime_settings() -> None:
+    gaming = build_environment("gaming", BASE_ENV)
+    assert gaming == {
+        "PATH": "/usr/bin",
+        "GOMEMLIMIT": "64MiB",
+        "GOGC": "50",
+        "GOMAXPROCS": "2",
+    }
+    # download sets no GOMAXPROCS: an inherited one must not cap it either
+    download = build_environment("download", BASE_ENV)
+    assert "GOMAXPROCS" not in download
+    assert download["GOGC"] == "200"
+    assert BASE_ENV["GOGC"] == "off"  # base_env is not modified
+
+
+def test_policy_is_injected_into_rendered_config() -> None:
+    manager = XrayManager()
+    default = manager._build_xray_config(VLESS_CONFIG, tun_mode=False)
+    assert build_policy(DEFAULT_PROFILE) == {}
+    assert "levels" not in default["policy"]
+    assert default["policy"]["system"]["statsOutboundUplink"] is True
+
+    manager.resource_profile = "gaming"
+    gaming = manager._build_xray_config(VLESS_CONFIG, tun_mode=False)
+    assert gaming["policy"]["levels"]["0"] == RESOURCE_PROFILES["gaming"]["policy"]
+    assert gaming["policy"]["system"]["statsOutboundDownlink"] is True
+
+
+def test_profiles_render_separate_configs(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = XrayManager(runtime_dir=str(tmp_path))
+        default = await manager.generate_config(VLESS_CONFIG)
+        manager.resource_profile = "download"
+        download = await manager.generate_config(VLESS_CONFIG)
+        assert download != default
+        manager.resource_profile = DEFAULT_PROFILE
+        assert await manager.generate_config(VLESS_CONFIG) == default
+
+    asyncio.run(scenario())
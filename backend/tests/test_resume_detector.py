@@ -0,0 +1,98 @@
+"""Tests for ResumeDetector suspend detection and de-duplication."""
+
+import asyncio
+import stat
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from backend.src import resume_detector
+from backend.src.resume_detector import ResumeDetector
+
+# Stand-in for `gdbus monitor`: logind announces the resume shortly after start
+FAKE_GDBUS = """#!/bin/sh
+sleep 0.1
+echo "/org/freedesktop/login1: org.freedesktop.login1.Manager.PrepareForSleep (false,)"
+exec sleep 30
+"""
+
+
+@pytest.fixture
+def sleep_offset(monkeypatch: pytest.MonkeyPatch) -> List[float]:
+    """Fake BOOTTIME-MONOTONIC offset; add to [0] to simulate a suspend."""
+    offset = [100.0]
+    monkeypatch.setattr(resume_detector, "_sleep_offset", lambda: offset[0])
+    monkeypatch.setattr(ResumeDetector, "POLL_INTERVAL", 0.05)
+    return offset
+
+
+def test_poll_reports_suspend_jump(sleep_offset: List[float], monkeypatch) -> None:
+    monkeypatch.setattr(resume_detector.shutil, "which", lambda name: None)
+
+    async def scenario() -> List[float]:
+        resumes: List[float] = []
+
+        async def on_resume(slept: float) -> None:
+            resumes.append(slept)
+
+        detector = ResumeDetector(on_resume)
+        detector.start()
+        sleep_offset[0] += 0.5  # clock jitter, not a suspend
+        await asyncio.sleep(0.2)
+        sleep_offset[0] += 30
+        await asyncio.sleep(0.3)
+        await detector.stop()
+        return resumes
+
+    assert asyncio.run(scenario()) == [30]
+
+
+def test_logind_and_poll_report_one_resume(
+    sleep_offset: List[float], tmp_path: Path, monkeypatch
+) -> None:
+    gdbus = tmp_path / "gdbus"
+    gdbus.write_text(FAKE_GDBUS)
+    gdbus.chmod(gdbus.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}:/usr/bin:/bin")
+    monkeypatch.setattr(ResumeDetector, "POLL_INTERVAL", 0.3)
+
+    async def scenario() -> List[float]:
+        resumes: List[float] = []
+
+        async def on_resume(slept: float) -> None:
+            resumes.append(slept)
+
+        detector = ResumeDetector(on_resume)
+        detector.start()
+        sleep_offset[0] += 30
+        await asyncio.sleep(1.0)
+        await detector.stop()
+        assert detector.resume_count == 1
+        return resumes
+
+    # logind reports first and consumes the offset jump; the poller sees none
+    assert asyncio.run(scenario()) == [30]
+
+
+def test_fire_deduplicates_within_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [500.0]
+    monkeypatch.setattr(resume_detector.time, "monotonic", lambda: now[0])
+
+    async def scenario() -> int:
+        calls = []
+
+        async def on_resume(slept: float) -> None:
+            calls.append(slept)
+            # A second source reporting while the handler runs is dropped
+            await detector._fire(slept)
+
+        detector = ResumeDetector(on_resume)
+        await detector._fire(30)
+        now[0] += ResumeDetector.POLL_INTERVAL / 2
+        await detector._fire(0)
+        now[0] += ResumeDetector.POLL_INTERVAL
+        await detector._fire(12)
+        return len(calls)
+
+    assert asyncio.run(scenario()) == 2
@@ -0,0 +1,41 @@
+"""Tests for the import page's in-memory static assets."""
+
+import asyncio
+import gzip
+from pathlib import Path
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from backend.src.import_server import create_import_app
+
+STATIC_DIR = Path(__file__).resolve().parents[1] / "static"
+
+
+def test_serves_compressed_assets_with_etags() -> None:
+    async def scenario() -> None:
+        app = create_import_app(settings=None, static_dir=STATIC_DIR)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get(
+                "/import", headers={"Accept-Encoding": "gzip"}, auto_decompress=False
+            )
+            assert response.status == 200
+            assert response.headers["Content-Encoding"] == "gzip"
+            assert response.headers["Content-Type"].startswith("text/html")
+            body = await response.read()
+            assert gzip.decompress(body) == (STATIC_DIR / "import.html").read_bytes()
+            etag = response.headers["ETag"]
+
+            response = await client.get(
+                "/import", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+            )
+            assert response.status == 304
+
+            response = await client.get("/import/static/import.css")
+            assert response.status == 200
+            assert "max-age" in response.headers["Cache-Control"]
+            assert await response.read() == (STATIC_DIR / "import.css").read_bytes()
+
+            response = await client.get("/import/static/../import_server.py")
+            assert response.status == 404
+
+    asyncio.run(scenario())
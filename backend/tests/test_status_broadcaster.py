@@ -0,0 +1,54 @@
+"""Tests for the shared live-status broadcaster and /status/events."""
+
+import asyncio
+from pathlib import Path
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from backend.src.import_server import create_import_app
+from backend.src.status_broadcaster import StatusBroadcaster, ThroughputMeter
+
+
+def test_throughput_meter_rates_and_counter_reset() -> None:
+    meter = ThroughputMeter()
+    assert meter.update(1000, 5000, now=10.0)["downlinkBps"] == 0
+    rates = meter.update(3000, 9000, now=12.0)
+    assert (rates["uplinkBps"], rates["downlinkBps"]) == (1000, 2000)
+    # The same reading again (shared, not re-queried) keeps its rates
+    assert meter.update(3000, 9000, now=12.0) == rates
+    # New xray-core instance: counters start over
+    assert meter.update(10, 10, now=13.0)["uplinkBps"] == 0
+
+
+def test_viewers_share_one_sampler(tmp_path: Path) -> None:
+    calls = []
+
+    async def sampler():
+        calls.append(1)
+        return {"status": {"status": "connected"}, "throughput": {"uplinkBps": len(calls)}}
+
+    broadcaster = StatusBroadcaster(sampler, interval=0.05)
+
+    async def read_events(client: TestClient, count: int) -> list:
+        response = await client.get("/status/events")
+        assert response.headers["Content-Type"] == "text/event-stream"
+        events = []
+        while len(events) < count:
+            line = (await response.content.readline()).decode().strip()
+            if line.startswith("event: "):
+                events.append(line[len("event: ") :])
+        response.close()
+        return events
+
+    async def scenario() -> None:
+        app = create_import_app(None, tmp_path, status=broadcaster)
+        async with TestClient(TestServer(app)) as client:
+            viewers = await asyncio.gather(*(read_events(client, 4) for _ in range(3)))
+            for events in viewers:
+                assert events[0] == "status" and "throughput" in events
+            # 3 viewers x 3 throughput updates would be 9+ samples unshared
+            assert len(calls) <= 6
+        await asyncio.sleep(0.1)
+        assert broadcaster.subscriber_count() == 0
+
+    asyncio.run(scenario())
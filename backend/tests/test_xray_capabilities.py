@@ -0,0 +1,25 @@
+"""Tests for the xray-core capability probe cache."""
+
+import asyncio
+from pathlib import Path
+
+from backend.src.file_settings import SettingsManager
+from backend.src.xray_capabilities import SETTINGS_KEY, probe_capabilities
+
+
+def test_geodata_is_checked_on_every_probe(fake_xray: Path, tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.delenv("XRAY_LOCATION_ASSET", raising=False)
+    settings = SettingsManager("settings", str(tmp_path / "settings"))
+
+    first = asyncio.run(probe_capabilities(str(fake_xray), settings))
+    assert first["version"] == "26.1.23"
+    assert first["geodata"] == {"geoip.dat": False, "geosite.dat": False}
+    assert "geodata" not in settings.getSetting(SETTINGS_KEY)
+
+    # geoip.dat installed later, binary unchanged: version comes from the cache
+    (tmp_path / "geoip.dat").write_bytes(b"")
+    monkeypatch.setenv("FAKE_XRAY_VERSION", "broken")
+    second = asyncio.run(probe_capabilities(str(fake_xray), settings))
+    assert second["version"] == "26.1.23"
+    assert second["geodata"] == {"geoip.dat": True, "geosite.dat": False}
+    assert second["probedAt"] == first["probedAt"]
@@ -0,0 +1,490 @@
+"""Tests for XrayManager config caching and hot outbound replacement."""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+from backend.src.xray_manager import XrayManager
+
+VLESS_CONFIG = {
+    "uuid": "8b3f1c7e-2a4d-4e5f-9a6b-1c2d3e4f5a6b",
+    "address": "node-a.example.com",
+    "port": 443,
+    "security": "reality",
+    "flow": "xtls-rprx-vision",
+    "realityConfig": {"publicKey": "pk", "shortId": "ab", "serverName": "a.example"},
+}
+
+
+def _calls(command: str) -> list:
+    log = Path(os.environ["FAKE_XRAY_LOG"])
+    if not log.is_file():
+        return []
+    entries = [json.loads(line) for line in log.read_text().splitlines()]
+    return [e for e in entries if e["argv"][0] == command]
+
+
+def test_generate_config_is_content_addressed(tmp_path: Path) -> None:
+    manager = XrayManager(runtime_dir=str(tmp_path))
+    config_file = asyncio.run(manager.generate_config(VLESS_CONFIG, tun_mode=False))
+
+    assert Path(config_file).parent == tmp_path
+    assert "\n" not in Path(config_file).read_text()  # compact JSON
+    mtime = os.stat(config_file).st_mtime_ns
+
+    # Timestamps do not affect rendering; the cached path is reused as-is
+    revalidated = dict(VLESS_CONFIG, lastValidatedAt=123)
+    assert asyncio.run(manager.generate_config(revalidated, tun_mode=False)) == config_file
+    assert os.stat(config_file).st_mtime_ns == mtime
+    tun_file = asyncio.run(
+        manager.generate_config(VLESS_CONFIG, tun_mode=True, outbound_interface="wlan0")
+    )
+    assert tun_file != config_file
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+
+def test_render_cache_survives_restart(tmp_path: Path, monkeypatch) -> None:
+    config_file = asyncio.run(XrayManager(runtime_dir=str(tmp_path)).generate_config(VLESS_CONFIG))
+
+    # A new instance (plugin reload / reboot with a persistent runtime dir)
+    # resolves the same inputs from the index without rendering
+    manager = XrayManager(runtime_dir=str(tmp_path))
+    monkeypatch.setattr(manager, "_build_xray_config", None)
+    assert asyncio.run(manager.generate_config(VLESS_CONFIG)) == config_file
+
+
+def test_validate_config_runs_xray_test_once(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        config_file = await manager.generate_config(VLESS_CONFIG, tun_mode=False)
+        assert (await manager.validate_config(config_file))["success"] is True
+        assert (await manager.validate_config(config_file))["success"] is True
+
+        # A fresh manager trusts the persisted marker for the same binary
+        fresh = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        assert (await fresh.validate_config(config_file))["success"] is True
+
+    asyncio.run(scenario())
+    assert len(_calls("run")) == 1
+
+
+def test_validate_config_again_after_binary_upgrade(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        config_file = await manager.generate_config(VLESS_CONFIG, tun_mode=False)
+        assert (await manager.validate_config(config_file))["success"] is True
+
+        # Same path, new build: the marker of the old binary does not count
+        fake_xray.write_text(fake_xray.read_text() + "\n# upgraded\n")
+        assert (await manager.validate_config(config_file))["success"] is True
+        assert (await manager.validate_config(config_file))["success"] is True
+
+    asyncio.run(scenario())
+    assert len(_calls("run")) == 2
+    assert len(list(tmp_path.glob("xray-config-*.valid"))) == 2
+
+
+def test_generate_config_recovers_from_deleted_file(tmp_path: Path) -> None:
+    manager = XrayManager(runtime_dir=str(tmp_path))
+    config_file = asyncio.run(manager.generate_config(VLESS_CONFIG))
+    os.remove(config_file)
+
+    assert asyncio.run(manager.generate_config(VLESS_CONFIG)) == config_file
+    assert Path(config_file).is_file()
+
+
+def test_prune_removes_unindexed_configs(tmp_path: Path) -> None:
+    stray = tmp_path / "xray-config-0123456789abcdef.json"
+    stray.write_text("{}")
+    (tmp_path / (stray.name + ".a1b2c3d4e5f6.valid")).write_text("old")
+    manager = XrayManager(runtime_dir=str(tmp_path))
+
+    for port in range(1000, 1000 + XrayManager.CONFIG_CACHE_SIZE + 2):
+        asyncio.run(manager.generate_config(dict(VLESS_CONFIG, port=port)))
+
+    rendered = [
+        p for p in tmp_path.glob("xray-config-*.json") if p.name != XrayManager.CONFIG_INDEX
+    ]
+    assert len(rendered) == XrayManager.CONFIG_CACHE_SIZE
+    assert not stray.exists()
+    assert list(tmp_path.glob("*.valid")) == []
+
+
+def test_concurrent_renders_keep_each_others_files(tmp_path: Path) -> None:
+    async def scenario() -> list:
+        manager = XrayManager(runtime_dir=str(tmp_path))
+        ports = range(2000, 2000 + XrayManager.CONFIG_CACHE_SIZE)
+        return await asyncio.gather(
+            *(manager.generate_config(dict(VLESS_CONFIG, port=port)) for port in ports)
+        )
+
+    rendered = asyncio.run(scenario())
+    assert len(set(rendered)) == XrayManager.CONFIG_CACHE_SIZE
+    assert all(Path(f).is_file() for f in rendered)
+    index = json.loads((tmp_path / XrayManager.CONFIG_INDEX).read_text())
+    assert sorted(path for _, path in index) == sorted(rendered)
+
+
+def test_validate_config_reports_rejection(fake_xray: Path, tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("FAKE_XRAY_TEST_RC", "23")
+    manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+    config_file = asyncio.run(manager.generate_config(VLESS_CONFIG, tun_mode=False))
+
+    result = asyncio.run(manager.validate_config(config_file))
+
+    assert result["errorCode"] == "CONFIG_TEST_FAILED"
+    assert "invalid outbound" in result["error"]
+    assert list(tmp_path.glob("*.valid")) == []
+
+
+def test_config_exposes_handler_service_on_loopback() -> None:
+    config = XrayManager()._build_xray_config(VLESS_CONFIG, tun_mode=False)
+
+    assert config["api"]["services"] == ["HandlerService", "StatsService"]
+    assert config["policy"]["system"]["statsOutboundDownlink"] is True
+    api_inbound = next(i for i in config["inbounds"] if i["tag"] == "api")
+    assert api_inbound["listen"] == "127.0.0.1"
+    assert config["routing"]["rules"][0]["inboundTag"] == ["api"]
+    # Per-instance port: never shared with a retiring instance
+    assert "streamSettings" not in api_inbound
+
+
+def test_handover_config_uses_standby_api_port(tmp_path: Path) -> None:
+    manager = XrayManager(runtime_dir=str(tmp_path))
+    current = asyncio.run(manager.generate_config(VLESS_CONFIG))
+    standby = asyncio.run(
+        manager.generate_config(VLESS_CONFIG, api_port=manager.standby_api_port())
+    )
+
+    assert standby != current
+    ports = [
+        next(i["port"] for i in json.loads(Path(f).read_text())["inbounds"] if i["tag"] == "api")
+        for f in (current, standby)
+    ]
+    assert ports == [XrayManager.API_PORT, XrayManager.API_STANDBY_PORT]
+
+
+def test_drain_removes_old_inbounds_first(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        old = await manager._spawn(await manager.generate_config(VLESS_CONFIG), "balanced")
+        manager.api_port = XrayManager.API_STANDBY_PORT  # the new instance's
+
+        await asyncio.wait_for(manager._drain_and_stop(old, XrayManager.API_PORT), timeout=5)
+        assert old.returncode is not None
+
+    asyncio.run(scenario())
+    calls = _calls("api")
+    assert [c["argv"][1:] for c in calls] == [
+        ["rmi", "--server=127.0.0.1:10085", "socks", "http"]
+    ]
+
+
+def test_update_outbound_replaces_proxy_in_place(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> str:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        config_file = await manager.generate_config(VLESS_CONFIG, tun_mode=False)
+        await manager.start(config_file)
+        pid = manager.get_process_id()
+        try:
+            new_node = dict(VLESS_CONFIG, address="node-b.example.com", port=8443)
+            result = await manager.update_outbound(new_node)
+
+            assert result == {"success": True, "processId": pid, "method": "api"}
+            assert manager.get_process_id() == pid
+            calls = _calls("api")
+            assert [c["argv"][1] for c in calls] == ["rmo", "ado"]
+            assert calls[0]["argv"][2:] == ["--server=127.0.0.1:10085", "proxy"]
+            outbound = calls[1]["file"]["outbounds"][0]
+            assert outbound["tag"] == "proxy"
+            assert outbound["settings"]["vnext"][0]["address"] == "node-b.example.com"
+            return manager.config_file
+        finally:
+            await manager.stop()
+
+    on_disk = json.loads(Path(asyncio.run(scenario())).read_text())
+    assert on_disk["outbounds"][0]["settings"]["vnext"][0]["port"] == 8443
+
+
+def test_adopt_after_update_outbound_keeps_new_outbound(
+    fake_xray: Path, tmp_path: Path, monkeypatch
+) -> None:
+    async def ready(self, pid: int) -> bool:
+        return True
+
+    monkeypatch.setattr(XrayManager, "probe_ready", ready)
+
+    async def scenario() -> None:
+        previous = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        launched = await previous.generate_config(VLESS_CONFIG, tun_mode=False)
+        await previous.start(launched)
+        new_node = dict(VLESS_CONFIG, address="node-b.example.com")
+        assert (await previous.update_outbound(new_node))["success"] is True
+        assert previous.config_file != launched
+
+        # Plugin reload: the process still runs `-config <launched>`, but
+        # restarts must use the config with the swapped outbound
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        adopted = await manager.adopt()
+        assert adopted["success"] is True
+        assert adopted["configFile"] == previous.config_file
+        assert manager.config_file == previous.config_file
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_update_outbound_reports_unavailable_api(fake_xray: Path, tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("FAKE_XRAY_API_RC", "1")
+
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        await manager.start(await manager.generate_config(VLESS_CONFIG, tun_mode=False))
+        try:
+            result = await manager.update_outbound(VLESS_CONFIG)
+            assert result["success"] is False
+            assert result["errorCode"] == "API_UNAVAILABLE"
+            assert "connection refused" in result["error"]
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_update_outbound_keeps_running_outbound_on_rejected_config(
+    fake_xray: Path, tmp_path: Path, monkeypatch
+) -> None:
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        running = await manager.generate_config(VLESS_CONFIG, tun_mode=False)
+        await manager.start(running)
+        try:
+            monkeypatch.setenv("FAKE_XRAY_TEST_RC", "23")
+            new_node = dict(VLESS_CONFIG, address="node-b.example.com")
+            result = await manager.update_outbound(new_node)
+            assert result["errorCode"] == "CONFIG_TEST_FAILED"
+            # Not the supervisor's restart target either
+            assert manager.config_file == running
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+    assert _calls("api") == []
+
+
+def test_update_outbound_hands_over_when_add_fails(
+    fake_xray: Path, tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("FAKE_XRAY_API_FAIL", "ado")
+
+    async def listening(self, process, ports, timeout) -> bool:
+        return process.returncode is None
+
+    monkeypatch.setattr(XrayManager, "_wait_listening", listening)
+
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        await manager.start(await manager.generate_config(VLESS_CONFIG, tun_mode=False))
+        old = manager.process
+        try:
+            new_node = dict(VLESS_CONFIG, address="node-b.example.com")
+            result = await manager.update_outbound(new_node)
+
+            assert result["success"] is True
+            assert result["method"] == "handover"
+            assert manager.process is not old
+            assert manager.api_port == XrayManager.API_STANDBY_PORT
+            await asyncio.wait_for(old.wait(), timeout=5)
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+    assert [c["argv"][1] for c in _calls("api")] == ["rmo", "ado", "rmi"]
+
+
+def test_update_outbound_requires_running_process() -> None:
+    result = asyncio.run(XrayManager().update_outbound(VLESS_CONFIG))
+    assert result["errorCode"] == "API_UNAVAILABLE"
+
+
+def test_adopt_reattaches_after_reload(fake_xray: Path, tmp_path: Path, monkeypatch) -> None:
+    async def ready(self, pid: int) -> bool:
+        return True
+
+    monkeypatch.setattr(XrayManager, "probe_ready", ready)
+
+    async def scenario() -> None:
+        previous = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        config_file = await previous.generate_config(VLESS_CONFIG, tun_mode=False)
+        started = await previous.start(config_file)
+        assert started["success"] is True
+
+        # New plugin instance: same binary and runtime dir, no child process
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        adopted = await manager.adopt()
+        assert adopted["success"] is True
+        assert adopted["processId"] == started["processId"]
+        assert adopted["configFile"] == config_file
+        assert manager.is_running()
+
+        assert (await manager.stop())["success"] is True
+        assert not (tmp_path / XrayManager.PID_FILE).exists()
+        assert (await manager.adopt())["success"] is False
+
+    asyncio.run(scenario())
+
+
+def test_adopt_stops_instance_with_changed_config(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        previous = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        config_file = await previous.generate_config(VLESS_CONFIG, tun_mode=False)
+        started = await previous.start(config_file)
+        Path(config_file).write_text("{}")
+
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        assert (await manager.adopt())["success"] is False
+        assert not manager.is_running()
+        assert await asyncio.wait_for(previous.process.wait(), timeout=5) == 0
+        assert started["processId"] == previous.process.pid
+
+    asyncio.run(scenario())
+
+
+def test_stop_grace_adapts_to_shutdown_time(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        assert manager.stop_grace() == XrayManager.STOP_GRACE_MAX
+        config_file = await manager.generate_config(VLESS_CONFIG)
+        assert (await manager.start(config_file))["success"] is True
+
+        result = await manager.stop()
+        assert result == {"success": True, "killed": False}
+        # A prompt SIGTERM exit shortens the grace for the next stop
+        assert manager.stop_grace() < XrayManager.STOP_GRACE_MAX
+
+    asyncio.run(scenario())
+
+
+def test_xudp_mux_is_opt_in() -> None:
+    manager = XrayManager()
+    manager.capabilities = {"features": {"xudp": True}, "geodata": {}}
+    plain = dict(VLESS_CONFIG, flow="")
+
+    assert "mux" not in manager._build_outbound(plain, tun_mode=False)
+    assert manager._build_outbound(dict(plain, mux=True), tun_mode=False)["mux"]["enabled"]
+    # Vision flows reject mux even when asked for it
+    assert "mux" not in manager._build_outbound(dict(VLESS_CONFIG, mux=True), tun_mode=False)
+
+    manager.xudp = True
+    assert "mux" in manager._build_outbound(plain, tun_mode=False)
+    manager.capabilities = {"features": {"xudp": False}, "geodata": {}}
+    assert "mux" not in manager._build_outbound(plain, tun_mode=False)
+
+
+def test_running_state_changes_only_when_a_config_runs(
+    fake_xray: Path, tmp_path: Path, monkeypatch
+) -> None:
+    async def not_listening(self, process, ports, timeout) -> bool:
+        return False
+
+    monkeypatch.setattr(XrayManager, "_wait_listening", not_listening)
+
+    async def scenario() -> None:
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        running = await manager.generate_config(VLESS_CONFIG)
+        assert manager.config_file is None
+        assert (await manager.start(running))["success"] is True
+
+        # Rendering and a failed handover leave the restart target alone
+        tun_file = await manager.generate_config(VLESS_CONFIG, tun_mode=True, outbound_interface="wlan0")
+        standby = await manager.generate_config(
+            dict(VLESS_CONFIG, address="node-b.example.com"),
+            api_port=manager.standby_api_port(),
+        )
+        assert (await manager.handover(standby))["errorCode"] == "HANDOVER_FAILED"
+        assert manager.config_file == running
+        assert (manager.tun_mode, manager.api_port) == (False, XrayManager.API_PORT)
+
+        await manager.stop()
+        assert (await manager.start(tun_file))["success"] is True
+        assert (manager.config_file, manager.tun_mode, manager.outbound_interface) == (
+            tun_file,
+            True,
+            "wlan0",
+        )
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+# Listens on argv[1] until killed; the trailing "-config <path>" is what
+# /proc/<pid>/cmdline shows for an xray-core of an earlier plugin instance
+LISTENER = """
+import socket, sys, time
+s = socket.socket()
+s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+s.bind(("127.0.0.1", int(sys.argv[1])))
+s.listen()
+print("ready", flush=True)
+time.sleep(60)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_start_stops_leftover_instance_on_proxy_ports(
+    fake_xray: Path, tmp_path: Path, monkeypatch
+) -> None:
+    port = _free_port()
+    monkeypatch.setattr(XrayManager, "SOCKS_PORT", port)
+
+    async def scenario() -> None:
+        leftover = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            LISTENER,
+            str(port),
+            "-config",
+            str(tmp_path / "xray-config-0123456789abcdef.json"),
+            stdout=asyncio.subprocess.PIPE,
+        )
+        await leftover.stdout.readline()
+        manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+        result = await manager.start(await manager.generate_config(VLESS_CONFIG))
+        try:
+            assert result["success"] is True
+            await asyncio.wait_for(leftover.wait(), timeout=5)
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_start_refuses_proxy_ports_held_by_another_process(
+    fake_xray: Path, tmp_path: Path, monkeypatch
+) -> None:
+    holder = socket.socket()
+    holder.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    holder.bind(("127.0.0.1", 0))
+    holder.listen()
+    monkeypatch.setattr(XrayManager, "HTTP_PORT", holder.getsockname()[1])
+
+    manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+
+    async def scenario() -> dict:
+        return await manager.start(await manager.generate_config(VLESS_CONFIG))
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        holder.close()
+    assert result["errorCode"] == "PORT_IN_USE"
+    assert f"pid {os.getpid()}" in result["error"]
+    assert manager.process is None  # nothing joined the holder's port group
@@ -0,0 +1,166 @@
+"""Tests for XraySupervisor restarts, backoff and crash-loop detection."""
+
+import asyncio
+import stat
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from backend.src.xray_manager import XrayManager
+from backend.src.xray_supervisor import XraySupervisor
+
+VLESS_CONFIG = {
+    "uuid": "8b3f1c7e-2a4d-4e5f-9a6b-1c2d3e4f5a6b",
+    "address": "node-a.example.com",
+    "port": 443,
+    "security": "tls",
+}
+
+
+@pytest.fixture(autouse=True)
+def fast_timings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(XrayManager, "STARTUP_GRACE", 0.05)
+    monkeypatch.setattr(XraySupervisor, "BASE_DELAY", 0.01)
+    monkeypatch.setattr(XraySupervisor, "JITTER", 0.0)
+
+
+def _exiting_binary(tmp_path: Path) -> Path:
+    """A broken xray-core build: every run exits right away."""
+    binary = tmp_path / "xray-broken"
+    binary.write_text("#!/bin/sh\necho 'Failed to start: broken build' >&2\nexit 3\n")
+    binary.chmod(binary.stat().st_mode | stat.S_IXUSR)
+    return binary
+
+
+async def _running_manager(fake_xray: Path, tmp_path: Path) -> XrayManager:
+    manager = XrayManager(str(fake_xray), runtime_dir=str(tmp_path))
+    config_file = await manager.generate_config(VLESS_CONFIG)
+    assert (await manager.start(config_file))["success"] is True
+    return manager
+
+
+def test_restarts_after_unexpected_exit(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = await _running_manager(fake_xray, tmp_path)
+        restarted = asyncio.Event()
+        pids: List[int] = []
+
+        async def on_restarted(pid: int) -> None:
+            pids.append(pid)
+            restarted.set()
+
+        supervisor = XraySupervisor(manager, on_restarted=on_restarted)
+        supervisor.start()
+        old = manager.process
+        old.kill()
+        await asyncio.wait_for(restarted.wait(), timeout=5)
+
+        assert pids == [manager.get_process_id()]
+        assert manager.process is not old and manager.is_running()
+        status = supervisor.get_status()
+        assert (status["restartCount"], status["crashLoop"]) == (1, False)
+        assert status["lastExitCode"] == -9
+        await supervisor.stop()
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_crash_loop_backs_off_then_gives_up(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = await _running_manager(fake_xray, tmp_path)
+        original_pid = manager.get_process_id()
+        gave_up: List[Optional[int]] = []
+        delays: List[float] = []
+
+        async def on_crash_loop(pid: Optional[int]) -> None:
+            gave_up.append(pid)
+
+        supervisor = XraySupervisor(manager, on_crash_loop=on_crash_loop)
+        next_delay = supervisor._next_delay
+
+        def recorded_delay() -> float:
+            delays.append(next_delay())
+            return delays[-1]
+
+        supervisor._next_delay = recorded_delay
+        supervisor.start()
+        manager.xray_binary_path = str(_exiting_binary(tmp_path))
+        manager.process.kill()
+        await asyncio.wait_for(supervisor._task, timeout=10)
+
+        assert gave_up == [original_pid]
+        assert supervisor.crash_loop is True
+        assert supervisor.restart_count == 0
+        # One failed restart per exit until CRASH_LOOP_EXITS, doubling each time
+        base = XraySupervisor.BASE_DELAY
+        assert delays == pytest.approx(
+            [base * 2**n for n in range(XraySupervisor.CRASH_LOOP_EXITS - 1)]
+        )
+
+    asyncio.run(scenario())
+
+
+def test_exits_outside_the_window_do_not_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    supervisor = XraySupervisor(XrayManager())
+    now = [1000.0]
+    monkeypatch.setattr("backend.src.xray_supervisor.time.monotonic", lambda: now[0])
+
+    for _ in range(XraySupervisor.CRASH_LOOP_EXITS - 1):
+        assert supervisor._record_exit(1) is False
+    now[0] += XraySupervisor.CRASH_LOOP_WINDOW + 1
+    # The old exits age out: backoff starts over instead of giving up
+    assert supervisor._record_exit(1) is False
+    assert supervisor._next_delay() == XraySupervisor.BASE_DELAY
+
+
+def test_recover_without_config_reports_crash_loop() -> None:
+    async def scenario() -> List[Optional[int]]:
+        gave_up: List[Optional[int]] = []
+
+        async def on_crash_loop(pid: Optional[int]) -> None:
+            gave_up.append(pid)
+
+        supervisor = XraySupervisor(XrayManager(), on_crash_loop=on_crash_loop)
+        assert await supervisor._recover(4242, 1) is False
+        return gave_up
+
+    assert asyncio.run(scenario()) == [4242]
+
+
+def test_restart_waits_for_owner_lock(fake_xray: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        manager = await _running_manager(fake_xray, tmp_path)
+        lock = asyncio.Lock()
+        held_in_callback: List[bool] = []
+        restarted = asyncio.Event()
+
+        async def on_restarted(pid: int) -> None:
+            held_in_callback.append(lock.locked())
+            restarted.set()
+
+        supervisor = XraySupervisor(manager, on_restarted=on_restarted, lock=lambda: lock)
+        supervisor.start()
+        async with lock:
+            # e.g. a disconnect in progress: no restart behind its back
+            manager.process.kill()
+            await asyncio.sleep(0.3)
+            assert not manager.is_running()
+        await asyncio.wait_for(restarted.wait(), timeout=5)
+
+        assert manager.is_running()
+        assert held_in_callback == [True]
+
+        # An owner that stops the supervisor under the lock cancels the restart
+        await supervisor.stop()
+        supervisor.start()
+        async with lock:
+            manager.process.kill()
+            await asyncio.sleep(0.1)
+            await supervisor.stop()
+        assert not manager.is_running()
+        assert supervisor.restart_count == 1
+        await manager.stop()
+
+    asyncio.run(scenario())
@@ -5,73 +5,12 @@ This module provides the Plugin class that serves as the backend entry point
 for the Decky Loader plugin. All backend methods are defined here.
 """
 
+import asyncio
 import os
 import sys
-import ssl
-import socket
-import subprocess
 import time
 from pathlib import Path
-from typing import Dict, Any
-
-
-def _get_lan_ip() -> str:
-    """
-    Determine the host's LAN IP (not 127.0.0.1) so the import page URL is reachable
-    from other devices on the same network. Tries: (1) outgoing socket to 8.8.8.8,
-    (2) hostname -I, (3) ip route get 8.8.8.8. Falls back to 127.0.0.1 only if all fail.
-    """
-    # 1) Outgoing UDP socket: usually gives the interface IP used for default route
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            if ip and ip != "127.0.0.1":
-                return ip
-    except Exception:
-        pass
-    # 2) Linux: hostname -I returns space-separated IPs; first is typically primary
-    try:
-        out = subprocess.check_output(
-            ["hostname", "-I"],
-            stderr=subprocess.DEVNULL,
-            text=True,
-            timeout=2,
-        )
-        for part in out.strip().split():
-            part = part.strip()
-            if part and not part.startswith("127."):
-                return part
-    except (
-        subprocess.CalledProcessError,
-        subprocess.TimeoutExpired,
-        FileNotFoundError,
-    ):
-        pass
-    # 3) ip route get 8.8.8.8 → parse "src" address
-    try:
-        out = subprocess.check_output(
-            ["ip", "-4", "route", "get", "8.8.8.8"],
-            stderr=subprocess.DEVNULL,
-            text=True,
-            timeout=2,
-        )
-        for line in out.splitlines():
-            if "src" in line:
-                parts = line.split()
-                for i, p in enumerate(parts):
-                    if p == "src" and i + 1 < len(parts):
-                        ip = parts[i + 1].strip()
-                        if ip and ip != "127.0.0.1":
-                            return ip
-                        break
-    except (
-        subprocess.CalledProcessError,
-        subprocess.TimeoutExpired,
-        FileNotFoundError,
-    ):
-        pass
-    return "127.0.0.1"
+from typing import Dict, Any, Optional
 
 
 # Add plugin directory to Python path for backend module imports
@@ -79,7 +18,11 @@ PLUGIN_DIR = Path(__file__).resolve().parent
 if str(PLUGIN_DIR) not in sys.path:
     sys.path.insert(0, str(PLUGIN_DIR))
 
-from settings import SettingsManager
+try:
+    from settings import SettingsManager
+except ImportError:
+    # Outside Decky Loader (headless daemon): same API over a JSON file
+    from backend.src.file_settings import SettingsManager
 from backend.src.config_parser import (
     validate_vless_url,
     parse_vless_url,
@@ -92,25 +35,43 @@ from backend.src.error_codes import (
     create_success_response,
 )
 from backend.src.xray_manager import XrayManager
+from backend.src.xray_supervisor import XraySupervisor
+from backend.src.xray_capabilities import probe_capabilities
+from backend.src.resource_profiles import DEFAULT_PROFILE, RESOURCE_PROFILES
+from backend.src.process_scheduling import remove_cgroup, validate_scheduling
+from backend.src.phase_timer import PhaseTimer
+from backend.src.resume_detector import ResumeDetector
+from backend.src.coalescing_settings import CoalescingSettings
+from backend.src.lan_addresses import LanAddressResolver
+from backend.src.loop_monitor import LoopMonitor
 from backend.src.connection_manager import get_connection_state, ConnectionStatus
 from backend.src.tun_manager import TUNManager
 from backend.src.kill_switch import KillSwitch
 from backend.src.system_proxy import SystemProxyManager
-from backend.src.import_server import create_import_app
-from backend.src.cert_utils import ensure_cert_key
-from aiohttp import web
+from backend.src.import_server import ImportServer
+from backend.src.node_store import NodeStore
+from backend.src.status_broadcaster import StatusBroadcaster, ThroughputMeter
+from backend.src.metrics import REGISTRY, MetricsServer
+from backend.src.command_runner import DEFAULT_RUNNER
 
 # Initialize SettingsManager
 settings_dir = os.environ.get("DECKY_PLUGIN_SETTINGS_DIR", "")
 if not settings_dir:
     raise RuntimeError("DECKY_PLUGIN_SETTINGS_DIR environment variable not set")
 
-settings = SettingsManager(name="settings", settings_directory=settings_dir)
+# Commits are coalesced and written off the event loop (flushed on unload)
+settings = CoalescingSettings(
+    SettingsManager(name="settings", settings_directory=settings_dir)
+)
 settings.read()
 
 
-# Resolve xray-core path: deployed uses bin/, dev uses backend/out/
+# Resolve xray-core path: XRAY_DECKY_XRAY_BINARY (headless daemon) wins,
+# deployed uses bin/, dev uses backend/out/
 def _resolve_xray_path(plugin_dir: Path) -> str:
+    override = os.environ.get("XRAY_DECKY_XRAY_BINARY")
+    if override:
+        return override
     for candidate in (
         plugin_dir / "bin" / "xray-core",
         plugin_dir / "backend" / "out" / "xray-core",
@@ -122,11 +83,181 @@ def _resolve_xray_path(plugin_dir: Path) -> str:
     )  # fallback for clearer error
 
 
-# Initialize XrayManager, TUNManager, KillSwitch, and SystemProxyManager
-xray_manager = XrayManager(xray_binary_path=_resolve_xray_path(PLUGIN_DIR))
+async def _bounded(name: str, awaitable, timeout: float) -> bool:
+    """Await with a timeout; log and give up instead of hanging. True if done."""
+    try:
+        await asyncio.wait_for(awaitable, timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        print(f"Xray Decky Plugin: {name} timed out after {timeout:.1f}s")
+        return False
+
+
+# Initialize XrayManager, XraySupervisor, TUNManager, KillSwitch, and SystemProxyManager
+xray_manager = XrayManager(
+    xray_binary_path=_resolve_xray_path(PLUGIN_DIR),
+    runtime_dir=os.environ.get("DECKY_PLUGIN_RUNTIME_DIR") or None,
+)
+xray_supervisor = XraySupervisor(xray_manager)
 tun_manager = TUNManager()
 kill_switch = KillSwitch()
 system_proxy_manager = SystemProxyManager()
+lan_addresses = LanAddressResolver()
+loop_monitor = LoopMonitor()
+
+
+async def _notify_vless_saved():
+    """Notify frontend that VLESS config was saved (e.g. from import page)."""
+    try:
+        from decky import emit
+
+        await emit("vless_config_updated")
+    except Exception as e:
+        print(f"Xray Decky Plugin: Failed to emit vless_config_updated: {e}")
+
+
+# Nodes imported in batches (POST /import/batch); select_node activates one
+node_store = NodeStore(settings)
+
+# Performance metrics (GET /metrics on the loopback metrics server)
+PHASE_SECONDS = REGISTRY.histogram(
+    "xray_decky_phase_seconds",
+    "Duration of connect/disconnect phases",
+    ("operation", "phase"),
+)
+OPERATION_SECONDS = REGISTRY.histogram(
+    "xray_decky_operation_seconds",
+    "Total duration of successful connect/disconnect operations",
+    ("operation",),
+)
+KILL_SWITCH_SECONDS = REGISTRY.histogram(
+    "xray_decky_kill_switch_activation_seconds",
+    "Time to install the kill switch rules",
+)
+XRAY_RESTARTS = REGISTRY.counter(
+    "xray_decky_xray_restarts", "xray-core restarts by the supervisor"
+)
+XRAY_CRASH_LOOP = REGISTRY.gauge(
+    "xray_decky_xray_crash_loop", "1 while the supervisor gave up restarting xray-core"
+)
+CONNECTED = REGISTRY.gauge("xray_decky_connected", "1 while the connection is up")
+PROXY_BYTES = REGISTRY.counter(
+    "xray_decky_proxy_bytes",
+    "Proxy outbound traffic since xray-core started",
+    ("direction",),
+)
+SETTINGS_COMMITS = REGISTRY.counter(
+    "xray_decky_settings_commits", "Settings commits requested"
+)
+SETTINGS_WRITES = REGISTRY.counter(
+    "xray_decky_settings_writes", "Settings file writes", ("result",)
+)
+LOOP_LAG_SECONDS = REGISTRY.gauge(
+    "xray_decky_loop_lag_seconds",
+    "Event-loop lag measured by the loop monitor (when enabled)",
+    ("stat",),
+)
+LOOP_STALLS = REGISTRY.counter(
+    "xray_decky_loop_stalls", "Heartbeats later than the loop monitor threshold"
+)
+
+
+def _observe_timer(timer: PhaseTimer) -> None:
+    """Record a finished operation's phase timings."""
+    for phase, seconds in timer.phases.items():
+        PHASE_SECONDS.observe(seconds, operation=timer.name, phase=phase)
+    OPERATION_SECONDS.observe(timer.total(), operation=timer.name)
+
+
+async def _collect_metrics() -> None:
+    """Copy values owned by other components into the registry (per scrape)."""
+    supervisor_status = xray_supervisor.get_status()
+    XRAY_RESTARTS.set(supervisor_status["restartCount"])
+    XRAY_CRASH_LOOP.set(1 if supervisor_status["crashLoop"] else 0)
+
+    connection_state = get_connection_state()
+    CONNECTED.set(1 if connection_state.status == ConnectionStatus.CONNECTED else 0)
+    if connection_state.status == ConnectionStatus.CONNECTED:
+        traffic = await _read_traffic()
+        if traffic is not None:
+            PROXY_BYTES.set(traffic["uplink"], direction="uplink")
+            PROXY_BYTES.set(traffic["downlink"], direction="downlink")
+
+    settings_stats = settings.get_stats()
+    SETTINGS_COMMITS.set(settings_stats["commits"])
+    SETTINGS_WRITES.set(settings_stats["writes"], result="written")
+    SETTINGS_WRITES.set(settings_stats["skippedWrites"], result="skipped")
+
+    if loop_monitor.is_active():
+        report = loop_monitor.get_report(limit=0)
+        for stat in ("max", "avg", "p99"):
+            LOOP_LAG_SECONDS.set(report[f"{stat}LagMs"] / 1000, stat=stat)
+        LOOP_STALLS.set(report["stalls"])
+
+
+REGISTRY.add_collector(_collect_metrics)
+metrics_server = MetricsServer(REGISTRY)
+
+throughput_meter = ThroughputMeter()
+
+# `xray api statsquery` forks a client process: the status sampler and metrics
+# scrapes share one reading, taken at most every TRAFFIC_MAX_AGE seconds
+TRAFFIC_MAX_AGE = 3.0
+_traffic_reading: Dict[str, Any] = {"at": float("-inf"), "traffic": None}
+
+
+async def _read_traffic() -> Optional[Dict[str, int]]:
+    """Proxy traffic counters of xray-core, reusing a recent reading."""
+    now = time.monotonic()
+    if now - _traffic_reading["at"] >= TRAFFIC_MAX_AGE:
+        _traffic_reading["traffic"] = await xray_manager.query_traffic()
+        _traffic_reading["at"] = now
+    return _traffic_reading["traffic"]
+
+
+async def _sample_status() -> Dict[str, Any]:
+    """
+    One /status/events sample: connection state (without fields that change
+    every second) and proxy throughput from xray-core's traffic counters.
+    """
+    connection_state = get_connection_state()
+    traffic = None
+    if connection_state.status == ConnectionStatus.CONNECTED:
+        traffic = await _read_traffic()
+    else:
+        _traffic_reading["at"] = float("-inf")
+    if traffic is not None:
+        connection_state.bytes_sent = traffic["uplink"]
+        connection_state.bytes_received = traffic["downlink"]
+        throughput = throughput_meter.update(
+            traffic["uplink"], traffic["downlink"], now=_traffic_reading["at"]
+        )
+    else:
+        throughput_meter.reset()
+        throughput = {
+            "uplinkBps": 0,
+            "downlinkBps": 0,
+            "uplinkTotal": connection_state.bytes_sent,
+            "downlinkTotal": connection_state.bytes_received,
+        }
+    status = connection_state.to_dict()
+    for key in ("uptime", "bytesSent", "bytesReceived"):
+        status.pop(key, None)
+    return {"status": status, "throughput": throughput}
+
+
+# Shared by all /status/events viewers: one sampler regardless of viewer count
+status_broadcaster = StatusBroadcaster(_sample_status)
+
+# Started on demand by get_import_server_url, stops itself when idle
+import_server = ImportServer(
+    settings,
+    static_dir=PLUGIN_DIR / "backend" / "static",
+    runtime_dir=os.environ.get("DECKY_PLUGIN_RUNTIME_DIR", ""),
+    on_vless_saved=_notify_vless_saved,
+    nodes=node_store,
+    status=status_broadcaster,
+)
 
 
 class Plugin:
@@ -137,115 +268,145 @@ class Plugin:
     Methods are async and return dictionaries with success/error information.
     """
 
+    # Seconds between auto-connect attempts (network may not be up at boot)
+    AUTO_CONNECT_RETRY_DELAYS = (1, 2, 4, 8)
+    # Upper bound per disconnect step the UI toggle waits for
+    DISCONNECT_STEP_TIMEOUT = 3.0
+    # Upper bound for the background part of a disconnect
+    CLEANUP_TIMEOUT = 15.0
+
     async def _main(self):
         """
         Long-running code that executes for the plugin's lifetime.
         Called when the plugin is loaded.
         """
         print("Xray Decky Plugin: Backend initialized")
+        # Opt-in loop lag instrumentation; started first to cover startup
+        loop_monitor_pref = settings.getSetting("loopMonitor", {})
+        if loop_monitor_pref.get("enabled", False):
+            loop_monitor.threshold = loop_monitor_pref.get("thresholdMs", 100) / 1000
+            loop_monitor.start()
+
+        # Performance metrics for Prometheus, once enabled (set_metrics_endpoint);
+        # loopback unless metrics.listen is set
+        metrics_pref = settings.getSetting("metrics", {})
+        if metrics_pref.get("enabled", False):
+            await metrics_server.start(
+                metrics_pref.get("listen", MetricsServer.DEFAULT_LISTEN),
+                int(metrics_pref.get("port", MetricsServer.DEFAULT_PORT)),
+            )
+
         # Load connection state from settings
         from backend.src.connection_manager import load_connection_state_from_settings
 
         load_connection_state_from_settings(settings)
 
-        # Start import HTTPS server (TLS self-signed cert so Paste works from any device).
-        # ImportServerConfig: port from settings, default 8765, range 1024–65535.
-        # Bind to 0.0.0.0 so the import page is reachable from LAN (QR scan). If preferred port is in use, try next ports.
-        import_server_config = settings.getSetting("importServer", {"port": 8765})
-        port = int(import_server_config.get("port", 8765))
-        port = max(1024, min(65535, port))
-        static_dir = Path(__file__).resolve().parent / "backend" / "static"
-        runtime_dir = os.environ.get("DECKY_PLUGIN_RUNTIME_DIR", "")
-        ssl_context = None
-        if static_dir.is_dir() and runtime_dir:
-            try:
-                Path(runtime_dir).mkdir(parents=True, exist_ok=True)
-                cert_path, key_path = ensure_cert_key(Path(runtime_dir))
-                ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-                ssl_context.load_cert_chain(str(cert_path), str(key_path))
-                ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
-            except Exception as e:
-                print(
-                    f"Xray Decky Plugin: Import server TLS cert failed: {e}. Import server not started."
-                )
-                self._import_runner = None
-                ssl_context = None
-        if static_dir.is_dir() and ssl_context is not None:
+        # Restart xray-core automatically after unexpected exits; restarts and
+        # the crash-loop handling wait for connect/disconnect/reload to finish
+        xray_supervisor.on_restarted = self._on_xray_restarted
+        xray_supervisor.on_crash_loop = self._handle_xray_exit
+        xray_supervisor.lock = self._connection_lock
+
+        # Refresh the tunnel after suspend/resume
+        self._resume_detector = ResumeDetector(self._on_resume)
+        self._resume_detector.start()
+
+        # Go runtime / policy preset for xray-core
+        xray_manager.resource_profile = settings.getSetting(
+            "resourceProfile", {}
+        ).get("name", DEFAULT_PROFILE)
+        xray_manager.xudp = settings.getSetting("xudp", {}).get("enabled", False)
+
+        # nice / scheduler class / affinity / cgroup for xray-core
+        scheduling, error = validate_scheduling(
+            settings.getSetting("processScheduling", {})
+        )
+        if scheduling is not None:
+            xray_manager.scheduling = scheduling
+        else:
+            print(f"Xray Decky Plugin: Ignoring invalid processScheduling: {error}")
 
-            async def _notify_vless_saved():
-                """Notify frontend that VLESS config was saved (e.g. from import page)."""
-                try:
-                    from decky import emit
+        # Re-attach to xray-core left running by the previous plugin instance
+        await self._adopt_xray()
 
-                    await emit("vless_config_updated")
-                except Exception as e:
-                    print(
-                        f"Xray Decky Plugin: Failed to emit vless_config_updated: {e}"
-                    )
+        # Only stats the binary unless it changed since the last probe
+        await self._refresh_xray_capabilities()
 
-            self._import_runner = None
-            runner = None
-            for attempt in range(11):  # try port, port+1, ... port+10
-                try_port = port + attempt
-                if try_port > 65535:
-                    break
-                try:
-                    import_app = create_import_app(
-                        settings, static_dir, on_vless_saved=_notify_vless_saved
-                    )
-                    runner = web.AppRunner(import_app)
-                    await runner.setup()
-                    site = web.TCPSite(
-                        runner, "0.0.0.0", try_port, ssl_context=ssl_context
-                    )
-                    await site.start()
-                    self._import_runner = runner
-                    if try_port != port:
-                        import_server_config["port"] = try_port
-                        settings.setSetting("importServer", import_server_config)
-                        settings.commit()
-                        print(
-                            f"Xray Decky Plugin: Port {port} in use, using {try_port}. Import server listening on 0.0.0.0:{try_port} (HTTPS)"
-                        )
-                    else:
-                        print(
-                            f"Xray Decky Plugin: Import server listening on 0.0.0.0:{try_port} (HTTPS)"
-                        )
-                    break
-                except OSError as e:
-                    if runner is not None:
-                        await runner.cleanup()
-                        runner = None
-                    if attempt == 0:
-                        print(
-                            f"Xray Decky Plugin: Port {try_port} failed: {e}, trying next ports..."
-                        )
-                    if attempt == 10:
-                        self._import_runner = None
-                        print(
-                            f"Xray Decky Plugin: Import server could not start on ports {port}-{port + 10}. Check firewall or free a port."
-                        )
-        elif not runtime_dir:
-            self._import_runner = None
-            print(
-                "Xray Decky Plugin: DECKY_PLUGIN_RUNTIME_DIR not set, import server not started"
-            )
-        elif not static_dir.is_dir():
-            self._import_runner = None
-            print(
-                "Xray Decky Plugin: backend/static not found, import server not started"
-            )
+        # Opt-in: bring the tunnel up as early as possible
+        self._auto_connect_task = None
+        if settings.getSetting("autoConnect", {}).get("enabled", False):
+            connection_state = get_connection_state()
+            if not xray_manager.is_running():
+                if connection_state.status in (
+                    ConnectionStatus.CONNECTED,
+                    ConnectionStatus.CONNECTING,
+                ):
+                    # Persisted from before a reboot; there was nothing to adopt
+                    connection_state.set_disconnected()
+                self._auto_connect_task = asyncio.ensure_future(self._auto_connect())
+
+        # Generate/load the import server cert in the background so the first
+        # QR display does not wait for OpenSSL (the server itself starts lazily)
+        asyncio.ensure_future(import_server.prepare_certificate())
 
     async def _unload(self):
         """
         Cleanup code called when the plugin is unloaded.
         """
         print("Xray Decky Plugin: Backend unloading")
-        # Stop import HTTP server
-        if getattr(self, "_import_runner", None) is not None:
-            await self._import_runner.cleanup()
-            self._import_runner = None
+        auto_connect_task = getattr(self, "_auto_connect_task", None)
+        if auto_connect_task is not None and not auto_connect_task.done():
+            auto_connect_task.cancel()
+        if getattr(self, "_resume_detector", None) is not None:
+            await self._resume_detector.stop()
+        await self._await_cleanup()
+
+        # Stop import HTTP server and metrics endpoint
+        await import_server.stop()
+        await metrics_server.stop()
+
+        await xray_supervisor.stop()
+        connection_state = get_connection_state()
+        keep_alive = settings.getSetting("keepAlive", {}).get("enabled", True)
+        if (
+            keep_alive
+            and connection_state.status == ConnectionStatus.CONNECTED
+            and xray_manager.is_running()
+        ):
+            # Leave xray-core, routes and system proxy in place; the next
+            # plugin instance adopts the process from its pidfile.
+            print(
+                f"Xray Decky Plugin: Leaving xray-core running "
+                f"(pid {xray_manager.get_process_id()}) for the next instance"
+            )
+        else:
+            await self._teardown_connection()
+
+        # Deactivate kill switch if active
+        if kill_switch.get_status().get("isActive", False):
+            await kill_switch.deactivate()
+
+        lan_addresses.close()
+        await loop_monitor.stop()
 
+        # Write coalesced settings changes before the process goes away
+        await settings.flush()
+
+    async def _uninstall(self):
+        """
+        Cleanup code called when the plugin is uninstalled: stop an xray-core
+        that _unload left running and remove its cgroup.
+        """
+        print("Xray Decky Plugin: Backend uninstalling")
+        await xray_supervisor.stop()
+        await self._teardown_connection()
+        cgroup_error = remove_cgroup()
+        if cgroup_error:
+            print(f"Xray Decky Plugin: Failed to remove xray-core cgroup: {cgroup_error}")
+        await settings.flush()
+
+    async def _teardown_connection(self) -> None:
+        """Clear system proxy, TUN route and stop xray-core (unload/uninstall)."""
         # Clear system proxy if active
         system_proxy_pref = settings.getSetting("systemProxy", {})
         if system_proxy_pref.get("enabled", False):
@@ -261,12 +422,36 @@ class Plugin:
             if tun_pref.get("enabled", False):
                 await tun_manager.remove_system_route()
                 await tun_manager.cleanup_tun_interface()
-            await xray_manager.stop()
             connection_state.set_disconnected()
+        await xray_manager.stop()
 
-        # Deactivate kill switch if active
-        if kill_switch.get_status().get("isActive", False):
-            await kill_switch.deactivate()
+    async def _adopt_xray(self) -> None:
+        """
+        Restore a connection whose xray-core survived a plugin reload, without
+        restarting it (see XrayManager.adopt for the health checks).
+        """
+        result = await xray_manager.adopt()
+        if not result.get("success"):
+            if result.get("error") != "No pidfile":
+                print(f"Xray Decky Plugin: Not adopting xray-core: {result.get('error')}")
+            return
+
+        process_id = result["processId"]
+        get_connection_state().set_connected(
+            process_id,
+            result["configFile"],
+            settings.getSetting("vlessConfig", None),
+            connected_at=result.get("startedAt"),
+        )
+        if result.get("tunMode"):
+            await tun_manager.detect_system_route()
+        if settings.getSetting("systemProxy", {}).get("enabled", False):
+            system_proxy_manager.restore_state(
+                socks_port=XrayManager.SOCKS_PORT, http_port=XrayManager.HTTP_PORT
+            )
+        xray_manager.apply_scheduling()
+        xray_supervisor.start()
+        print(f"Xray Decky Plugin: Adopted running xray-core (pid {process_id})")
 
     # SettingsManager wrapper methods
     async def settings_read(self) -> Dict[str, Any]:
@@ -379,20 +564,35 @@ class Plugin:
 
     async def get_import_server_url(self) -> Dict[str, Any]:
         """
-        Get URL for the import page (for QR code). Resolves LAN IP (not 127.0.0.1)
-        and port from importServer.port so devices on the same network can open the page.
-        Returns https baseUrl so the page is in a secure context and Paste works.
+        Get URL for the import page (for QR code). Starts the import server if it
+        is not running (it stops again after importServer.idleTimeout seconds
+        without requests) and resolves LAN IP (not 127.0.0.1) so devices on the
+        same network can open the page. Returns https baseUrl so the page is in
+        a secure context and Paste works.
+        Addresses come from a netlink-invalidated cache (no subprocesses).
 
         Returns:
-            { 'baseUrl': 'https://{lan_ip}:{port}', 'path': '/import' }
+            {
+                'baseUrl': 'https://{lan_ip}:{port}',
+                'path': '/import',
+                'statusPath': '/status',  # Live read-only status dashboard
+                'alternatives': [str]  # Base URLs on other LAN addresses
+            }
         """
         try:
-            import_server_config = settings.getSetting("importServer", {"port": 8765})
-            port = int(import_server_config.get("port", 8765))
-            port = max(1024, min(65535, port))
-            local_ip = _get_lan_ip()
-            base_url = f"https://{local_ip}:{port}"
-            return {"baseUrl": base_url, "path": "/import"}
+            port = await import_server.ensure_started()
+            if port is None:
+                return create_error_response(
+                    ErrorCode.NETWORK_ERROR, "Import server could not be started"
+                )
+            addresses = [a["address"] for a in await lan_addresses.get_addresses()]
+            urls = [f"https://{ip}:{port}" for ip in addresses or ["127.0.0.1"]]
+            return {
+                "baseUrl": urls[0],
+                "path": "/import",
+                "statusPath": "/status",
+                "alternatives": urls[1:],
+            }
         except Exception as e:
             return create_error_response(
                 ErrorCode.UNKNOWN_ERROR, f"Failed to get import URL: {str(e)}"
@@ -429,25 +629,28 @@ class Plugin:
                 }
 
             is_valid, error_msg = validate_vless_url(source_url)
+            previous = (config.get("isValid"), config.get("validationError"))
             config["isValid"] = is_valid
             config["lastValidatedAt"] = int(time.time())
 
             if not is_valid:
                 config["validationError"] = error_msg or "Validation failed"
+            elif "validationError" in config:
+                # Clear validation error if valid
+                del config["validationError"]
+
+            # Only persist a changed result; lastValidatedAt alone rides
+            # along with the next write
+            if (config["isValid"], config.get("validationError")) != previous:
                 settings.setSetting("vlessConfig", config)
                 settings.commit()
+
+            if not is_valid:
                 return {
                     "isValid": False,
                     "error": error_msg or "Validation failed",
                 }
 
-            # Clear validation error if valid
-            if "validationError" in config:
-                del config["validationError"]
-
-            settings.setSetting("vlessConfig", config)
-            settings.commit()
-
             return {
                 "isValid": True,
             }
@@ -503,6 +706,70 @@ class Plugin:
                 f"Failed to reset configuration: {str(e)}",
             )
 
+    async def list_nodes(self) -> Dict[str, Any]:
+        """
+        List nodes stored by batch imports.
+
+        Returns:
+            {
+                'nodes': [VLESSConfig & {'id': str}],
+                'activeId': str | None  # Node matching the current vlessConfig
+            }
+        """
+        try:
+            config = settings.getSetting("vlessConfig", None)
+            active_id = node_store.find(config) if config else None
+            return {"nodes": node_store.list(), "activeId": active_id}
+        except Exception as e:
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR, f"Failed to list nodes: {str(e)}"
+            )
+
+    async def select_node(self, node_id: str) -> Dict[str, Any]:
+        """
+        Make a stored node the active VLESS configuration. An active
+        connection switches to it through reload_connection.
+
+        Args:
+            node_id: Node id from list_nodes
+
+        Returns:
+            {
+                'success': bool,
+                'config': VLESSConfig,
+                'reloaded': bool,
+                'error': str | None
+            }
+        """
+        config = node_store.config_for(node_id)
+        if config is None:
+            return create_error_response(ErrorCode.NO_CONFIG, f"Unknown node: {node_id}")
+        settings.setSetting("vlessConfig", config)
+        settings.commit()
+        await _notify_vless_saved()
+
+        reloaded = False
+        if get_connection_state().status == ConnectionStatus.CONNECTED:
+            result = await self.reload_connection()
+            if not result.get("success", False):
+                return result
+            reloaded = True
+        return create_success_response({"config": config, "reloaded": reloaded})
+
+    async def remove_node(self, node_id: str) -> Dict[str, Any]:
+        """
+        Remove a stored node (the active vlessConfig is not changed).
+
+        Args:
+            node_id: Node id from list_nodes
+
+        Returns:
+            { 'success': bool, 'error': str | None }
+        """
+        if not node_store.remove(node_id):
+            return create_error_response(ErrorCode.NO_CONFIG, f"Unknown node: {node_id}")
+        return create_success_response()
+
     # TUN Mode Management
     async def check_tun_privileges(self) -> Dict[str, Any]:
         """
@@ -636,6 +903,33 @@ class Plugin:
                 ErrorCode.UNKNOWN_ERROR, f"Failed to toggle TUN mode: {str(e)}"
             )
 
+    async def _refresh_xray_capabilities(self) -> Dict[str, Any]:
+        """Probe xray-core capabilities (version cached by binary path, size and mtime)."""
+        capabilities = await probe_capabilities(xray_manager.xray_binary_path, settings)
+        xray_manager.capabilities = (
+            capabilities if capabilities.get("available") else None
+        )
+        return capabilities
+
+    async def get_xray_capabilities(self) -> Dict[str, Any]:
+        """
+        Get the installed xray-core version and supported features.
+
+        Returns:
+            {
+                'available': bool,
+                'version': str | None,
+                'features': { 'tun': bool, 'xudp': bool, 'observatory': bool },
+                'geodata': { 'geoip.dat': bool, 'geosite.dat': bool }
+            }
+        """
+        try:
+            return await self._refresh_xray_capabilities()
+        except Exception as e:
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR, f"Failed to probe xray-core: {str(e)}"
+            )
+
     # Connection Management
     async def toggle_connection(self, enable: bool) -> Dict[str, Any]:
         """
@@ -649,217 +943,727 @@ class Plugin:
                 'success': bool,
                 'status': str,  # 'connected', 'disconnected', 'error'
                 'error': str | None,
-                'processId': int | None
+                'processId': int | None,
+                'timings': dict | None  # totalMs and per-phase ms
             }
         """
         connection_state = get_connection_state()
 
         try:
-            if enable:
-                # Connect
-                # Check if already connected
-                if connection_state.status == ConnectionStatus.CONNECTED:
-                    return create_success_response(
-                        {
-                            "status": "connected",
-                            "processId": connection_state.xray_process_id,
-                        }
-                    )
+            # A connect in progress (toggle, auto-connect, resume) finishes
+            # first; _connect then sees CONNECTED and does not start again
+            async with self._connection_lock():
+                if enable:
+                    return await self._connect()
+                return await self._disconnect()
 
-                # Load and validate config
-                config = settings.getSetting("vlessConfig", None)
-                if not config:
-                    connection_state.set_error(
-                        "No VLESS config stored", ErrorCode.NO_CONFIG
-                    )
-                    return create_error_response(ErrorCode.NO_CONFIG)
+        except Exception as e:
+            connection_state.set_error(
+                f"Connection error: {str(e)}", ErrorCode.UNKNOWN_ERROR
+            )
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR, f"Connection error: {str(e)}"
+            )
+
+    def _connection_lock(self) -> asyncio.Lock:
+        """
+        Serializes connect, disconnect, reload and resume handling, so only
+        one of them drives xray-core at a time. Created on first use, on the
+        plugin's event loop.
+        """
+        lock = getattr(self, "_lock", None)
+        if lock is None:
+            lock = self._lock = asyncio.Lock()
+        return lock
+
+    async def _connect(self, reason: str = "connect") -> Dict[str, Any]:
+        """
+        Connect path of toggle_connection, timed per phase. Caller holds
+        _connection_lock().
+
+        Steps run as a dependency graph: privilege check, capability probe and
+        physical interface lookup (TUN mode) concurrently; then render,
+        validate and start xray-core; then routes, system proxy and kill
+        switch release concurrently, with a single settings commit. The
+        rendered config and its validation result come from the persisted
+        cache when unchanged.
+
+        Args:
+            reason: Label for the timing log line ("connect", "auto-connect")
+        """
+        connection_state = get_connection_state()
+        timer = PhaseTimer(reason)
 
-                if not config.get("isValid", False):
+        # Check if already connected
+        if connection_state.status == ConnectionStatus.CONNECTED:
+            return create_success_response(
+                {
+                    "status": "connected",
+                    "processId": connection_state.xray_process_id,
+                }
+            )
+
+        # A previous disconnect may still be clearing the system proxy
+        with timer.phase("cleanup"):
+            await self._await_cleanup()
+
+        # Load and validate config
+        with timer.phase("settings"):
+            config = settings.getSetting("vlessConfig", None)
+            tun_pref = settings.getSetting("tunMode", {})
+            tun_mode = tun_pref.get("enabled", False)
+        if not config:
+            connection_state.set_error("No VLESS config stored", ErrorCode.NO_CONFIG)
+            return create_error_response(ErrorCode.NO_CONFIG)
+
+        if not config.get("isValid", False):
+            connection_state.set_error(
+                "VLESS config is invalid", ErrorCode.INVALID_CONFIG
+            )
+            return create_error_response(ErrorCode.INVALID_CONFIG)
+
+        # Set connecting status
+        connection_state.set_connecting()
+
+        # Independent checks run concurrently: privileges, capability probe
+        # (cached per binary) and, for TUN, the physical interface used for
+        # sockopt.interface (avoids a routing loop)
+        async def _check_privileges() -> bool:
+            with timer.phase("privileges"):
+                if tun_pref.get("hasPrivileges", False):
+                    return True
+                # Re-check privileges
+                privilege_result = await tun_manager.check_privileges()
+                return privilege_result.get("hasPrivileges", False)
+
+        async def _refresh_capabilities() -> None:
+            with timer.phase("capabilities"):
+                await self._refresh_xray_capabilities()
+
+        async def _lookup_interface() -> Optional[str]:
+            with timer.phase("interface"):
+                return await tun_manager.get_physical_interface()
+
+        if tun_mode:
+            has_privileges, _, outbound_if = await asyncio.gather(
+                _check_privileges(), _refresh_capabilities(), _lookup_interface()
+            )
+        else:
+            await _refresh_capabilities()
+            has_privileges, outbound_if = True, None
+
+        if not has_privileges:
+            connection_state.set_error(
+                "TUN mode requires elevated privileges",
+                ErrorCode.PRIVILEGES_INSUFFICIENT,
+            )
+            return create_error_response(
+                ErrorCode.PRIVILEGES_INSUFFICIENT,
+                "TUN mode requires elevated privileges. Please complete installation steps.",
+            )
+
+        # Fail early on config blocks this xray-core cannot load
+        if tun_mode and not xray_manager.supports("tun"):
+            connection_state.set_error(
+                "TUN mode is not supported by this xray-core",
+                ErrorCode.UNSUPPORTED_FEATURE,
+            )
+            return create_error_response(
+                ErrorCode.UNSUPPORTED_FEATURE,
+                "TUN mode requires xray-core 26.1.23 or newer.",
+            )
+
+        if tun_mode and not outbound_if:
+            connection_state.set_error(
+                "TUN: could not determine physical interface",
+                ErrorCode.UNKNOWN_ERROR,
+            )
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR,
+                "TUN mode: could not get default route interface. Check network.",
+            )
+        if tun_mode:
+            await tun_manager.create_tun_interface()
+
+        with timer.phase("render"):
+            config_file = await xray_manager.generate_config(config, tun_mode, outbound_if)
+
+        # Reject configs xray-core cannot load before touching routes
+        with timer.phase("validate"):
+            validation = await xray_manager.validate_config(config_file)
+        if not validation.get("success", False):
+            error_msg = validation.get("error", "xray-core rejected the config")
+            connection_state.set_error(error_msg, ErrorCode.INVALID_CONFIG)
+            return create_error_response(ErrorCode.INVALID_CONFIG, error_msg)
+
+        # Start xray-core
+        with timer.phase("start"):
+            result = await xray_manager.start(config_file)
+
+        if not result.get("success", False):
+            error_msg = result.get("error", "Failed to start xray-core")
+            error_code = result.get("errorCode", ErrorCode.PROCESS_FAILED)
+            connection_state.set_error(error_msg, error_code)
+            return create_error_response(error_code, error_msg)
+
+        # Routes, system proxy and kill switch only depend on xray-core
+        # running, not on each other.
+        # NOTE: xray-core does not natively support TUN inbound, so
+        # the TUN interface won't be created by xray. Route setup may
+        # fail, but the SOCKS/HTTP proxy is still functional.
+        async def _setup_route() -> None:
+            with timer.phase("route"):
+                route_result = await tun_manager.setup_system_route()
+            if not route_result.get("success"):
+                # TUN route failed — log but don't kill the connection.
+                # SOCKS proxy on 10808 and HTTP proxy on 10809 are still
+                # available and the connection is usable.
+                print(
+                    f"Xray Decky Plugin: TUN route failed (SOCKS proxy still works): "
+                    f"{route_result.get('error', 'Unknown')}"
+                )
+
+        async def _setup_system_proxy() -> None:
+            # Auto-enable System Proxy (gsettings for GTK/Qt apps)
+            with timer.phase("systemProxy"):
+                proxy_result = await system_proxy_manager.set_system_proxy(
+                    socks_port=10808, http_port=10809
+                )
+            if proxy_result.get("success"):
+                system_proxy_pref = settings.getSetting("systemProxy", {})
+                system_proxy_pref["enabled"] = True
+                system_proxy_pref["autoEnabled"] = True  # Mark as auto-enabled
+                system_proxy_pref["lastEnabledAt"] = int(time.time())
+                settings.setSetting("systemProxy", system_proxy_pref)
+            # Note: Don't fail connection if system proxy fails
+
+        async def _release_kill_switch() -> None:
+            # Deactivate kill switch if active (connection restored)
+            kill_switch_pref = settings.getSetting("killSwitch", {})
+            if kill_switch_pref.get("isActive", False):
+                with timer.phase("killSwitch"):
+                    await kill_switch.deactivate()
+                kill_switch_pref["isActive"] = False
+                kill_switch_pref["deactivatedAt"] = int(time.time())
+                settings.setSetting("killSwitch", kill_switch_pref)
+
+        steps = [_release_kill_switch()]
+        if tun_mode:
+            steps += [_setup_route(), _setup_system_proxy()]
+        # A step that raises must not abandon its siblings halfway or leave
+        # the started xray-core untracked; like a failed result, it is logged
+        for outcome in await asyncio.gather(*steps, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                print(f"Xray Decky Plugin: Connect step failed: {outcome}")
+
+        # Update connection state
+        process_id = result.get("processId")
+        connection_state.set_connected(process_id, config_file, config)
+        xray_supervisor.start()
+
+        # Persist connection state (one commit for all of the above)
+        with timer.phase("persist"):
+            settings.setSetting(
+                "connectionState",
+                {"status": "connected", "connectedAt": int(time.time())},
+            )
+            settings.commit()
+
+        timer.log()
+        _observe_timer(timer)
+        return create_success_response(
+            {
+                "status": "connected",
+                "processId": process_id,
+                "timings": timer.as_dict(),
+            }
+        )
+
+    async def _disconnect(self) -> Dict[str, Any]:
+        """
+        Disconnect path of toggle_connection. Caller holds _connection_lock().
+
+        Returns once traffic is cut: xray-core is stopped (adaptive SIGTERM
+        grace, then SIGKILL) while the TUN route is removed. Clearing the
+        system proxy and TUN state continues in the background; the next
+        connect waits for it. Every step is bounded by a timeout.
+        """
+        connection_state = get_connection_state()
+        if connection_state.status == ConnectionStatus.DISCONNECTED:
+            return create_success_response({"status": "disconnected"})
+
+        timer = PhaseTimer("disconnect")
+        tun_enabled = settings.getSetting("tunMode", {}).get("enabled", False)
+
+        async def _stop_xray() -> None:
+            with timer.phase("stop"):
+                await xray_supervisor.stop()
+                result = await xray_manager.stop()
+            if not result.get("success", False):
+                # Log error but still mark as disconnected
+                print(
+                    f"Warning: Failed to stop xray-core cleanly: {result.get('error')}"
+                )
+
+        async def _remove_route() -> None:
+            with timer.phase("route"):
+                await tun_manager.remove_system_route()
+
+        steps = [
+            _bounded(
+                "stop xray-core",
+                _stop_xray(),
+                xray_manager.stop_grace() + self.DISCONNECT_STEP_TIMEOUT,
+            )
+        ]
+        if tun_enabled:
+            steps.append(
+                _bounded("remove TUN route", _remove_route(), self.DISCONNECT_STEP_TIMEOUT)
+            )
+        await asyncio.gather(*steps)
+
+        # Update connection state
+        connection_state.set_disconnected()
+
+        # Check if kill switch should be activated (unexpected disconnect)
+        kill_switch_pref = settings.getSetting("killSwitch", {})
+        if kill_switch_pref.get("enabled", False) and connection_state.xray_process_id:
+            # This was an unexpected disconnect, activate kill switch
+            with KILL_SWITCH_SECONDS.time():
+                kill_result = await kill_switch.activate(connection_state.xray_process_id)
+            if kill_result.get("success"):
+                kill_switch_pref["isActive"] = True
+                kill_switch_pref["activatedAt"] = int(time.time())
+                connection_state.set_blocked()
+            settings.setSetting("killSwitch", kill_switch_pref)
+
+        # Persist connection state
+        status = "blocked" if kill_switch_pref.get("isActive", False) else "disconnected"
+        settings.setSetting(
+            "connectionState",
+            {"status": status, "disconnectedAt": int(time.time())},
+        )
+        settings.commit()
+
+        self._cleanup_task = asyncio.ensure_future(
+            _bounded(
+                "disconnect cleanup",
+                self._cleanup_after_disconnect(tun_enabled),
+                self.CLEANUP_TIMEOUT,
+            )
+        )
+        timer.log()
+        _observe_timer(timer)
+        return create_success_response({"status": status, "timings": timer.as_dict()})
+
+    async def _cleanup_after_disconnect(self, tun_enabled: bool) -> None:
+        """Background part of _disconnect: system proxy and TUN state."""
+
+        async def _clear_system_proxy() -> None:
+            # Always clear system proxy on disconnect so SOCKS is never left on
+            await system_proxy_manager.clear_system_proxy()
+            system_proxy_pref = settings.getSetting("systemProxy", {})
+            if system_proxy_pref.get("enabled", False):
+                system_proxy_pref["enabled"] = False
+                settings.setSetting("systemProxy", system_proxy_pref)
+                settings.commit()
+
+        steps = [_clear_system_proxy()]
+        if tun_enabled:
+            steps.append(tun_manager.cleanup_tun_interface())
+        try:
+            await asyncio.gather(*steps)
+        except Exception as e:
+            print(f"Xray Decky Plugin: Disconnect cleanup failed: {e}")
+
+    async def _await_cleanup(self) -> None:
+        """Wait for a pending background disconnect cleanup."""
+        cleanup_task = getattr(self, "_cleanup_task", None)
+        if cleanup_task is not None and not cleanup_task.done():
+            await cleanup_task
+
+    async def _auto_connect(self) -> None:
+        """
+        Connect on plugin load if the autoConnect setting is enabled.
+
+        Retries with backoff while the connection fails for transient reasons
+        (e.g. no default route yet right after boot), and stops as soon as
+        the user connects or disconnects manually.
+        """
+        for attempt, delay in enumerate((0,) + self.AUTO_CONNECT_RETRY_DELAYS):
+            if delay:
+                await asyncio.sleep(delay)
+            connection_state = get_connection_state()
+            async with self._connection_lock():
+                # Checked under the lock: a toggle may have run while we waited
+                if attempt and connection_state.status != ConnectionStatus.ERROR:
+                    return  # User took over
+                if connection_state.status == ConnectionStatus.CONNECTED:
+                    return
+                try:
+                    result = await self._connect(reason="auto-connect")
+                except Exception as e:
                     connection_state.set_error(
-                        "VLESS config is invalid", ErrorCode.INVALID_CONFIG
+                        f"Connection error: {str(e)}", ErrorCode.UNKNOWN_ERROR
                     )
-                    return create_error_response(ErrorCode.INVALID_CONFIG)
+                    result = create_error_response(ErrorCode.UNKNOWN_ERROR, str(e))
+            if result.get("success", False):
+                return
+            if result.get("errorCode") in (
+                ErrorCode.NO_CONFIG,
+                ErrorCode.INVALID_CONFIG,
+                ErrorCode.PRIVILEGES_INSUFFICIENT,
+                ErrorCode.UNSUPPORTED_FEATURE,
+            ):
+                break
+        print(f"Xray Decky Plugin: Auto-connect failed: {result.get('error')}")
 
-                # Set connecting status
-                connection_state.set_connecting()
+    async def reload_connection(self, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Apply the stored VLESS configuration to the active connection
+        (e.g. after switching nodes) without a full disconnect.
 
-                # Get TUN mode preference
-                tun_pref = settings.getSetting("tunMode", {})
-                tun_mode = tun_pref.get("enabled", False)
+        If only the outbound changed, the proxy outbound is replaced in place
+        through xray-core's HandlerService API. Otherwise (or if the API is
+        unavailable) a new xray-core instance takes over the SOCKS/HTTP ports
+        before the old one is drained, so the ports are never unbound. TUN mode
+        (one TUN interface per instance) and failed handovers fall back to
+        stop + start.
 
-                # If TUN mode is enabled, check privileges
-                if tun_mode:
-                    has_privileges = tun_pref.get("hasPrivileges", False)
-                    if not has_privileges:
-                        # Re-check privileges
-                        privilege_result = await tun_manager.check_privileges()
-                        has_privileges = privilege_result.get("hasPrivileges", False)
-
-                        if not has_privileges:
-                            connection_state.set_error(
-                                "TUN mode requires elevated privileges",
-                                ErrorCode.PRIVILEGES_INSUFFICIENT,
-                            )
-                            return create_error_response(
-                                ErrorCode.PRIVILEGES_INSUFFICIENT,
-                                "TUN mode requires elevated privileges. Please complete installation steps.",
-                            )
-
-                    await tun_manager.create_tun_interface()
-
-                # TUN: get physical interface for sockopt.interface (avoids routing loop)
-                outbound_if = (
-                    await tun_manager.get_physical_interface() if tun_mode else None
+        Args:
+            fresh: Always move to a new xray-core instance (skip the API
+                path), dropping upstream sessions that died, e.g. in suspend
+
+        Returns:
+            {
+                'success': bool,
+                'processId': int | None,
+                'method': str,  # 'api', 'handover' or 'restart'
+                'error': str | None
+            }
+        """
+        async with self._connection_lock():
+            return await self._reload_connection(fresh)
+
+    async def _reload_connection(self, fresh: bool) -> Dict[str, Any]:
+        """reload_connection body; caller holds _connection_lock()."""
+        connection_state = get_connection_state()
+        if connection_state.status != ConnectionStatus.CONNECTED:
+            return create_error_response(ErrorCode.NOT_CONNECTED)
+
+        try:
+            config = settings.getSetting("vlessConfig", None)
+            if not config:
+                return create_error_response(ErrorCode.NO_CONFIG)
+            if not config.get("isValid", False):
+                return create_error_response(ErrorCode.INVALID_CONFIG)
+
+            tun_pref = settings.getSetting("tunMode", {})
+            tun_mode = tun_pref.get("enabled", False)
+            outbound_if = (
+                await tun_manager.get_physical_interface() if tun_mode else None
+            )
+            if tun_mode and not outbound_if:
+                return create_error_response(
+                    ErrorCode.UNKNOWN_ERROR,
+                    "TUN mode: could not get default route interface. Check network.",
                 )
-                if tun_mode and not outbound_if:
-                    connection_state.set_error(
-                        "TUN: could not determine physical interface",
-                        ErrorCode.UNKNOWN_ERROR,
+            await self._refresh_xray_capabilities()
+
+            # Outbound-only change: swap the proxy outbound through the API
+            if (
+                not fresh
+                and tun_mode == xray_manager.tun_mode
+                and outbound_if == xray_manager.outbound_interface
+                and xray_manager.running_profile == xray_manager.resource_profile
+            ):
+                result = await xray_manager.update_outbound(config)
+                if result.get("success", False):
+                    connection_state.update_process(
+                        result.get("processId"), xray_manager.config_file, config
                     )
-                    return create_error_response(
-                        ErrorCode.UNKNOWN_ERROR,
-                        "TUN mode: could not get default route interface. Check network.",
+                    return create_success_response(
+                        {
+                            "processId": result.get("processId"),
+                            # 'handover' if the API add failed midway
+                            "method": result.get("method", "api"),
+                        }
                     )
+                print(
+                    f"Xray Decky Plugin: Outbound API update failed, restarting: {result.get('error')}"
+                )
 
-                config_file = xray_manager.generate_config(
-                    config, tun_mode, outbound_if
+            # A handover target listens on the other API port than the running
+            # instance; a restart works with either
+            config_file = await xray_manager.generate_config(
+                config,
+                tun_mode,
+                outbound_if,
+                None if tun_mode else xray_manager.standby_api_port(),
+            )
+            validation = await xray_manager.validate_config(config_file)
+            if not validation.get("success", False):
+                return create_error_response(
+                    ErrorCode.INVALID_CONFIG,
+                    validation.get("error", "xray-core rejected the config"),
                 )
 
-                # Start xray-core
-                result = await xray_manager.start(config_file)
+            handover = False
+            result = {"success": False}
+            if not tun_mode:
+                result = await xray_manager.handover(config_file)
+                handover = result.get("success", False)
+                if not handover:
+                    print(
+                        f"Xray Decky Plugin: Handover failed, restarting: {result.get('error')}"
+                    )
 
+            if not handover:
+                await xray_supervisor.stop()
+                if tun_mode:
+                    await tun_manager.remove_system_route()
+                await xray_manager.stop()
+                result = await xray_manager.start(config_file)
                 if not result.get("success", False):
-                    error_msg = result.get("error", "Failed to start xray-core")
+                    await self._handle_xray_exit(connection_state.xray_process_id)
                     error_code = result.get("errorCode", ErrorCode.PROCESS_FAILED)
-                    connection_state.set_error(error_msg, error_code)
-                    return create_error_response(error_code, error_msg)
-
-                # TUN: setup system routing + system proxy.
-                # NOTE: xray-core does not natively support TUN inbound, so
-                # the TUN interface won't be created by xray. Route setup may
-                # fail, but the SOCKS/HTTP proxy is still functional.
+                    return create_error_response(
+                        error_code, result.get("error", "Failed to start xray-core")
+                    )
                 if tun_mode:
                     route_result = await tun_manager.setup_system_route()
                     if not route_result.get("success"):
-                        # TUN route failed — log but don't kill the connection.
-                        # SOCKS proxy on 10808 and HTTP proxy on 10809 are still
-                        # available and the connection is usable.
                         print(
                             f"Xray Decky Plugin: TUN route failed (SOCKS proxy still works): "
                             f"{route_result.get('error', 'Unknown')}"
                         )
+                xray_supervisor.start()
 
-                    # Auto-enable System Proxy (gsettings for GTK/Qt apps)
-                    proxy_result = await system_proxy_manager.set_system_proxy(
-                        socks_port=10808, http_port=10809
-                    )
-                    if proxy_result.get("success"):
-                        system_proxy_pref = settings.getSetting("systemProxy", {})
-                        system_proxy_pref["enabled"] = True
-                        system_proxy_pref["autoEnabled"] = True  # Mark as auto-enabled
-                        system_proxy_pref["lastEnabledAt"] = int(time.time())
-                        settings.setSetting("systemProxy", system_proxy_pref)
-                    # Note: Don't fail connection if system proxy fails
-
-                # Update connection state
-                process_id = result.get("processId")
-                connection_state.set_connected(process_id, config_file, config)
-
-                # Deactivate kill switch if active (connection restored)
-                kill_switch_pref = settings.getSetting("killSwitch", {})
-                if kill_switch_pref.get("isActive", False):
-                    await kill_switch.deactivate()
-                    kill_switch_pref["isActive"] = False
-                    kill_switch_pref["deactivatedAt"] = int(time.time())
-                    settings.setSetting("killSwitch", kill_switch_pref)
-                    settings.commit()
+            process_id = result.get("processId")
+            connection_state.update_process(process_id, config_file, config)
 
-                # Persist connection state
-                settings.setSetting(
-                    "connectionState",
-                    {"status": "connected", "connectedAt": int(time.time())},
-                )
-                settings.commit()
+            return create_success_response(
+                {
+                    "processId": process_id,
+                    "method": "handover" if handover else "restart",
+                }
+            )
 
-                return create_success_response(
-                    {"status": "connected", "processId": process_id}
-                )
+        except Exception as e:
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR, f"Failed to reload connection: {str(e)}"
+            )
 
-            else:
-                # Disconnect
-                if connection_state.status == ConnectionStatus.DISCONNECTED:
-                    return create_success_response({"status": "disconnected"})
+    async def set_resource_profile(self, profile: str) -> Dict[str, Any]:
+        """
+        Switch the xray-core resource profile ("default", "gaming", "balanced",
+        "download"; "default" leaves xray-core's own settings).
 
-                # Always clear system proxy on disconnect so SOCKS is never left on
-                await system_proxy_manager.clear_system_proxy()
-                system_proxy_pref = settings.getSetting("systemProxy", {})
-                if system_proxy_pref.get("enabled", False):
-                    system_proxy_pref["enabled"] = False
-                    settings.setSetting("systemProxy", system_proxy_pref)
+        Sets Go runtime limits (GOMEMLIMIT, GOGC, GOMAXPROCS) and xray policy
+        buffer sizes/idle timeouts. An active connection is reloaded so the new
+        profile applies immediately (port handover outside TUN mode).
 
-                # TUN: remove route first, then stop xray
-                tun_pref = settings.getSetting("tunMode", {})
-                if tun_pref.get("enabled", False):
-                    await tun_manager.remove_system_route()
-                    await tun_manager.cleanup_tun_interface()
+        Args:
+            profile: Profile name
 
-                # Stop xray-core
-                result = await xray_manager.stop()
+        Returns:
+            {
+                'success': bool,
+                'profile': str,
+                'reloaded': bool,
+                'error': str | None
+            }
+        """
+        if profile not in RESOURCE_PROFILES:
+            return create_error_response(
+                ErrorCode.VALIDATION_ERROR, f"Unknown resource profile: {profile}"
+            )
+        try:
+            settings.setSetting("resourceProfile", {"name": profile})
+            settings.commit()
+            xray_manager.resource_profile = profile
 
+            reloaded = False
+            if get_connection_state().status == ConnectionStatus.CONNECTED:
+                result = await self.reload_connection()
                 if not result.get("success", False):
-                    # Log error but still mark as disconnected
-                    print(
-                        f"Warning: Failed to stop xray-core cleanly: {result.get('error')}"
-                    )
+                    return result
+                reloaded = True
 
-                # Update connection state
-                connection_state.set_disconnected()
+            return create_success_response({"profile": profile, "reloaded": reloaded})
+        except Exception as e:
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR, f"Failed to set resource profile: {str(e)}"
+            )
 
-                # Check if kill switch should be activated (unexpected disconnect)
-                kill_switch_pref = settings.getSetting("killSwitch", {})
-                if (
-                    kill_switch_pref.get("enabled", False)
-                    and connection_state.xray_process_id
-                ):
-                    # This was an unexpected disconnect, activate kill switch
-                    kill_result = await kill_switch.activate(
-                        connection_state.xray_process_id
-                    )
-                    if kill_result.get("success"):
-                        kill_switch_pref["isActive"] = True
-                        kill_switch_pref["activatedAt"] = int(time.time())
-                        connection_state.set_blocked()
-                    settings.setSetting("killSwitch", kill_switch_pref)
-                    settings.commit()
-
-                # Persist connection state
-                settings.setSetting(
-                    "connectionState",
-                    {
-                        "status": "disconnected"
-                        if not kill_switch_pref.get("isActive", False)
-                        else "blocked",
-                        "disconnectedAt": int(time.time()),
-                    },
-                )
-                settings.commit()
+    async def get_resource_profile(self) -> Dict[str, Any]:
+        """
+        Get the selected and running xray-core resource profile.
 
-                return create_success_response(
-                    {
-                        "status": "disconnected"
-                        if not kill_switch_pref.get("isActive", False)
-                        else "blocked"
-                    }
-                )
+        Returns:
+            {
+                'profile': str,
+                'runningProfile': str | None,
+                'profiles': list[str]
+            }
+        """
+        return {
+            "profile": xray_manager.resource_profile,
+            "runningProfile": xray_manager.running_profile
+            if xray_manager.is_running()
+            else None,
+            "profiles": list(RESOURCE_PROFILES),
+        }
+
+    async def set_process_scheduling(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Configure CPU/IO scheduling of xray-core and apply it to the running
+        process without a restart.
+
+        Args:
+            config: Partial config: nice, policy ('normal'|'batch'|'idle'),
+                ioClass ('best-effort'|'idle'|None), ioLevel, cpus, cpuWeight,
+                memoryHigh (see process_scheduling.DEFAULT_SCHEDULING)
 
+        Returns:
+            {
+                'success': bool,
+                'scheduling': dict,  # Effective configuration
+                'applied': dict | None,  # Values read back from the process
+                'error': str | None
+            }
+        """
+        scheduling, error = validate_scheduling(config)
+        if scheduling is None:
+            return create_error_response(ErrorCode.VALIDATION_ERROR, error)
+        try:
+            settings.setSetting("processScheduling", scheduling)
+            settings.commit()
+            xray_manager.scheduling = scheduling
+            applied = xray_manager.apply_scheduling()
+            return create_success_response(
+                {"scheduling": scheduling, "applied": applied}
+            )
         except Exception as e:
-            connection_state.set_error(
-                f"Connection error: {str(e)}", ErrorCode.UNKNOWN_ERROR
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR, f"Failed to set process scheduling: {str(e)}"
+            )
+
+    async def set_loop_monitor(
+        self, enabled: bool, threshold_ms: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Enable or disable event-loop lag instrumentation (asyncio debug mode,
+        heartbeat and stall stack sampling). Persists across reloads.
+
+        Args:
+            enabled: True to start, False to stop
+            threshold_ms: Lag/callback duration reported as a stall (default 100)
+
+        Returns:
+            {
+                'success': bool,
+                'enabled': bool,
+                'thresholdMs': int
+            }
+        """
+        try:
+            pref = settings.getSetting("loopMonitor", {})
+            if threshold_ms is not None:
+                if not isinstance(threshold_ms, int) or not 5 <= threshold_ms <= 10000:
+                    return create_error_response(
+                        ErrorCode.VALIDATION_ERROR,
+                        "threshold_ms must be an integer from 5 to 10000",
+                    )
+                pref["thresholdMs"] = threshold_ms
+            pref["enabled"] = enabled
+            settings.setSetting("loopMonitor", pref)
+            settings.commit()
+
+            await loop_monitor.stop()
+            loop_monitor.threshold = pref.get("thresholdMs", 100) / 1000
+            if enabled:
+                loop_monitor.start()
+            return create_success_response(
+                {"enabled": enabled, "thresholdMs": int(loop_monitor.threshold * 1000)}
             )
+        except Exception as e:
             return create_error_response(
-                ErrorCode.UNKNOWN_ERROR, f"Connection error: {str(e)}"
+                ErrorCode.UNKNOWN_ERROR, f"Failed to set loop monitor: {str(e)}"
             )
 
+    async def get_loop_report(self, limit: int = 10) -> Dict[str, Any]:
+        """
+        Get event-loop lag statistics and the slowest call sites.
+
+        Args:
+            limit: Number of offenders to return
+
+        Returns:
+            See LoopMonitor.get_report (active, beats, stalls, maxLagMs,
+            avgLagMs, p99LagMs, offenders with site/count/maxMs/stack)
+        """
+        return loop_monitor.get_report(limit)
+
+    async def set_metrics_endpoint(
+        self,
+        enabled: bool,
+        listen: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Enable/disable the OpenMetrics endpoint (GET /metrics, plain HTTP).
+        It is off until enabled here; the choice persists across restarts.
+
+        Args:
+            enabled: Serve metrics
+            listen: Bind address; '127.0.0.1' (default) keeps it local,
+                '0.0.0.0' lets a Prometheus on the LAN scrape it
+            port: TCP port (1024–65535, default 9465)
+
+        Returns:
+            {
+                'success': bool,
+                'enabled': bool,
+                'listen': str,
+                'port': int,
+                'error': str | None
+            }
+        """
+        pref = settings.getSetting("metrics", {})
+        listen = listen or pref.get("listen", MetricsServer.DEFAULT_LISTEN)
+        port = int(port or pref.get("port", MetricsServer.DEFAULT_PORT))
+        if not 1024 <= port <= 65535:
+            return create_error_response(
+                ErrorCode.VALIDATION_ERROR, "port must be between 1024 and 65535"
+            )
+        if enabled:
+            result = await metrics_server.start(listen, port)
+            if not result.get("success", False):
+                return create_error_response(
+                    ErrorCode.NETWORK_ERROR, result.get("error", "Cannot start metrics server")
+                )
+        else:
+            await metrics_server.stop()
+        settings.setSetting("metrics", {"enabled": enabled, "listen": listen, "port": port})
+        settings.commit()
+        return create_success_response({"enabled": enabled, "listen": listen, "port": port})
+
+    async def get_command_stats(self) -> Dict[str, Any]:
+        """
+        Latency and failure counts of external commands (ip, iptables, gsettings...).
+
+        Returns:
+            {
+                'maxConcurrency': int,
+                'commands': {name: {'calls', 'failures', 'timeouts', 'avgMs', 'maxMs'}}
+            }
+        """
+        return {
+            "maxConcurrency": DEFAULT_RUNNER.max_concurrency,
+            "commands": DEFAULT_RUNNER.get_stats(),
+        }
+
     async def get_connection_status(self) -> Dict[str, Any]:
         """
         Get current connection status.
@@ -870,43 +1674,132 @@ class Plugin:
                 'connectedAt': int | None,  # Unix timestamp
                 'errorMessage': str | None,
                 'processId': int | None,
-                'uptime': int | None  # Seconds
+                'uptime': int | None,  # Seconds
+                'supervisor': dict,  # Restart counters, crash-loop state
+                'scheduling': dict | None  # Applied nice/policy/affinity/cgroup
             }
         """
         connection_state = get_connection_state()
 
-        # Check if process is still running
+        # Check if process is still running. While the supervisor is active it
+        # owns restarts; it calls _handle_xray_exit itself on a crash loop.
         if connection_state.status == ConnectionStatus.CONNECTED:
-            if not xray_manager.is_running():
-                # Process died unexpectedly
-                process_id = connection_state.xray_process_id
-                connection_state.set_error(
-                    "xray-core process terminated unexpectedly",
-                    ErrorCode.PROCESS_FAILED,
+            if not xray_manager.is_running() and not xray_supervisor.is_active():
+                await self._handle_xray_exit(connection_state.xray_process_id)
+
+        # Return current status
+        status = connection_state.to_dict()
+        status["supervisor"] = xray_supervisor.get_status()
+        status["scheduling"] = xray_manager.get_scheduling_status()
+        return status
+
+    async def _on_xray_restarted(self, process_id: int) -> None:
+        """Update state after the supervisor restarted xray-core."""
+        connection_state = get_connection_state()
+        connection_state.xray_process_id = process_id
+
+        # xray-core recreates the TUN interface, which drops the route through it
+        tun_pref = settings.getSetting("tunMode", {})
+        if tun_pref.get("enabled", False):
+            route_result = await tun_manager.setup_system_route()
+            if not route_result.get("success"):
+                print(
+                    f"Xray Decky Plugin: TUN route restore after restart failed: "
+                    f"{route_result.get('error', 'Unknown')}"
                 )
 
-                # Check if kill switch should be activated
-                kill_switch_pref = settings.getSetting("killSwitch", {})
-                if kill_switch_pref.get("enabled", False) and process_id:
-                    # Activate kill switch
-                    kill_result = await kill_switch.activate(process_id)
-                    if kill_result.get("success"):
-                        kill_switch_pref["isActive"] = True
-                        kill_switch_pref["activatedAt"] = int(time.time())
-                        connection_state.set_blocked()
-                        settings.setSetting("killSwitch", kill_switch_pref)
-                        settings.commit()
-
-                # Cleanup TUN route if was active
-                tun_pref = settings.getSetting("tunMode", {})
-                if tun_pref.get("enabled", False):
-                    await tun_manager.remove_system_route()
+    async def _on_resume(self, slept: float) -> None:
+        """
+        After suspend the xray-core process is alive but its upstream TCP
+        sessions are dead and the physical interface may have changed:
+        move to a fresh instance bound to the current interface.
+        """
+        if get_connection_state().status != ConnectionStatus.CONNECTED:
+            return
+        # Wi-Fi usually needs a few seconds to reassociate after resume
+        for delay in (0,) + self.AUTO_CONNECT_RETRY_DELAYS:
+            if delay:
+                await asyncio.sleep(delay)
+            if get_connection_state().status != ConnectionStatus.CONNECTED:
+                return
+            result = await self.reload_connection(fresh=True)
+            if result.get("errorCode") == ErrorCode.NOT_CONNECTED:
+                return  # Disconnected while waiting for the lock
+            if result.get("success", False):
+                print(
+                    f"Xray Decky Plugin: Reconnected after resume via "
+                    f"{result.get('method')} (pid {result.get('processId')})"
+                )
+                return
+        print(f"Xray Decky Plugin: Reconnect after resume failed: {result.get('error')}")
 
-                # Cleanup
-                await xray_manager.stop()
+    async def _handle_xray_exit(self, process_id: Optional[int]) -> None:
+        """
+        Handle an xray-core exit that will not be recovered: mark the error,
+        arm the kill switch if enabled, and clean up routes and process state.
+        The supervisor calls it with the connection lock held.
+        """
+        connection_state = get_connection_state()
+        connection_state.set_error(
+            "xray-core process terminated unexpectedly",
+            ErrorCode.PROCESS_FAILED,
+        )
 
-        # Return current status
-        return connection_state.to_dict()
+        # Check if kill switch should be activated
+        kill_switch_pref = settings.getSetting("killSwitch", {})
+        if kill_switch_pref.get("enabled", False) and process_id:
+            # Activate kill switch
+            with KILL_SWITCH_SECONDS.time():
+                kill_result = await kill_switch.activate(process_id)
+            if kill_result.get("success"):
+                kill_switch_pref["isActive"] = True
+                kill_switch_pref["activatedAt"] = int(time.time())
+                connection_state.set_blocked()
+                settings.setSetting("killSwitch", kill_switch_pref)
+                settings.commit()
+
+        # Cleanup TUN route if was active
+        tun_pref = settings.getSetting("tunMode", {})
+        if tun_pref.get("enabled", False):
+            await tun_manager.remove_system_route()
+
+        # Cleanup
+        await xray_manager.stop()
+
+    async def toggle_auto_connect(self, enabled: bool) -> Dict[str, Any]:
+        """
+        Toggle connecting automatically when the plugin loads (boot).
+
+        Args:
+            enabled: True to enable, False to disable
+
+        Returns:
+            {
+                'success': bool,
+                'enabled': bool
+            }
+        """
+        try:
+            auto_connect_pref = settings.getSetting("autoConnect", {})
+            auto_connect_pref["enabled"] = enabled
+            settings.setSetting("autoConnect", auto_connect_pref)
+            settings.commit()
+            return create_success_response({"enabled": enabled})
+        except Exception as e:
+            return create_error_response(
+                ErrorCode.UNKNOWN_ERROR, f"Failed to toggle auto-connect: {str(e)}"
+            )
+
+    async def get_auto_connect_status(self) -> Dict[str, Any]:
+        """
+        Get auto-connect preference.
+
+        Returns:
+            {
+                'enabled': bool
+            }
+        """
+        return {"enabled": settings.getSetting("autoConnect", {}).get("enabled", False)}
 
     # Kill Switch Management
     async def toggle_kill_switch(self, enabled: bool) -> Dict[str, Any]:
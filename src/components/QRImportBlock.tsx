@@ -78,6 +78,9 @@ export const QRImportBlock: FC<QRImportBlockProps> = ({ helpTopicQr, helpTopicLa
   }
 
   const importUrl = urlInfo.baseUrl.replace(/\/$/, '') + urlInfo.path;
+  const alternativeUrls = (urlInfo.alternatives ?? []).map(
+    (baseUrl) => baseUrl.replace(/\/$/, '') + urlInfo.path
+  );
 
   return (
     <div>
@@ -125,6 +128,25 @@ export const QRImportBlock: FC<QRImportBlockProps> = ({ helpTopicQr, helpTopicLa
           >
             {importUrl}
           </p>
+          {alternativeUrls.length > 0 && (
+            <>
+              <span style={{ fontSize: '12px', color: '#8f98a0' }}>Other addresses</span>
+              {alternativeUrls.map((url) => (
+                <p
+                  key={url}
+                  style={{
+                    fontSize: '12px',
+                    color: '#66c0f4',
+                    wordBreak: 'break-all',
+                    fontFamily: 'monospace',
+                    margin: '4px 0 0',
+                  }}
+                >
+                  {url}
+                </p>
+              ))}
+            </>
+          )}
         </div>
       </Focusable>
     </div>
@@ -124,6 +124,33 @@ export interface SystemProxyStatusResponse {
 export interface ImportServerUrlResponse {
   baseUrl: string;
   path: string;
+  /** Live read-only status dashboard (Server-Sent Events) */
+  statusPath?: string;
+  /** Base URLs on the host's other LAN addresses */
+  alternatives?: string[];
+}
+
+export interface StoredNode extends VLESSConfig {
+  id: string;
+}
+
+export interface ListNodesResponse {
+  nodes: StoredNode[];
+  /** Node matching the active vlessConfig */
+  activeId: string | null;
+}
+
+export interface SelectNodeResponse {
+  success: boolean;
+  config?: VLESSConfig;
+  /** The active connection was switched to the node */
+  reloaded?: boolean;
+  error?: string;
+}
+
+export interface RemoveNodeResponse {
+  success: boolean;
+  error?: string;
 }
 
 // Backend method handles using callable (new API)
@@ -170,3 +197,9 @@ export const getSystemProxyStatus = callable<[], SystemProxyStatusResponse>(
 );
 
 export const getImportServerUrl = callable<[], ImportServerUrlResponse>('get_import_server_url');
+
+export const listNodes = callable<[], ListNodesResponse>('list_nodes');
+
+export const selectNode = callable<[nodeId: string], SelectNodeResponse>('select_node');
+
+export const removeNode = callable<[nodeId: string], RemoveNodeResponse>('remove_node');